@@ -1,18 +1,32 @@
 import multiprocessing
+import queue
+import threading
 from typing import Optional
 
 import cv2
 import numpy.typing as npt
+from export.checkpoint import default_checkpoint_frames
 from export.process import export_process
-from filter.filter_frame import get_filtered_frame
+from export.segments import default_export_segments
+from filter.frame_cache import FilteredFrameCache, frame_cache_key
+from filter.incremental import IncrementalFilterRunner
+from filter.instrumentation import filter_stats, format_filter_stats
+from filter.preview import (
+    PREVIEW_HEIGHT,
+    preview_frame,
+    preview_scale,
+    scale_filter_params,
+)
 from load.load import file_loader
 from models.dc_video import (
+    DCExportProgress,
     DCFiltersParams,
     DCVideoData,
     DCVideoExportParams,
 )
 from models.type_dialogs import TypeDialog
 from models.type_status import (
+    TypeExportStatus,
     TypeLoadStatus,
     TypeVideoTypeStatus,
 )
@@ -21,7 +35,10 @@ from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import QImage, QPixmap
 from PyQt6.QtWidgets import (
     QFileDialog,
+    QLabel,
     QMessageBox,
+    QProgressBar,
+    QPushButton,
 )
 
 from app.ui.MainWindow import Ui_MainWindow
@@ -69,6 +86,41 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # dataclass object for storing video related values
         self.video_data = DCVideoData()
         self.load_status: TypeLoadStatus = TypeLoadStatus.ok
+        # filtered frames already shown, used again when replaying
+        # or scrubbing with the same filter values
+        self.frame_cache = FilteredFrameCache()
+        # keeps the output of each filter of the last frame, moving a
+        # slider on the paused video only runs the filters from there on
+        self.filter_runner = IncrementalFilterRunner()
+        # frames are scaled to the preview size before they are filtered,
+        # only the export filters the full resolution
+        self.preview_scale: float = 1.0
+
+        # record the time of each filter and show it in the status bar
+        filter_stats.enabled = True
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.show_filter_stats)
+        self.stats_timer.start(1000)
+
+        # progress of the running export, hidden until an export starts
+        self.export_label = QLabel()
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setMaximumWidth(200)
+        self.btn_cancel_export = QPushButton("Cancel export")
+        self.btn_cancel_export.clicked.connect(self.cancel_export)
+        for widget in (
+            self.export_label,
+            self.export_progress_bar,
+            self.btn_cancel_export,
+        ):
+            self.statusbar.addPermanentWidget(widget)
+            widget.hide()
+        # queue with DCExportProgress messages of the export process and
+        # event to stop it
+        self.export_progress_queue: Optional[multiprocessing.Queue] = None
+        self.export_cancel_event = None
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.update_export_progress)
 
     def resizeEvent(self, event) -> None:
         """
@@ -123,15 +175,25 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.label_resolution.setText(
             f"Resolution: {self.video_data.frame_size[0]} x {self.video_data.frame_size[1]} px."
         )
+        # scale factor from video resolution to preview size
+        self.preview_scale = preview_scale(self.video_data.frame_size[1])
         # get only first frame for display in video area
         # as video placeholder until video is started
         ret, frame = self.video_data.cap.read()
-        # store as last playing frame
-        self.video_data.last_playing_frame = frame
+        # store as last playing frame (preview size)
+        self.video_data.last_playing_frame = preview_frame(
+            frame, self.preview_scale
+        )
+        self.video_data.frame_index = 0
+        self.video_data.next_frame_index = 1
         # store also as first frame
         self.video_data.first_frame = frame
+        # frames of the previous video are not needed anymore
+        self.frame_cache.clear()
+        self.filter_runner.clear()
+        filter_stats.reset()
         # apply filter values from sliders
-        frame = self.get_filter_values_and_apply_to_frame(frame)
+        frame = self.get_filtered_frame_at(0)
         # put first filtered frame in video ui place.
         self.update_video_in_ui(frame)
 
@@ -159,7 +221,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.video_data.current_time = None
         self.video_data.first_frame = None
         self.video_data.last_playing_frame = None
+        self.video_data.frame_index = None
+        self.video_data.next_frame_index = 0
         self.video_data.frame_size = None
+        self.preview_scale = 1.0
+        self.frame_cache.clear()
+        self.filter_runner.clear()
 
     def digest_load_status(self, status: TypeLoadStatus) -> None:
         """
@@ -283,6 +350,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             # CAP_PROP_POS_FRAMES: 0-based index of the frame
             # to be decoded/captured next. (from docs)
             self.video_data.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.video_data.next_frame_index = 0
             # set flag state to not playing
             self.is_playing = False
             # set btn text accordingly
@@ -297,6 +365,119 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             # set last shown frame to first video frame
             # self.video_data.last_playing_frame = self.video_data.first_frame
 
+    def show_filter_stats(self) -> None:
+        """
+        Show the mean time of each filter per frame in the status bar,
+        after the path of the video. Called every second by self.stats_timer.
+        :return: None
+        """
+        # no video or nothing filtered yet
+        if self.video_data.cap is None or not self.video_data.input_path:
+            return
+        stats = filter_stats.snapshot()
+        if not stats.frames:
+            return
+        self.statusbar.showMessage(
+            f"{self.video_data.input_path} | {format_filter_stats(stats)}"
+        )
+
+    def update_export_progress(self) -> None:
+        """
+        Read the progress messages of the export process and show the last
+        one next to the status bar. Called by self.export_timer while an
+        export runs.
+        :return: None
+        """
+        if self.export_progress_queue is None:
+            return
+        message: Optional[DCExportProgress] = None
+        try:
+            while True:
+                message = self.export_progress_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        if message is None:
+            # process ended without a last message (e.g. it crashed)
+            if self.export_process and not self.export_process.is_alive():
+                self.finish_export(TypeExportStatus.error)
+            return
+
+        if message.status != TypeExportStatus.running:
+            self.finish_export(message.status)
+            return
+
+        if message.total_frames:
+            self.export_progress_bar.setMaximum(message.total_frames)
+            self.export_progress_bar.setValue(
+                min(message.frames_done, message.total_frames)
+            )
+        text = f"{message.fps:.1f} fps"
+        if message.eta_seconds is not None:
+            text += f" | {int(message.eta_seconds)} s left"
+        if message.filter_stats is not None:
+            text += f" | {format_filter_stats(message.filter_stats)}"
+        self.export_label.setText(text)
+
+    def finish_export(self, status: TypeExportStatus) -> None:
+        """
+        Hide the export progress and show the result of the export in the
+        export label (the status bar message is replaced by the filter
+        stats every second). A new export can be started again.
+        :param status: last status of the export
+        :return: None
+        """
+        self.export_timer.stop()
+        self.export_progress_queue = None
+        self.export_cancel_event = None
+        self.export_progress_bar.hide()
+        self.btn_cancel_export.hide()
+        messages = {
+            TypeExportStatus.ok: "Export finished.",
+            TypeExportStatus.cancelled: "Export cancelled.",
+        }
+        self.export_label.setText(messages.get(status, "Export failed."))
+        self.btn_export.setEnabled(True)
+
+    def cancel_export(self) -> None:
+        """
+        Callback function of the cancel export button: the export process
+        stops after the current frames, closes the files and deletes the
+        partial video.
+        :return: None
+        """
+        if self.export_cancel_event is not None:
+            self.export_cancel_event.set()
+            self.btn_cancel_export.setEnabled(False)
+
+    def stop_export_process(
+        self, timeout: float = 5
+    ) -> Optional[threading.Thread]:
+        """
+        Stop a running export, e.g. when the app is closed: it stops after
+        the current frames and deletes the partial video, it is terminated
+        if it does not stop in time. The waiting is done in a thread, so
+        the ui is not blocked (python waits for the thread before it exits).
+        :param timeout: seconds to wait before the process is terminated
+        :return: thread waiting for the process, None without export
+        """
+        process = self.export_process
+        if process is None:
+            return None
+        self.export_process = None
+        if self.export_cancel_event is not None:
+            self.export_cancel_event.set()
+
+        def wait_for_export() -> None:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+        waiter = threading.Thread(target=wait_for_export, name="export-stop")
+        waiter.start()
+        return waiter
+
     def update_time_label(self, current_frame) -> None:
         """
         Function called to change the time label shown in the ui
@@ -332,11 +513,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         """
         # if there is a video
         if self.video_data.cap:
-            # set CAP_PROP_POS_FRAMES property to slider value
-            self.video_data.cap.set(
-                cv2.CAP_PROP_POS_FRAMES,
-                self.slider_video.value(),
-            )
+            # next frame shown is the one at the slider position,
+            # the video file is only read (and seeked) if the frame
+            # is not in the cache (see read_frame)
+            self.video_data.next_frame_index = self.slider_video.value()
             # update frame shown in ui according app state and filter values
             self.trigger_update_frame()
             # resume video playback (video is paused with
@@ -367,9 +547,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             QImage.Format.Format_BGR888,
         )  # Format_RGB888 ?
 
-        # scale the image to a height of 300
+        # scale the image to a height of 400 (frames are already
+        # filtered at this size, see preview_frame)
         # better would be to scale in proportion of container size.
-        pixmap = QPixmap.fromImage(q_img).scaledToHeight(400)
+        pixmap = QPixmap.fromImage(q_img).scaledToHeight(PREVIEW_HEIGHT)
 
         # pixmap = QPixmap.fromImage(q_img).scaledToHeight(
         #     (self.label_video.height())
@@ -381,9 +562,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # if video is playing
         if self.is_playing:
             # update video position bar
-            current_frame = int(
-                self.video_data.cap.get(cv2.CAP_PROP_POS_FRAMES)
-            )
+            # (frames from the cache are not read from the file,
+            # so the position of cap can not be used)
+            current_frame = self.video_data.next_frame_index
             self.slider_video.setValue(current_frame)
             # update the time shown in ui
             self.update_time_label(current_frame)
@@ -410,10 +591,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         # Take the last frame displayed and apply the filters and update
         # the ui to show the filtered frame.
-        # filter last frame
-        frame = self.get_filter_values_and_apply_to_frame(
-            self.video_data.last_playing_frame
+        # filter last frame (after stop the next frame is the first one)
+        frame = self.get_filtered_frame_at(
+            max(0, self.video_data.next_frame_index - 1)
         )
+        if frame is None:
+            return
         # pass filterd frame to ui update function
         self.update_video_in_ui(frame)
 
@@ -427,10 +610,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         if self.video_data.cap is None:
             return
 
-        # Get next frame.
-        ret, frame = self.video_data.cap.read()
+        # Get next frame (filtered, from the cache or the file).
+        frame = self.get_filtered_frame_at(self.video_data.next_frame_index)
         # if no data
-        if not ret:
+        if frame is None:
             self.timer.stop()
             # set is_playing flag to false
             self.is_playing = False
@@ -438,13 +621,66 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.btn_play_pause.setText("Play")
             return
 
-        # Store the last frame
-        self.video_data.last_playing_frame = frame
-        # filter last frame
-        frame = self.get_filter_values_and_apply_to_frame(frame)
+        self.video_data.next_frame_index += 1
         # pass filterd frame to ui update function
         self.update_video_in_ui(frame)
 
+    def read_frame(self, frame_index: int) -> Optional[npt.NDArray]:
+        """
+        Read a frame from the video file, scale it to the preview size and
+        store it as last playing frame.
+        If frames were taken from the cache the file is not at the right
+        position anymore, then it is moved to the frame first.
+        :param frame_index: 0-based index of the frame
+        :return: frame or None if there is no frame at this index
+        """
+        cap = self.video_data.cap
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != frame_index:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = cap.read()
+        if not ret:
+            return None
+        frame = preview_frame(frame, self.preview_scale)
+        # Store the last frame
+        self.video_data.last_playing_frame = frame
+        self.video_data.frame_index = frame_index
+        return frame
+
+    def get_filtered_frame_at(self, frame_index: int) -> Optional[npt.NDArray]:
+        """
+        Get a frame of the video filtered with the current slider values,
+        at preview size.
+        Frames already filtered with these values come from the cache,
+        the others are read from the file (only if the frame is not the
+        last playing frame), filtered and stored in the cache. For the last
+        playing frame only the filters from the first changed value on run
+        again (see IncrementalFilterRunner).
+        :param frame_index: 0-based index of the frame
+        :return: filtered frame or None if there is no frame at this index
+        """
+        # get filter values from sliders
+        dc_filter_params = self.get_filter_values_from_widgets()
+        key = frame_cache_key(
+            self.video_data.input_path, frame_index, dc_filter_params
+        )
+        frame = self.frame_cache.get(key)
+        if frame is not None:
+            return frame
+
+        if self.video_data.frame_index == frame_index:
+            frame = self.video_data.last_playing_frame
+        else:
+            frame = self.read_frame(frame_index)
+        if frame is None:
+            return None
+        # filter the frame and keep it for the next time
+        # (blur radius scaled like the frame)
+        frame = self.filter_runner.apply(
+            frame, scale_filter_params(dc_filter_params, self.preview_scale)
+        )
+        self.frame_cache.put(key, frame)
+        return frame
+
     def get_filter_values_from_widgets(
         self,
     ) -> DCFiltersParams:
@@ -466,20 +702,6 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # return
         return dc_filter_params
 
-    def get_filter_values_and_apply_to_frame(
-        self, frame: npt.NDArray
-    ) -> npt.NDArray:
-        """
-        Function that call other function to read filter values from sliders.
-        With the filter values other function is called to filter the frame.
-        :param frame: frame to be filtered
-        :return: filtered frame
-        """
-        # get filter values from sliders
-        dc_filter_params = self.get_filter_values_from_widgets()
-        # call fnc for filtering with slider values and return filtered frame
-        return get_filtered_frame(frame, dc_filter_params)
-
     def export_video_to_file(self) -> None:
         """
         Callback function called when export btn is pressed.
@@ -488,6 +710,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         :return:
         """
 
+        # only one export at a time, the export button is enabled again
+        # when it is done
+        if self.export_process is not None and self.export_process.is_alive():
+            return
+
         # if btn is pressed but we dont have a video file loaded
         # input_path that was set when we loaded the
         # last file (fnc select_video_file).
@@ -514,18 +741,41 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # get current filter values from sliders
         dc_filter_params = self.get_filter_values_from_widgets()
 
+        self.btn_export.setEnabled(False)
+        self.export_progress_queue = multiprocessing.Queue()
+        self.export_cancel_event = multiprocessing.Event()
+
         # Put video parameters, filter values and output
         # path together in data object
         dc_export_params_data_for_proc = DCVideoExportParams(
             filter_params=dc_filter_params,
             output_path=save_path,
             input_path=self.video_data.input_path,
+            # frame ranges exported in parallel processes
+            segments=default_export_segments(),
+            # an export killed when the app is closed resumes when it is
+            # started again with the same values
+            checkpoint_frames=default_checkpoint_frames(),
+            progress_queue=self.export_progress_queue,
+            cancel_event=self.export_cancel_event,
         )
 
         # pass data object with all parameters to function
         # for starting process in background
         self.export_process = export_process(dc_export_params_data_for_proc)
 
+        # show the progress until the export is done
+        self.export_label.setText("Export started")
+        self.export_progress_bar.setValue(0)
+        self.btn_cancel_export.setEnabled(True)
+        for widget in (
+            self.export_label,
+            self.export_progress_bar,
+            self.btn_cancel_export,
+        ):
+            widget.show()
+        self.export_timer.start(200)
+
         # Display message to user that export process is
         # running in background
         self.show_user_dialog(
@@ -540,13 +790,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         :param event:
         :return:
         """
+        self.stats_timer.stop()
+        self.export_timer.stop()
         # if video file is open
         if self.video_data.cap:
             # closes video file
             self.video_data.cap.release()
         # if export process is running
-        if self.export_process:
-            if self.export_process.is_alive():
-                # end the process
-                self.export_process.terminate()
+        self.stop_export_process()
         event.accept()
@@ -1,11 +1,29 @@
+import multiprocessing
+import os
 import sys
+import tempfile
+import time
 import unittest
+from unittest.mock import MagicMock, patch
 
+import cv2
+import numpy as np
+from load.load import file_loader
+from models.type_status import TypeExportStatus
 from PyQt6.QtWidgets import QApplication
 
 from app.application import MainWindow
 
 
+def wait_for_cancel(cancel_event):
+    # like an export: stops when the cancel event is set
+    cancel_event.wait(30)
+
+
+def ignore_cancel(cancel_event):
+    time.sleep(30)
+
+
 class TestMainWindow(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -47,6 +65,74 @@ class TestMainWindow(unittest.TestCase):
         self.assertIsNotNone(self.window.slider_video)
         self.assertIsNotNone(self.window.dial_hue)
 
+    def test_filter_update_after_stop(self):
+        """Test that a filter change after stop shows the first frame."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "video.mp4")
+            out = cv2.VideoWriter(
+                path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48)
+            )
+            for _ in range(30):
+                out.write(np.full((48, 64, 3), 128, np.uint8))
+            out.release()
+            self.window.video_data.input_path = path
+            self.window.video_data, _ = file_loader(self.window.video_data)
+            self.window.reset_values_for_new_video()
+            self.window.stop_video()
+            self.window.slider_brightness.setValue(40)
+            self.window.callback_filter_update()
+            self.window.video_data.cap.release()
+        indices = {key[1] for key in self.window.frame_cache._frames}
+        self.assertEqual(indices, {0})
+        # the unfiltered frame kept by the app is not frozen by the cache
+        self.assertTrue(
+            self.window.video_data.last_playing_frame.flags.writeable
+        )
+
+    def test_stop_export_process(self):
+        """Test that a running export has ended when it is stopped."""
+        for target, timeout in ((wait_for_cancel, 5), (ignore_cancel, 0.2)):
+            cancel_event = multiprocessing.Event()
+            process = multiprocessing.Process(
+                target=target, args=(cancel_event,)
+            )
+            process.start()
+            self.window.export_process = process
+            self.window.export_cancel_event = cancel_event
+            waiter = self.window.stop_export_process(timeout)
+            # the ui does not wait for the process
+            self.assertIsNone(self.window.export_process)
+            waiter.join()
+            self.assertFalse(process.is_alive())
+
+    def test_export_button_disabled_while_exporting(self):
+        """Test that a running export is not replaced by a new one."""
+        self.window.video_data.input_path = "input.mp4"
+        running = MagicMock()
+        running.is_alive.return_value = True
+        with (
+            patch(
+                "app.application.QFileDialog.getSaveFileName",
+                return_value=("output.mp4", ""),
+            ),
+            patch(
+                "app.application.export_process", return_value=running
+            ) as mock_export,
+            patch.object(self.window, "show_user_dialog"),
+        ):
+            self.window.export_video_to_file()
+            self.assertFalse(self.window.btn_export.isEnabled())
+            # a second click (e.g. queued) does not start another export
+            self.window.export_video_to_file()
+            mock_export.assert_called_once()
+
+        self.window.finish_export(TypeExportStatus.ok)
+        self.assertTrue(self.window.btn_export.isEnabled())
+        # the result stays visible, the filter stats use the status bar
+        self.assertTrue(self.window.export_label.isVisible())
+        self.assertEqual(self.window.export_label.text(), "Export finished.")
+        self.assertFalse(self.window.export_progress_bar.isVisible())
+
     @classmethod
     def tearDownClass(cls):
         """Close the application instance after tests."""
@@ -0,0 +1,283 @@
+import dataclasses
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from filter.filter_frame import get_filtered_frame
+from filter.filters.blur import blur_apply
+from filter.filters.brightness import brightness_apply
+from filter.filters.canny import canny_apply
+from filter.filters.hue import hue_apply
+from filter.filters.saturation import saturation_apply
+from filter.filters.sepia import sepia_apply
+from filter.filters.sharpen import sharpen_apply
+from filter.lut import COLOR_LUT_MIN_FRAMES, color_lut_cache
+from models.dc_benchmark import DCBenchmarkResult
+from models.dc_video import DCFiltersParams
+
+# (height, width) of the benchmark frames
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "480p": (480, 854),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840),
+}
+
+# slider values measured for each filter
+FILTER_SWEEPS: Dict[str, Tuple[Callable, Sequence[int]]] = {
+    "blur": (blur_apply, range(0, 51, 5)),
+    "canny": (canny_apply, (50, 100, 200)),
+    "sharpen": (sharpen_apply, (1, 3, 5)),
+    "brightness": (brightness_apply, (-50, 50)),
+    "saturation": (saturation_apply, (-50, 50)),
+    "hue": (hue_apply, (-90, 90)),
+    "sepia": (sepia_apply, (10, 100)),
+}
+
+# filter values measured for the whole chain (get_filtered_frame)
+CHAIN_SWEEP: Sequence[DCFiltersParams] = (
+    DCFiltersParams(),
+    DCFiltersParams(blur_strength=5, sharpen_strength=2),
+    DCFiltersParams(
+        brightness_strength=20,
+        saturation_strength=30,
+        hue_value=20,
+        sepia_strength=40,
+    ),
+    DCFiltersParams(
+        blur_strength=3,
+        canny_threshold=100,
+        sharpen_strength=1,
+        brightness_strength=20,
+    ),
+    DCFiltersParams(
+        blur_strength=20,
+        sharpen_strength=5,
+        brightness_strength=-20,
+        saturation_strength=50,
+        hue_value=90,
+        sepia_strength=100,
+    ),
+)
+
+# name used for the results of the whole chain
+CHAIN_NAME = "chain"
+
+
+def make_frame(height: int, width: int, seed: int = 0) -> npt.NDArray:
+    """
+    Benchmark frame: smooth colour gradients with noise, so edge detection
+    and blur see structure like in a video frame (random noise alone makes
+    Canny find edges everywhere).
+    :param height: frame height
+    :param width: frame width
+    :param seed: seed of the noise
+    :return: uint8 BGR frame
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    cols = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[..., 0] = 255 * rows * cols
+    frame[..., 1] = 127.5 * (1 + np.sin(12 * np.pi * cols) * rows)
+    frame[..., 2] = 255 * (1 - rows)
+    frame += rng.normal(0, 12, frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def params_label(filter_data_params: DCFiltersParams) -> str:
+    """
+    Short text for filter values, only the filters that are set.
+    :param filter_data_params: the values for each filter.
+    :return: e.g. "blur_strength=5 sharpen_strength=2" or "none"
+    """
+    values = [
+        f"{field.name}={getattr(filter_data_params, field.name)}"
+        for field in dataclasses.fields(filter_data_params)
+        if getattr(filter_data_params, field.name)
+    ]
+    return " ".join(values) or "none"
+
+
+def latency_percentiles(times_ms: Sequence[float]) -> Dict[str, float]:
+    """
+    Summary of per-frame latencies.
+    :param times_ms: latency of each frame in milliseconds
+    :return: dict with mean, p50, p90 and p99 in milliseconds
+    """
+    times = np.asarray(times_ms, dtype=np.float64)
+    p50, p90, p99 = np.percentile(times, (50, 90, 99))
+    return {
+        "mean_ms": float(times.mean()),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+    }
+
+
+def time_function(
+    func: Callable[[], object], repeat: int, warmup: int = 1
+) -> List[float]:
+    """
+    Time a function call.
+    :param func: function without arguments
+    :param repeat: number of timed calls
+    :param warmup: calls before timing (tables, buffers, caches)
+    :return: time of each call in milliseconds
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def benchmark_case(
+    name: str,
+    resolution: str,
+    value,
+    func: Callable[[], object],
+    repeat: int,
+    warmup: int = 1,
+) -> DCBenchmarkResult:
+    """
+    Measure a single filter call.
+    :param name: filter name
+    :param resolution: resolution name
+    :param value: slider value or filter values
+    :param func: function without arguments that filters one frame
+    :param repeat: number of timed frames
+    :param warmup: calls before timing
+    :return: DCBenchmarkResult
+    """
+    times = time_function(func, repeat, warmup)
+    stats = latency_percentiles(times)
+    return DCBenchmarkResult(
+        name=name,
+        resolution=resolution,
+        value=str(value),
+        frames=repeat,
+        fps=1000 / stats["mean_ms"] if stats["mean_ms"] > 0 else 0.0,
+        **stats,
+    )
+
+
+def run_benchmarks(
+    resolutions: Iterable[str] = tuple(RESOLUTIONS),
+    filters: Iterable[str] = tuple(FILTER_SWEEPS) + (CHAIN_NAME,),
+    repeat: int = 10,
+    warmup: int = 1,
+    progress: Optional[Callable[[DCBenchmarkResult], None]] = None,
+) -> List[DCBenchmarkResult]:
+    """
+    Run the benchmark for the given resolutions and filters.
+    Each filter is measured for all values of its sweep, "chain" runs
+    get_filtered_frame with the filter values of CHAIN_SWEEP. The chain
+    is warmed up for COLOR_LUT_MIN_FRAMES more frames and waits for the
+    colour lookup table, so the timed frames use it like a playback or
+    export does.
+    :param resolutions: names from RESOLUTIONS
+    :param filters: names from FILTER_SWEEPS and/or "chain"
+    :param repeat: number of timed frames per case
+    :param warmup: calls before timing each case
+    :param progress: optional function called with every result
+    :return: list of results
+    """
+    results = []
+    for resolution in resolutions:
+        frame = make_frame(*RESOLUTIONS[resolution])
+        for name in filters:
+            if name == CHAIN_NAME:
+                cases = [
+                    (
+                        params_label(params),
+                        lambda p=params: get_filtered_frame(frame, p),
+                    )
+                    for params in CHAIN_SWEEP
+                ]
+            else:
+                func, values = FILTER_SWEEPS[name]
+                cases = [
+                    (value, lambda f=func, v=value: f(frame, v))
+                    for value in values
+                ]
+            for value, call in cases:
+                if name == CHAIN_NAME:
+                    # the table is built in the background, the timed
+                    # frames use it once it is ready
+                    for _ in range(COLOR_LUT_MIN_FRAMES):
+                        call()
+                    color_lut_cache.wait()
+                result = benchmark_case(
+                    name, resolution, value, call, repeat, warmup
+                )
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
+
+
+def save_results(results: List[DCBenchmarkResult], path: str) -> None:
+    """
+    Save results as JSON.
+    :param results: results of run_benchmarks
+    :param path: output file
+    :return: None
+    """
+    with open(path, "w") as file:
+        json.dump([dataclasses.asdict(r) for r in results], file, indent=2)
+
+
+def load_results(path: str) -> List[DCBenchmarkResult]:
+    """
+    Load results saved with save_results.
+    :param path: JSON file
+    :return: list of results
+    """
+    with open(path) as file:
+        return [DCBenchmarkResult(**item) for item in json.load(file)]
+
+
+def compare_results(
+    results: List[DCBenchmarkResult],
+    baseline: List[DCBenchmarkResult],
+    tolerance: float = 0.15,
+    min_ms: float = 0.1,
+) -> List[Tuple[DCBenchmarkResult, DCBenchmarkResult]]:
+    """
+    Find the cases that got slower than the baseline.
+    Cases are matched by filter name, resolution and value, cases missing
+    in the baseline are ignored.
+    :param results: new results
+    :param baseline: stored results
+    :param tolerance: allowed fps loss, 0.15 = 15 % slower
+    :param min_ms: cases faster than this in the baseline are ignored,
+    their timing is mostly noise (e.g. filters at the neutral value).
+    :return: list of (new result, baseline result) that are too slow
+    """
+    stored = {(r.name, r.resolution, r.value): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = stored.get((result.name, result.resolution, result.value))
+        if old is None or old.mean_ms < min_ms:
+            continue
+        if result.fps < old.fps * (1 - tolerance):
+            regressions.append((result, old))
+    return regressions
+
+
+def format_result(result: DCBenchmarkResult) -> str:
+    """
+    One line of the benchmark report.
+    :param result: DCBenchmarkResult
+    :return: text line
+    """
+    return (
+        f"{result.name:<11} {result.resolution:<6} {result.value:<40.40} "
+        f"{result.fps:8.1f} fps  p50 {result.p50_ms:7.2f} ms  "
+        f"p90 {result.p90_ms:7.2f} ms  p99 {result.p99_ms:7.2f} ms"
+    )
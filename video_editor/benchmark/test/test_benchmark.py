@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from models.dc_benchmark import DCBenchmarkResult
+
+from benchmark import benchmark
+from benchmark.benchmark import (
+    compare_results,
+    latency_percentiles,
+    load_results,
+    make_frame,
+    run_benchmarks,
+    save_results,
+)
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Test for the filter benchmark helpers
+    """
+
+    def result(self, fps, value="5"):
+        return DCBenchmarkResult(
+            name="blur",
+            resolution="480p",
+            value=value,
+            frames=10,
+            fps=fps,
+            mean_ms=1000 / fps,
+        )
+
+    def test_latency_percentiles(self):
+        stats = latency_percentiles(list(range(1, 101)))
+        self.assertAlmostEqual(stats["mean_ms"], 50.5)
+        self.assertAlmostEqual(stats["p50_ms"], 50.5)
+        self.assertGreater(stats["p99_ms"], stats["p90_ms"])
+
+    def test_make_frame(self):
+        frame = make_frame(48, 64)
+        self.assertEqual(frame.shape, (48, 64, 3))
+        self.assertEqual(frame.dtype.name, "uint8")
+
+    def test_compare_finds_slower_cases(self):
+        baseline = [self.result(100), self.result(100, value="10")]
+        results = [self.result(80), self.result(95, value="10")]
+        regressions = compare_results(results, baseline, tolerance=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0][0].value, "5")
+
+    def test_compare_ignores_missing_and_tiny_cases(self):
+        # not in the baseline
+        self.assertEqual(
+            compare_results([self.result(10, value="50")], [self.result(100)]),
+            [],
+        )
+        # baseline too fast to compare
+        self.assertEqual(
+            compare_results([self.result(1000)], [self.result(100000)]), []
+        )
+
+    def test_save_and_load(self):
+        results = [self.result(100), self.result(50, value="10")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            save_results(results, path)
+            self.assertEqual(load_results(path), results)
+
+    def test_run_benchmarks(self):
+        with patch.dict(benchmark.RESOLUTIONS, {"tiny": (32, 48)}):
+            results = run_benchmarks(
+                ["tiny"], ["sepia", "chain"], repeat=2, warmup=0
+            )
+        self.assertEqual(
+            len(results),
+            len(benchmark.FILTER_SWEEPS["sepia"][1])
+            + len(benchmark.CHAIN_SWEEP),
+        )
+        for result in results:
+            self.assertEqual(result.resolution, "tiny")
+            self.assertEqual(result.frames, 2)
+            self.assertGreater(result.fps, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import dataclasses
+import multiprocessing
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+from models.dc_video import DCBatchJobResult, DCVideoExportParams
+from models.type_status import TypeExportStatus
+
+from export.export import video_exporter_func
+from export.resources import (
+    apply_resource_policy,
+    available_cpus,
+    worker_threads,
+)
+
+
+def default_batch_workers(jobs: int) -> int:
+    """
+    Number of processes of a batch export: one per core, but not more
+    than there are jobs.
+    :param jobs: number of videos to export
+    :return: number of processes, at least 1
+    """
+    return max(1, min(jobs, available_cpus()))
+
+
+def export_job_size(export_params_data: DCVideoExportParams) -> int:
+    """
+    Estimated work of an export: the number of pixels of all frames.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :return: frames * width * height, 0 if the video can not be opened
+    """
+    cap = cv2.VideoCapture(export_params_data.input_path)
+    size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        * int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        * int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    )
+    cap.release()
+    return size
+
+
+def order_batch_jobs(
+    jobs: Sequence[DCVideoExportParams], longest_first: bool = False
+) -> List[int]:
+    """
+    Order in which the jobs of a batch are started.
+    Starting the longest jobs first keeps a long video from running alone
+    at the end of the batch while the other cores are idle.
+    :param jobs: export parameters of each job
+    :param longest_first: sort by export_job_size, largest first
+    :return: indices of the jobs
+    """
+    order = list(range(len(jobs)))
+    if longest_first:
+        sizes = [export_job_size(job) for job in jobs]
+        order.sort(key=lambda index: sizes[index], reverse=True)
+    return order
+
+
+def _run_batch_job(job: Tuple[int, DCVideoExportParams]) -> DCBatchJobResult:
+    """
+    Worker function of a batch process: export one video.
+    An error of the export is returned in the result, so the other jobs
+    of the batch go on.
+    :param job: (index, export parameters)
+    :return: DCBatchJobResult
+    """
+    index, export_params_data = job
+    result = DCBatchJobResult(
+        index=index,
+        input_path=export_params_data.input_path,
+        output_path=export_params_data.output_path,
+    )
+    start = time.perf_counter()
+    try:
+        summary = video_exporter_func(export_params_data)
+        result.status = summary.status
+        result.frames = summary.frames
+        result.encode_fps = summary.encode_fps
+    except Exception as error:
+        result.status = TypeExportStatus.error
+        result.error = repr(error)
+    result.seconds = time.perf_counter() - start
+    if result.seconds > 0:
+        result.fps = result.frames / result.seconds
+    return result
+
+
+def export_batch(
+    jobs: Sequence[DCVideoExportParams],
+    workers: Optional[int] = None,
+    longest_first: bool = False,
+) -> List[DCBatchJobResult]:
+    """
+    Export several videos on a pool of processes.
+    Each video is exported in one process (no segments) and, when more
+    than one process runs, with one filter thread. The OpenCV and BLAS
+    threads of each process are limited to its share of the cores (see
+    apply_resource_policy), so the batch does not start more threads than
+    there are cores.
+    :param jobs: export parameters of each video
+    :param workers: number of processes, default: default_batch_workers()
+    :param longest_first: start the largest videos first
+    :return: result of each job, in the order of jobs
+    """
+    if not jobs:
+        return []
+    workers = max(1, workers or default_batch_workers(len(jobs)))
+    tasks = []
+    for index in order_batch_jobs(jobs, longest_first):
+        job = jobs[index]
+        tasks.append(
+            (
+                index,
+                dataclasses.replace(
+                    job,
+                    # pool processes can not start processes of their own
+                    segments=1,
+                    filter_processes=0,
+                    filter_workers=(
+                        job.filter_workers or (1 if workers > 1 else None)
+                    ),
+                    # the queue and event of a job can not be sent to the pool
+                    progress_queue=None,
+                    cancel_event=None,
+                ),
+            )
+        )
+
+    if workers == 1:
+        results = [_run_batch_job(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(
+            workers,
+            initializer=apply_resource_policy,
+            initargs=(worker_threads(workers),),
+        ) as pool:
+            # one job at a time per process, so a free process takes the
+            # next job in the order
+            results = list(pool.imap_unordered(_run_batch_job, tasks, 1))
+    return sorted(results, key=lambda result: result.index)
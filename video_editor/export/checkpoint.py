@@ -0,0 +1,139 @@
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.dc_video import (
+    DCFilterStats,
+    DCSegmentResult,
+    DCStageStats,
+    DCVideoExportParams,
+)
+
+# frames per checkpoint segment used by the app (30 s at 30 fps)
+CHECKPOINT_FRAMES = 900
+
+MANIFEST_NAME = "manifest.json"
+
+
+def default_checkpoint_frames() -> Optional[int]:
+    """
+    Checkpoint segments used by the app: only if ffmpeg can join them
+    without encoding the video a second time.
+    :return: frames per segment or None (no checkpoints)
+    """
+    if shutil.which("ffmpeg") is None:
+        return None
+    return CHECKPOINT_FRAMES
+
+
+def checkpoint_dir(output_path: str) -> str:
+    """
+    Folder of the finished segments of an export, next to the output.
+    :param output_path: output video
+    :return: path of the folder
+    """
+    output_path = os.path.abspath(output_path)
+    return os.path.join(
+        os.path.dirname(output_path),
+        f".{os.path.basename(output_path)}.checkpoint",
+    )
+
+
+def checkpoint_key(
+    export_params_data: DCVideoExportParams,
+    ranges: Sequence[Tuple[int, Optional[int]]],
+) -> str:
+    """
+    Hash of everything that changes the segments of an export: input file
+    (path, size and modification time), filter values, output size and
+    frame ranges.
+    Segments of an earlier run are only used if the key is the same.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :param ranges: frame ranges of the segments
+    :return: hex digest
+    """
+    input_path = os.path.abspath(export_params_data.input_path)
+    stat = os.stat(input_path)
+    filter_params = export_params_data.filter_params
+    data = {
+        "input_path": input_path,
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime_ns,
+        "filter_params": (
+            dataclasses.asdict(filter_params) if filter_params else None
+        ),
+        "output_size": (
+            list(export_params_data.output_size)
+            if export_params_data.output_size
+            else None
+        ),
+        "ranges": [list(frame_range) for frame_range in ranges],
+    }
+    return hashlib.blake2b(
+        json.dumps(data, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
+
+def segment_result_from_dict(data: dict) -> DCSegmentResult:
+    """
+    DCSegmentResult from its JSON form (dataclasses.asdict).
+    :param data: dict of the result
+    :return: DCSegmentResult
+    """
+    data = dict(data)
+    stats = data.pop("filter_stats", None)
+    if stats is not None:
+        stats = DCFilterStats(
+            frames=stats["frames"],
+            skipped_stages=stats["skipped_stages"],
+            stages={
+                name: DCStageStats(**stage)
+                for name, stage in stats["stages"].items()
+            },
+        )
+    return DCSegmentResult(filter_stats=stats, **data)
+
+
+def load_manifest(directory: str, key: str) -> Dict[int, DCSegmentResult]:
+    """
+    Results of the segments finished by an earlier run.
+    :param directory: checkpoint folder
+    :param key: checkpoint_key of this export
+    :return: result of each finished segment by index, empty if there is
+    no manifest or it belongs to other parameters
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("key") != key:
+        return {}
+    results = [segment_result_from_dict(item) for item in manifest["segments"]]
+    return {result.index: result for result in results}
+
+
+def save_manifest(
+    directory: str, key: str, results: List[DCSegmentResult]
+) -> None:
+    """
+    Save the results of the finished segments. The file is replaced in
+    one step, so a killed process leaves the old or the new manifest.
+    :param directory: checkpoint folder
+    :param key: checkpoint_key of this export
+    :param results: results of the finished segments
+    :return: None
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as file:
+        json.dump(
+            {
+                "key": key,
+                "segments": [dataclasses.asdict(result) for result in results],
+            },
+            file,
+        )
+    os.replace(path + ".tmp", path)
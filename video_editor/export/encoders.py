@@ -0,0 +1,201 @@
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from fractions import Fraction
+from typing import BinaryIO, Optional, Tuple, Union
+
+import cv2
+import numpy.typing as npt
+from models.type_encoder import TypeEncoder
+
+# fourcc of the encoders written with cv2.VideoWriter
+OPENCV_FOURCC = {
+    TypeEncoder.mp4v: "mp4v",
+    TypeEncoder.mjpg: "MJPG",
+}
+
+# codecs (lower case fourcc) of an input that is copied as it is when no
+# filter is active, instead of being encoded again by the encoder
+# (OpenCV reports mp4v as fmp4)
+COPY_FOURCC = {
+    TypeEncoder.mp4v: {
+        "mp4v",
+        "fmp4",
+        "avc1",
+        "h264",
+        "hev1",
+        "hvc1",
+        "hevc",
+    },
+    TypeEncoder.mjpg: {"mjpg"},
+}
+
+
+class VideoEncoder(ABC):
+    """
+    Writes the frames of an export. Same interface as cv2.VideoWriter
+    (write, release), used by the export pipelines.
+    The time spent in write() is measured, so every encoder reports its
+    own throughput (encode_fps) and the fastest one can be chosen.
+    Subclasses implement _write.
+    """
+
+    encoder_type: Optional[TypeEncoder] = None
+
+    def __init__(self):
+        # written frames and time spent writing them
+        self.frames: int = 0
+        self.seconds: float = 0.0
+
+    def write(self, frame: npt.NDArray) -> None:
+        start = time.perf_counter()
+        self._write(frame)
+        self.seconds += time.perf_counter() - start
+        self.frames += 1
+
+    @abstractmethod
+    def _write(self, frame: npt.NDArray) -> None:
+        """Encode one frame."""
+
+    def release(self) -> None:
+        pass
+
+    @property
+    def encode_fps(self) -> float:
+        """Frames per second of write(), 0 before the first frame."""
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+class OpenCVEncoder(VideoEncoder):
+    """
+    Encoder using cv2.VideoWriter with the fourcc of the encoder type.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        encoder_type: TypeEncoder = TypeEncoder.mp4v,
+    ):
+        """
+        :param output_path: video file
+        :param fps: frames per second
+        :param frame_size: (width, height)
+        :param encoder_type: mp4v or mjpg
+        :raises IOError: if the file can not be written (e.g. unknown
+        file extension)
+        """
+        super().__init__()
+        self.encoder_type = encoder_type
+        # 4-character code of codec used to compress the frames
+        # *"mp4v" -> m,p,4,v
+        fourcc = cv2.VideoWriter_fourcc(*OPENCV_FOURCC[encoder_type])
+        self.writer = cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+        if not self.writer.isOpened():
+            raise IOError(f"could not open {output_path} for writing")
+
+    def _write(self, frame: npt.NDArray) -> None:
+        self.writer.write(frame)
+
+    def release(self) -> None:
+        self.writer.release()
+
+
+class Y4MEncoder(VideoEncoder):
+    """
+    Raw YUV 4:2:0 frames in a YUV4MPEG2 stream. Nothing is compressed, so
+    the encoder is fast but the stream is large. It is meant to be read
+    by another program, e.g. `run_export.py in.mp4 - --encoder y4m |
+    ffmpeg -i - out.mkv`.
+    """
+
+    encoder_type = TypeEncoder.y4m
+
+    def __init__(
+        self,
+        output: Union[str, BinaryIO],
+        fps: float,
+        frame_size: Tuple[int, int],
+    ):
+        """
+        :param output: file path, "-" for stdout, or a binary file object
+        (e.g. the stdin of a subprocess)
+        :param fps: frames per second
+        :param frame_size: (width, height), both even (4:2:0)
+        """
+        super().__init__()
+        width, height = frame_size
+        if width % 2 or height % 2:
+            raise ValueError(f"y4m needs an even frame size, not {frame_size}")
+        self._close = isinstance(output, str) and output != "-"
+        if output == "-":
+            self.stream = sys.stdout.buffer
+        elif isinstance(output, str):
+            self.stream = open(output, "wb")
+        else:
+            self.stream = output
+        rate = Fraction(fps or 30).limit_denominator(1001)
+        self.stream.write(
+            f"YUV4MPEG2 W{width} H{height} "
+            f"F{rate.numerator}:{rate.denominator} Ip A1:1 C420jpeg\n".encode()
+        )
+
+    def _write(self, frame: npt.NDArray) -> None:
+        self.stream.write(b"FRAME\n")
+        # Y plane, then U and V planes at half width and height
+        self.stream.write(cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420).data)
+
+    def release(self) -> None:
+        if self.stream is None:
+            return
+        if self._close:
+            self.stream.close()
+        else:
+            self.stream.flush()
+        self.stream = None
+
+
+def open_encoder(
+    output_path: Union[str, BinaryIO],
+    fps: float,
+    frame_size: Tuple[int, int],
+    encoder_type: TypeEncoder = TypeEncoder.mp4v,
+) -> VideoEncoder:
+    """
+    Open the encoder of an export.
+    :param output_path: video file (y4m: also "-" or a binary file object)
+    :param fps: frames per second
+    :param frame_size: (width, height)
+    :param encoder_type: TypeEncoder
+    :return: VideoEncoder
+    """
+    if encoder_type == TypeEncoder.y4m:
+        return Y4MEncoder(output_path, fps, frame_size)
+    return OpenCVEncoder(output_path, fps, frame_size, encoder_type)
+
+
+def input_can_be_copied(
+    input_path: str, output_path: str, encoder_type: TypeEncoder
+) -> bool:
+    """
+    Check if the input video is already what the encoder would write:
+    same container (file extension) and a codec of COPY_FOURCC.
+    :param input_path: input video
+    :param output_path: output video
+    :param encoder_type: encoder of the export
+    :return: True if the output can be a copy of the input
+    """
+    if not isinstance(output_path, str) or output_path == "-":
+        return False
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        return False
+    input_ext = os.path.splitext(input_path)[1].lower()
+    if input_ext != os.path.splitext(output_path)[1].lower():
+        return False
+    cap = cv2.VideoCapture(input_path)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)) if cap.isOpened() else 0
+    cap.release()
+    codec = fourcc.to_bytes(4, "little").decode("latin-1").lower()
+    return codec in COPY_FOURCC.get(encoder_type, set())
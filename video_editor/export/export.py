@@ -1,50 +1,250 @@
+import dataclasses
+import json
+import os
+import shutil
+import time
+from typing import Optional, Tuple
+
 import cv2
-from filter.filter_frame import get_filtered_frame
-from models.dc_video import DCVideoExportParams
+from filter.instrumentation import filter_stats
+from filter.plan import compile_filter_plan
+from models.dc_video import (
+    DCExportSummary,
+    DCFiltersParams,
+    DCVideoExportParams,
+)
+from models.type_encoder import TypeEncoder
+from models.type_status import TypeExportStatus
 
+from export.encoders import input_can_be_copied, open_encoder
+from export.pipeline import run_export_pipeline, run_process_pipeline
+from export.progress import ExportCancelled, ExportProgressReporter
+from export.scaling import (
+    ResizingReader,
+    export_filter_params,
+    export_frame_size,
+)
+from export.segments import (
+    FrameRangeReader,
+    count_video_frames,
+    export_frame_range,
+    segmented_export,
+)
 
-def video_exporter_func(
-    export_params_data: DCVideoExportParams,
-) -> None:
+
+def write_export_summary(summary: DCExportSummary, path: str) -> None:
     """
-    Worker function called to export a video.
-    The video from input_path is filtered with given params and saved in output_path video.
+    Save the summary of an export as JSON.
+    :param summary: DCExportSummary returned by video_exporter_func
+    :param path: output file
+    :return: None
+    """
+    with open(path, "w") as file:
+        json.dump(dataclasses.asdict(summary), file, indent=2)
+
+
+def is_identity_export(export_params_data: DCVideoExportParams) -> bool:
+    """
+    Check if the export can copy the input: no filter is active, the
+    whole video is exported at the same size and the input has the
+    container and codec the encoder would write.
     :param export_params_data: Dataclass object with video parameters and filter values.
-    :return:
+    :return: True if the output can be a copy of the input
     """
+    filter_params = export_params_data.filter_params or DCFiltersParams()
+    if not compile_filter_plan(filter_params).is_identity:
+        return False
+    total_frames = count_video_frames(export_params_data.input_path)
+    if export_frame_range(export_params_data, total_frames) != (0, None):
+        return False
+    if export_params_data.output_size:
+        cap = cv2.VideoCapture(export_params_data.input_path)
+        source_size = (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+        cap.release()
+        if tuple(export_params_data.output_size) != source_size:
+            return False
+    return input_can_be_copied(
+        export_params_data.input_path,
+        export_params_data.output_path,
+        export_params_data.encoder,
+    )
 
+
+def export_single_process(
+    export_params_data: DCVideoExportParams,
+    reporter: Optional[ExportProgressReporter] = None,
+) -> Tuple[int, float]:
+    """
+    Filter the whole video in this process (decode, filter and encode
+    threads, see run_export_pipeline), or with filter_processes in filter
+    processes that get the frames in shared memory (run_process_pipeline).
+    With output_size the frames are scaled before they are filtered.
+    With start_frame the video is opened at this frame (the decoder seeks
+    to the key frame before it), with end_frame it stops there, so only
+    the frames of the clip are decoded.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :param reporter: optional reporter called after every written batch
+    :return: (number of written frames, seconds spent in the encoder)
+    """
     # get video using input_path from data object
     cap = cv2.VideoCapture(export_params_data.input_path)
-    # 4-character code of codec used to compress the frames (mp4 format)
-    # *"mp4v" -> m,p,4,v
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
 
     # get video data, also possible to get them from DCVideoExportParams.video_data
     fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    frame_size = (frame_width, frame_height)
+    source_size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    )
+    frame_size = export_frame_size(source_size, export_params_data.output_size)
+    frame_width, frame_height = frame_size
+    # filters run at the output size, with values scaled to it
+    filter_params = export_filter_params(
+        export_params_data.filter_params, source_size, frame_size
+    )
+    start, end = export_frame_range(
+        export_params_data, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    )
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    reader = cap
+    if end is not None:
+        reader = FrameRangeReader(cap, end - start)
+    if frame_size != source_size:
+        reader = ResizingReader(reader, source_size, frame_size)
 
     # video output with mp4 format, output path, fps and frame size (tuple)
-    out = cv2.VideoWriter(
+    out = open_encoder(
         export_params_data.output_path,
-        fourcc,
         fps,
         frame_size,
+        export_params_data.encoder,
     )
 
-    # iterate until nothing more to read
-    while True:
-        ret, frame = cap.read()
-        # nothing more to read
-        if not ret:
-            break
+    pipeline_args = dict(
+        frame_shape=(frame_height, frame_width, 3),
+        batch_size=export_params_data.batch_size or 1,
+        queue_size=export_params_data.queue_size,
+        progress=reporter.update if reporter is not None else None,
+        cancel=export_params_data.cancel_event,
+    )
+    try:
+        if export_params_data.filter_processes:
+            # the processes build their own filter plan
+            frame_count = run_process_pipeline(
+                reader,
+                out,
+                filter_params,
+                workers=export_params_data.filter_processes,
+                **pipeline_args,
+            )
+        else:
+            # decode, filter and encode run in parallel threads, frames are
+            # decoded and filtered in batches and written in their order
+            frame_count = run_export_pipeline(
+                reader,
+                out,
+                # filters to run, built once and used for every frame
+                compile_filter_plan(filter_params),
+                workers=export_params_data.filter_workers,
+                **pipeline_args,
+            )
+    finally:
+        # at the end release both files (original video and new video),
+        # also when the export was cancelled
+        cap.release()
+        out.release()
+    return frame_count, out.seconds
 
-        # apply filters, pass filter values as parameter
-        frame = get_filtered_frame(frame, export_params_data.filter_params)
-        # write
-        out.write(frame)
 
-    # at the end release both files (original video and new video)
-    cap.release()
-    out.release()
+def video_exporter_func(
+    export_params_data: DCVideoExportParams,
+) -> DCExportSummary:
+    """
+    Worker function called to export a video.
+    The video from input_path is filtered with given params and saved in output_path video.
+    With segments > 1 the video is split into frame ranges filtered by
+    parallel processes (see segmented_export). If the segments do not
+    match a sequential export the video is exported in this process.
+    With checkpoint_frames the frame ranges are kept until the export is
+    done, so a rerun after a killed export resumes from them.
+    Segments are joined as mp4 files, other encoders (see TypeEncoder)
+    always export in this process.
+    The time of each filter is recorded during the export and returned in
+    the summary, which is also saved to summary_path if it is set.
+    Progress messages go to progress_queue if it is set. When cancel_event
+    is set the export stops, closes the files and deletes the output.
+    Without active filters the frames are not filtered, and if the input
+    already has the container and codec of the encoder (see
+    input_can_be_copied) it is copied instead of being encoded again.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :return: DCExportSummary
+    """
+    start = time.perf_counter()
+    total_frames = count_video_frames(export_params_data.input_path)
+    clip_start, clip_end = export_frame_range(export_params_data, total_frames)
+    reporter = ExportProgressReporter(
+        export_params_data.progress_queue,
+        # frames of the clip
+        max(0, (total_frames if clip_end is None else clip_end) - clip_start),
+    )
+    segments = 1
+    encode_seconds = 0.0
+    copied = is_identity_export(export_params_data)
+    # filter stats of this export only, switched back on any error
+    stats_enabled = filter_stats.enabled
+    filter_stats.reset()
+    filter_stats.enabled = True
+    try:
+        segmented = None
+        parallel = (export_params_data.segments or 1) > 1
+        if (
+            not copied
+            and export_params_data.encoder == TypeEncoder.mp4v
+            and (parallel or export_params_data.checkpoint_frames)
+        ):
+            segmented = segmented_export(export_params_data, reporter)
+        if copied:
+            # nothing to filter or encode
+            shutil.copyfile(
+                export_params_data.input_path, export_params_data.output_path
+            )
+            frame_count = reporter.total_frames
+            stats = filter_stats.snapshot()
+        elif segmented is not None:
+            frame_count, segments, stats, encode_seconds = segmented
+        else:
+            frame_count, encode_seconds = export_single_process(
+                export_params_data, reporter
+            )
+            stats = filter_stats.snapshot()
+        status = TypeExportStatus.ok if frame_count else TypeExportStatus.error
+    except ExportCancelled:
+        # no partial video is left behind
+        if os.path.exists(export_params_data.output_path):
+            os.remove(export_params_data.output_path)
+        frame_count = reporter.frames_done
+        stats = filter_stats.snapshot()
+        encode_seconds = 0.0
+        status = TypeExportStatus.cancelled
+    finally:
+        filter_stats.enabled = stats_enabled
+
+    reporter.finish(frame_count, status)
+    seconds = time.perf_counter() - start
+    summary = DCExportSummary(
+        status=status,
+        frames=frame_count,
+        seconds=seconds,
+        fps=frame_count / seconds if seconds > 0 else 0.0,
+        filter_stats=stats,
+        segments=segments,
+        encoder=export_params_data.encoder,
+        encode_fps=frame_count / encode_seconds if encode_seconds > 0 else 0.0,
+        copied=copied,
+    )
+    if export_params_data.summary_path:
+        write_export_summary(summary, export_params_data.summary_path)
+    return summary
@@ -0,0 +1,432 @@
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+from filter.buffer_pool import FrameBufferPool
+from filter.instrumentation import filter_stats
+from filter.plan import FilterPlan, compile_filter_plan
+from models.dc_video import DCFiltersParams
+
+from export.encoders import VideoEncoder
+from export.progress import ExportCancelled
+from export.resources import available_cpus
+from export.shared_ring import SharedFrameRing
+
+# batches waiting between the stages (decoded, not yet filtered)
+PIPELINE_QUEUE_SIZE = 4
+
+# how often (s) blocked stages check if the pipeline was stopped
+_STOP_POLL_SECONDS = 0.1
+
+
+def default_filter_workers() -> int:
+    """
+    Number of filter threads used by the export pipeline:
+    one core is left for decoding and one for encoding.
+    Follows the limit of an export worker (see apply_resource_policy).
+    :return: number of threads, at least 1
+    """
+    return max(1, available_cpus() - 2)
+
+
+def read_frame(cap: cv2.VideoCapture, buffer: npt.NDArray) -> bool:
+    """
+    Decode the next frame into a buffer of a batch.
+    OpenCV allocates a new array when the decoded frame does not fit the
+    buffer (e.g. a rotated stream or another size than the video reports),
+    the buffer would then keep the frame of an earlier batch. A new array
+    of the same shape is copied into the buffer, another shape is an error.
+    :param cap: opened video (or a reader like it)
+    :param buffer: frame of the batch, (height, width, 3)
+    :return: False at the end of the video
+    """
+    ret, frame = cap.read(buffer)
+    if not ret:
+        return False
+    if not np.may_share_memory(frame, buffer):
+        if frame.shape != buffer.shape or frame.dtype != buffer.dtype:
+            raise ValueError(
+                f"decoded frame {frame.shape} {frame.dtype} does not match "
+                f"the export frames {buffer.shape} {buffer.dtype}"
+            )
+        buffer[...] = frame
+    return True
+
+
+def run_export_pipeline(
+    cap: cv2.VideoCapture,
+    writer: VideoEncoder,
+    filter_plan: FilterPlan,
+    frame_shape: Tuple[int, int, int],
+    batch_size: int = 4,
+    workers: Optional[int] = None,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+    cancel: Optional[Any] = None,
+) -> int:
+    """
+    Decode, filter and encode a video in parallel stages:
+
+    decode thread → queue → filter threads → reorder → encode (this thread)
+
+    OpenCV releases the GIL while decoding, filtering and encoding, so the
+    stages run at the same time and the throughput approaches the one of
+    the slowest stage instead of the sum of all three.
+    Frames are passed on in batches (see FilterPlan.apply_batch). Batches
+    are numbered when decoded and written in this order, whichever filter
+    thread finishes first. At most queue_size + workers batches are in
+    flight, their buffers are reused.
+    An error in any stage stops the pipeline and is raised here, the same
+    for ExportCancelled once cancel is set (checked before every batch).
+    If the plan has no filters, the decoded batches are written as they
+    are, with one thread passing them on.
+    :param cap: opened video to read
+    :param writer: opened encoder (or cv2.VideoWriter) to write
+    :param filter_plan: filters for every frame
+    :param frame_shape: (height, width, 3) of the frames
+    :param batch_size: frames decoded and filtered together
+    :param workers: number of filter threads, default: default_filter_workers()
+    :param queue_size: decoded batches that can wait for a filter thread
+    :param progress: optional function called with the number of written
+    frames after every batch
+    :param cancel: optional threading or multiprocessing Event
+    :return: number of written frames
+    """
+    workers = max(1, workers or default_filter_workers())
+    if filter_plan.is_identity:
+        workers = 1
+    batch_size = max(1, batch_size)
+    batch_shape = (batch_size,) + tuple(frame_shape)
+    max_in_flight = max(1, queue_size) + workers
+
+    # decoded and filtered buffer of every batch in flight
+    buffer_pool = FrameBufferPool(max_per_key=max_in_flight)
+    in_flight = threading.Semaphore(max_in_flight)
+    # (number, frames, count) or None when the decoder is done
+    decode_queue: queue.Queue = queue.Queue()
+    # (number, filtered frames, count) or None when a worker is done
+    encode_queue: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def fail(error: BaseException) -> None:
+        errors.append(error)
+        stop.set()
+
+    def decode() -> None:
+        number = 0
+        try:
+            while not stop.is_set():
+                if cancel is not None and cancel.is_set():
+                    fail(ExportCancelled())
+                    break
+                # wait until a batch was written, so memory stays bounded
+                if not in_flight.acquire(timeout=_STOP_POLL_SECONDS):
+                    continue
+                frames = buffer_pool.acquire(batch_shape)
+                count = 0
+                while count < batch_size:
+                    if not read_frame(cap, frames[count]):
+                        break
+                    count += 1
+                if count == 0:
+                    buffer_pool.release(frames)
+                    in_flight.release()
+                    break
+                decode_queue.put((number, frames, count))
+                number += 1
+                # end of video
+                if count < batch_size:
+                    break
+        except BaseException as error:
+            fail(error)
+        finally:
+            # one end marker for every filter thread
+            for _ in range(workers):
+                decode_queue.put(None)
+
+    def filter_batches() -> None:
+        while True:
+            item = decode_queue.get()
+            if item is None:
+                break
+            number, frames, count = item
+            # after an error the rest is only drained
+            if stop.is_set():
+                buffer_pool.release(frames)
+                continue
+            # nothing to filter, the decoded frames are written
+            if filter_plan.is_identity:
+                encode_queue.put((number, frames, count))
+                continue
+            filtered = buffer_pool.acquire(batch_shape)
+            try:
+                filter_plan.apply_batch(frames[:count], out=filtered[:count])
+            except BaseException as error:
+                fail(error)
+                buffer_pool.release(filtered)
+                continue
+            finally:
+                buffer_pool.release(frames)
+            encode_queue.put((number, filtered, count))
+        encode_queue.put(None)
+
+    threads = [threading.Thread(target=decode, name="export-decode")]
+    threads += [
+        threading.Thread(target=filter_batches, name=f"export-filter-{i}")
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # encode: write the batches in the order they were decoded
+    pending: Dict[int, Tuple[npt.NDArray, int]] = {}
+    next_number = 0
+    written = 0
+    finished_workers = 0
+    while finished_workers < workers:
+        item = encode_queue.get()
+        if item is None:
+            finished_workers += 1
+            continue
+        number, filtered, count = item
+        pending[number] = (filtered, count)
+        while next_number in pending:
+            filtered, count = pending.pop(next_number)
+            if not stop.is_set():
+                try:
+                    for frame in filtered[:count]:
+                        writer.write(frame)
+                    written += count
+                    if progress is not None:
+                        progress(written)
+                except BaseException as error:
+                    fail(error)
+            buffer_pool.release(filtered)
+            in_flight.release()
+            next_number += 1
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return written
+
+
+def _filter_process(
+    decoded: SharedFrameRing,
+    filtered: SharedFrameRing,
+    filter_params: DCFiltersParams,
+    task_queue,
+    done_queue,
+    record_stats: bool,
+) -> None:
+    """
+    Worker function of a filter process of run_process_pipeline: filters
+    the batch in a slot of `decoded` into the same slot of `filtered`.
+    Messages to done_queue: ("done", slot, number, count),
+    ("error", text) and at the end ("stats", DCFilterStats).
+    """
+    filter_stats.reset()
+    filter_stats.enabled = record_stats
+    plan = compile_filter_plan(filter_params)
+    try:
+        while True:
+            item = task_queue.get()
+            if item is None:
+                break
+            slot, number, count = item
+            try:
+                plan.apply_batch(
+                    decoded.slot(slot)[:count],
+                    out=filtered.slot(slot)[:count],
+                )
+            except Exception as error:
+                done_queue.put(("error", repr(error)))
+                continue
+            done_queue.put(("done", slot, number, count))
+        done_queue.put(("stats", filter_stats.snapshot()))
+    finally:
+        decoded.close()
+        filtered.close()
+
+
+def run_process_pipeline(
+    cap: cv2.VideoCapture,
+    writer: VideoEncoder,
+    filter_params: DCFiltersParams,
+    frame_shape: Tuple[int, int, int],
+    batch_size: int = 4,
+    workers: Optional[int] = None,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+    cancel: Optional[Any] = None,
+) -> int:
+    """
+    Same as run_export_pipeline, but the filters run in processes:
+
+    decode thread → shared slots → filter processes → shared slots → encode
+
+    For filters that hold the GIL (numpy code) the processes scale where
+    threads do not. Frames are not sent through the queues: the decoder
+    reads each batch into a free slot of a SharedFrameRing, the processes
+    filter it into the same slot of a second ring and only (slot, batch
+    number, frame count) is passed on. A slot is free again when its
+    batch was written. The time of the filters in the processes is added
+    to filter_stats of this process.
+    Can not be used in a daemon process (e.g. a multiprocessing.Pool).
+    :param cap: opened video to read
+    :param writer: opened encoder (or cv2.VideoWriter) to write
+    :param filter_params: filter values, each process compiles its plan
+    :param frame_shape: (height, width, 3) of the frames
+    :param batch_size: frames decoded and filtered together
+    :param workers: number of filter processes, default: default_filter_workers()
+    :param queue_size: decoded batches that can wait for a filter process
+    :param progress: optional function called with the number of written
+    frames after every batch
+    :param cancel: optional threading or multiprocessing Event
+    :return: number of written frames
+    """
+    workers = max(1, workers or default_filter_workers())
+    batch_size = max(1, batch_size)
+    batch_shape = (batch_size,) + tuple(frame_shape)
+    slots = max(1, queue_size) + workers
+
+    decoded = SharedFrameRing(slots, batch_shape)
+    filtered = SharedFrameRing(slots, batch_shape)
+    # slots that can be filled by the decoder (only used in this process)
+    free_slots: queue.Queue = queue.Queue()
+    for slot in range(slots):
+        free_slots.put(slot)
+    # (slot, number, count) or None when the decoder is done
+    task_queue = multiprocessing.Queue()
+    done_queue = multiprocessing.Queue()
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def fail(error: BaseException) -> None:
+        errors.append(error)
+        stop.set()
+
+    def decode() -> None:
+        number = 0
+        try:
+            while not stop.is_set():
+                if cancel is not None and cancel.is_set():
+                    fail(ExportCancelled())
+                    break
+                # wait until a batch was written, so memory stays bounded
+                try:
+                    slot = free_slots.get(timeout=_STOP_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                frames = decoded.slot(slot)
+                count = 0
+                while count < batch_size:
+                    if not read_frame(cap, frames[count]):
+                        break
+                    count += 1
+                del frames
+                if count == 0:
+                    break
+                task_queue.put((slot, number, count))
+                number += 1
+                # end of video
+                if count < batch_size:
+                    break
+        except BaseException as error:
+            fail(error)
+        finally:
+            # one end marker for every filter process
+            for _ in range(workers):
+                task_queue.put(None)
+
+    processes = [
+        multiprocessing.Process(
+            target=_filter_process,
+            args=(
+                decoded,
+                filtered,
+                filter_params,
+                task_queue,
+                done_queue,
+                filter_stats.enabled,
+            ),
+            name=f"export-filter-{i}",
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    decode_thread = threading.Thread(target=decode, name="export-decode")
+    decode_thread.start()
+
+    # encode: write the batches in the order they were decoded
+    pending: Dict[int, Tuple[int, int]] = {}
+    next_number = 0
+    written = 0
+    finished_workers = 0
+    try:
+        while finished_workers < workers:
+            try:
+                item = done_queue.get(timeout=_STOP_POLL_SECONDS)
+            except queue.Empty:
+                # a process that ends normally sends its stats first
+                if any(process.exitcode for process in processes):
+                    raise RuntimeError("a filter process ended unexpectedly")
+                continue
+            if item[0] == "stats":
+                filter_stats.add(item[1])
+                finished_workers += 1
+                continue
+            if item[0] == "error":
+                fail(RuntimeError(f"filter process: {item[1]}"))
+                continue
+            _, slot, number, count = item
+            pending[number] = (slot, count)
+            while next_number in pending:
+                slot, count = pending.pop(next_number)
+                if not stop.is_set():
+                    try:
+                        for frame in filtered.slot(slot)[:count]:
+                            writer.write(frame)
+                        written += count
+                        if progress is not None:
+                            progress(written)
+                    except BaseException as error:
+                        fail(error)
+                free_slots.put(slot)
+                next_number += 1
+    except BaseException as error:
+        fail(error)
+    finally:
+        stop.set()
+        decode_thread.join()
+        # after an error the processes finish their batches, their
+        # messages are read so they are not blocked when they exit
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(
+            process.is_alive() for process in processes
+        ):
+            try:
+                done_queue.get(timeout=_STOP_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        for messages in (task_queue, done_queue):
+            messages.close()
+            messages.cancel_join_thread()
+        decoded.close()
+        filtered.close()
+    if errors:
+        raise errors[0]
+    return written
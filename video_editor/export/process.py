@@ -1,9 +1,38 @@
+import dataclasses
 import multiprocessing
-from typing import Union
+from typing import List, Union
 
-from models.dc_video import DCVideoExportParams
+from models.dc_video import DCExportSummary, DCVideoExportParams
 
 from export.export import video_exporter_func
+from export.resources import apply_resource_policy, worker_threads
+
+# export processes started by export_process
+_export_processes: List[multiprocessing.Process] = []
+
+
+def running_exports() -> int:
+    """
+    Number of export processes started by export_process that still run.
+    :return: number of processes
+    """
+    _export_processes[:] = [
+        process for process in _export_processes if process.is_alive()
+    ]
+    return len(_export_processes)
+
+
+def export_worker(export_params_data: DCVideoExportParams) -> DCExportSummary:
+    """
+    Target of an export process: limits the threads of the process (see
+    apply_resource_policy), then exports the video.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :return: DCExportSummary
+    """
+    apply_resource_policy(
+        export_params_data.cpu_threads, export_params_data.cpu_affinity
+    )
+    return video_exporter_func(export_params_data)
 
 
 def export_process(
@@ -12,6 +41,8 @@ def export_process(
     """
     Function that is used to start a background process with multiprocessing.
     A function that exports a filtered video is started in the background.
+    Without cpu_threads the process gets an even share of the cores with
+    the exports that are already running.
     :param export_params_data:
     :return: multiprocessing.Process instance if worker start succefully, otherwise None.
     """
@@ -19,13 +50,20 @@ def export_process(
     if not export_params_data.output_path:
         return None
 
+    if export_params_data.cpu_threads is None:
+        export_params_data = dataclasses.replace(
+            export_params_data,
+            cpu_threads=worker_threads(running_exports() + 1),
+        )
+
     # Run export in background process
     export_process = multiprocessing.Process(
-        target=video_exporter_func,
+        target=export_worker,
         args=(export_params_data,),
     )
     # start background task
     export_process.start()
+    _export_processes.append(export_process)
 
     # return process instance
     return export_process
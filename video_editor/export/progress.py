@@ -0,0 +1,99 @@
+import time
+from typing import Any, Optional
+
+from filter.instrumentation import filter_stats
+from models.dc_video import DCExportProgress
+from models.type_status import TypeExportStatus
+
+# seconds between two progress messages
+PROGRESS_INTERVAL = 0.25
+
+
+class ExportCancelled(Exception):
+    """
+    Raised in the export when the cancel event was set.
+    """
+
+
+class ExportProgressReporter:
+    """
+    Puts DCExportProgress messages into the progress queue of an export:
+    frames done, fps, remaining time and the filter stats.
+    Messages while the export runs are sent at most every interval seconds,
+    so the queue is not flooded with one message per frame.
+    """
+
+    def __init__(
+        self,
+        progress_queue: Optional[Any],
+        total_frames: int,
+        interval: float = PROGRESS_INTERVAL,
+        with_filter_stats: bool = True,
+    ):
+        """
+        :param progress_queue: multiprocessing.Queue or None (no messages)
+        :param total_frames: frame count of the video
+        :param interval: seconds between two messages
+        :param with_filter_stats: send the filter stats of this process
+        """
+        self.progress_queue = progress_queue
+        self.total_frames = total_frames
+        self.interval = interval
+        self.with_filter_stats = with_filter_stats
+        self.start = time.perf_counter()
+        # written frames of the last update
+        self.frames_done = 0
+        self._last_sent = 0.0
+
+    def message(
+        self, frames_done: int, status: TypeExportStatus
+    ) -> DCExportProgress:
+        """
+        Progress of the export.
+        :param frames_done: written frames
+        :param status: status of the export
+        :return: DCExportProgress
+        """
+        elapsed = time.perf_counter() - self.start
+        fps = frames_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if fps > 0 and self.total_frames:
+            eta = max(0, self.total_frames - frames_done) / fps
+        return DCExportProgress(
+            status=status,
+            frames_done=frames_done,
+            total_frames=self.total_frames,
+            fps=fps,
+            eta_seconds=eta,
+            filter_stats=(
+                filter_stats.snapshot() if self.with_filter_stats else None
+            ),
+        )
+
+    def update(self, frames_done: int) -> None:
+        """
+        Called after each written batch, sends a message if the last one
+        is older than the interval.
+        :param frames_done: written frames
+        :return: None
+        """
+        self.frames_done = frames_done
+        if self.progress_queue is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_sent < self.interval:
+            return
+        self._last_sent = now
+        self.progress_queue.put(
+            self.message(frames_done, TypeExportStatus.running)
+        )
+
+    def finish(self, frames_done: int, status: TypeExportStatus) -> None:
+        """
+        Send the last message of the export.
+        :param frames_done: written frames
+        :param status: ok, error or cancelled
+        :return: None
+        """
+        if self.progress_queue is not None:
+            self.progress_queue.put(self.message(frames_done, status))
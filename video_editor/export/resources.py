@@ -0,0 +1,80 @@
+import os
+from typing import Optional, Sequence
+
+import cv2
+from filter.tiling import set_tile_workers
+from threadpoolctl import threadpool_limits
+
+# thread count variables of the OpenMP / BLAS libraries, only read when a
+# library is loaded: they reach libraries loaded later in this process and
+# the processes it starts. numpy's BLAS is already loaded when the policy is
+# applied, threadpoolctl changes its thread count directly
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# cores this process may use, set by apply_resource_policy
+_cpu_budget: Optional[int] = None
+# limits of threadpoolctl, kept so they are not restored
+_blas_limits = None
+
+
+def available_cpus() -> int:
+    """
+    Number of cores this process may use: the threads set by
+    apply_resource_policy, otherwise the cores it may run on.
+    :return: number of cores, at least 1
+    """
+    if _cpu_budget is not None:
+        return _cpu_budget
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def worker_threads(workers: int, cpus: Optional[int] = None) -> int:
+    """
+    Threads of each worker when the workers share the cores evenly.
+    :param workers: number of worker processes running at the same time
+    :param cpus: number of cores, default: available_cpus()
+    :return: number of threads, at least 1
+    """
+    return max(1, (cpus or available_cpus()) // max(1, workers))
+
+
+def apply_resource_policy(
+    threads: Optional[int] = None,
+    cpu_affinity: Optional[Sequence[int]] = None,
+) -> int:
+    """
+    Limit the threads of this process, called when an export worker
+    starts. Without a limit every worker starts a thread per core in
+    OpenCV, in BLAS and for the filter tiles, and several workers slow
+    each other down with far more threads than cores.
+    Sets cv2.setNumThreads, the threads of the loaded BLAS / OpenMP
+    libraries (threadpoolctl) and THREAD_ENV_VARS for the ones loaded later,
+    the tile threads and the budget of available_cpus(), so the default
+    filter threads follow the limit.
+    :param threads: threads of this process, default: one per core of
+    cpu_affinity, otherwise available_cpus()
+    :param cpu_affinity: optional cores to pin the process to, only where
+    the OS supports it (Linux)
+    :return: number of threads set
+    """
+    global _cpu_budget, _blas_limits
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_affinity)
+    if not threads:
+        threads = len(cpu_affinity) if cpu_affinity else available_cpus()
+    threads = max(1, threads)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    _blas_limits = threadpool_limits(limits=threads)
+    cv2.setNumThreads(threads)
+    set_tile_workers(threads)
+    _cpu_budget = threads
+    return threads
@@ -0,0 +1,79 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+from filter.preview import scale_filter_params
+from models.dc_video import DCFiltersParams
+
+
+def export_frame_size(
+    source_size: Tuple[int, int], output_size: Optional[Tuple[int, int]]
+) -> Tuple[int, int]:
+    """
+    Frame size of the exported video.
+    :param source_size: (width, height) of the input video
+    :param output_size: (width, height) wanted, None: size of the input
+    :return: (width, height)
+    """
+    if not output_size:
+        return tuple(source_size)
+    width, height = output_size
+    if width <= 0 or height <= 0:
+        raise ValueError(f"invalid output size {output_size}")
+    return int(width), int(height)
+
+
+def export_filter_params(
+    filter_data_params: DCFiltersParams,
+    source_size: Tuple[int, int],
+    frame_size: Tuple[int, int],
+) -> DCFiltersParams:
+    """
+    Filter values for frames scaled from source_size to frame_size, so the
+    export looks like the filtered full resolution video scaled down (see
+    scale_filter_params).
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param source_size: (width, height) of the input video
+    :param frame_size: (width, height) of the exported video
+    :return: DCFiltersParams for the scaled frames
+    """
+    if not filter_data_params or not source_size[0] or not source_size[1]:
+        return filter_data_params
+    scale = min(frame_size[0] / source_size[0], frame_size[1] / source_size[1])
+    return scale_filter_params(filter_data_params, scale)
+
+
+class ResizingReader:
+    """
+    Reads frames from a cv2.VideoCapture (or a reader like it) and scales
+    them to the frame size of the export, so the filters run at the
+    output resolution instead of the one of the input.
+    INTER_AREA averages the source pixels (no aliasing when shrinking).
+    """
+
+    def __init__(
+        self, cap, source_size: Tuple[int, int], size: Tuple[int, int]
+    ):
+        """
+        :param cap: opened video to read
+        :param source_size: (width, height) of the decoded frames
+        :param size: (width, height) of the returned frames
+        """
+        self.cap = cap
+        self.size = tuple(size)
+        # decoded frame, reused for every read
+        self._source = np.empty(
+            (source_size[1], source_size[0], 3), dtype=np.uint8
+        )
+
+    def read(self, image: Optional[npt.NDArray] = None):
+        ret, frame = self.cap.read(self._source)
+        if not ret:
+            return False, None
+        if frame is not self._source:
+            # the reader did not use the buffer (e.g. other frame size)
+            self._source = frame
+        return True, cv2.resize(
+            frame, self.size, dst=image, interpolation=cv2.INTER_AREA
+        )
@@ -0,0 +1,529 @@
+import dataclasses
+import hashlib
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy.typing as npt
+from filter.instrumentation import filter_stats, merge_filter_stats
+from filter.plan import compile_filter_plan
+from models.dc_video import (
+    DCFilterStats,
+    DCSegmentResult,
+    DCSegmentTask,
+    DCVideoExportParams,
+)
+
+from export.checkpoint import (
+    checkpoint_dir,
+    checkpoint_key,
+    load_manifest,
+    save_manifest,
+)
+from export.encoders import open_encoder
+from export.pipeline import run_export_pipeline
+from export.progress import (
+    PROGRESS_INTERVAL,
+    ExportCancelled,
+    ExportProgressReporter,
+)
+from export.resources import (
+    apply_resource_policy,
+    available_cpus,
+    worker_threads,
+)
+from export.scaling import (
+    ResizingReader,
+    export_filter_params,
+    export_frame_size,
+)
+
+# segments shorter than this are not worth a process of their own
+SEGMENT_MIN_FRAMES = 60
+
+
+def frame_hash(frame: Optional[npt.NDArray]) -> Optional[str]:
+    """
+    Hash of the pixels of a frame, used to compare frames of processes.
+    :param frame: decoded frame or None
+    :return: hex digest or None
+    """
+    if frame is None:
+        return None
+    return hashlib.blake2b(frame.tobytes(), digest_size=16).hexdigest()
+
+
+def split_frame_ranges(
+    total_frames: int, segments: int, min_frames: Optional[int] = None
+) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split the frames of a video into consecutive ranges of about the same
+    length. The last range has no end and is read until the end of the
+    video, so frames are not lost when the frame count of the container
+    is too low.
+    :param total_frames: frame count of the video
+    :param segments: wanted number of ranges
+    :param min_frames: minimum number of frames per range,
+    default: SEGMENT_MIN_FRAMES
+    :return: list of (start, end) with end exclusive, None for the last
+    """
+    min_frames = max(1, min_frames or SEGMENT_MIN_FRAMES)
+    segments = max(1, min(segments, (total_frames or 0) // min_frames))
+    step = -(-total_frames // segments) if total_frames else 0
+    ranges = []
+    for index in range(segments):
+        start = index * step
+        end = start + step if index < segments - 1 else None
+        ranges.append((start, end))
+    return ranges
+
+
+def export_frame_range(
+    export_params_data: DCVideoExportParams, total_frames: int
+) -> Tuple[int, Optional[int]]:
+    """
+    Frame range of the clip to export (start_frame, end_frame).
+    An end at or after the last frame is returned as None, the video is
+    then read until it ends (the frame count of the container can be too
+    low).
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :param total_frames: frame count of the video
+    :return: (start, end) with end exclusive, None: to the end
+    """
+    start = export_params_data.start_frame or 0
+    end = export_params_data.end_frame
+    if start < 0 or (end is not None and end <= start):
+        raise ValueError(f"invalid frame range {start} - {end}")
+    if end is not None and total_frames and end >= total_frames:
+        end = None
+    return start, end
+
+
+class FrameRangeReader:
+    """
+    Reads at most a given number of frames from a cv2.VideoCapture,
+    for the export pipeline of a segment. The hash of the first frame is
+    kept to check where the seek landed.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, frames: Optional[int] = None):
+        self.cap = cap
+        # frames left, None: until the end of the video
+        self.remaining = frames
+        self.first_frame_hash: Optional[str] = None
+        self._first = True
+
+    def read(self, image: Optional[npt.NDArray] = None):
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False, None
+            self.remaining -= 1
+        ret, frame = self.cap.read(image)
+        if ret and self._first:
+            self.first_frame_hash = frame_hash(frame)
+        self._first = False
+        return ret, frame
+
+
+def export_segment(
+    task: DCSegmentTask, progress: Optional[Callable[[int], None]] = None
+) -> DCSegmentResult:
+    """
+    Worker function of a segment process: filter the frame range of the
+    task and write it to its own file.
+    The frame after the range is read without seeking, its hash has to be
+    the same as the first frame of the next segment (which is found by
+    seeking), otherwise the seek was not exact.
+    :param task: DCSegmentTask
+    :param progress: optional function called with the written frames,
+    default: put (index, written frames) into task.progress_queue
+    :return: DCSegmentResult
+    """
+    export_params = task.export_params
+    filter_stats.reset()
+    filter_stats.enabled = True
+
+    cap = cv2.VideoCapture(export_params.input_path)
+    if task.start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, task.start)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    source_size = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    )
+    frame_size = export_frame_size(source_size, export_params.output_size)
+    frame_width, frame_height = frame_size
+    out = open_encoder(task.output_path, fps, frame_size)
+
+    if progress is None and task.progress_queue is not None:
+
+        def progress(written: int) -> None:
+            task.progress_queue.put((task.index, written))
+
+    frames = None if task.end is None else task.end - task.start
+    # frames are hashed before they are scaled
+    reader = FrameRangeReader(cap, frames)
+    source = reader
+    if frame_size != source_size:
+        source = ResizingReader(reader, source_size, frame_size)
+    try:
+        written = run_export_pipeline(
+            source,
+            out,
+            compile_filter_plan(
+                export_filter_params(
+                    export_params.filter_params, source_size, frame_size
+                )
+            ),
+            (frame_height, frame_width, 3),
+            batch_size=export_params.batch_size or 1,
+            # the segments already use all cores
+            workers=export_params.filter_workers or 1,
+            queue_size=export_params.queue_size,
+            progress=progress,
+            cancel=task.cancel_event,
+        )
+
+        next_frame_hash = None
+        if task.end is not None:
+            ret, frame = cap.read()
+            next_frame_hash = frame_hash(frame) if ret else None
+    finally:
+        cap.release()
+        out.release()
+    return DCSegmentResult(
+        index=task.index,
+        frames=written,
+        first_frame_hash=reader.first_frame_hash,
+        next_frame_hash=next_frame_hash,
+        filter_stats=filter_stats.snapshot(),
+        encode_seconds=out.seconds,
+    )
+
+
+def verify_segments(
+    ranges: Sequence[Tuple[int, Optional[int]]],
+    results: Sequence[DCSegmentResult],
+) -> bool:
+    """
+    Check that the segments together are the same frames, in the same
+    order, as a sequential export:
+    every segment but the last has exactly the frames of its range, and
+    the first frame of each segment (found by seeking) is the frame a
+    sequential read of the segment before reaches after its last frame.
+    :param ranges: frame ranges from split_frame_ranges
+    :param results: results of export_segment, same order
+    :return: True if the segments can be joined
+    """
+    for (start, end), result in zip(ranges, results):
+        if end is not None and result.frames != end - start:
+            return False
+    for previous, result in zip(results, results[1:]):
+        if previous.next_frame_hash is None:
+            return False
+        if previous.next_frame_hash != result.first_frame_hash:
+            return False
+    return bool(results) and results[-1].frames > 0
+
+
+def count_video_frames(path: str) -> int:
+    """
+    Frame count of a video file (from the container).
+    :param path: video file
+    :return: number of frames
+    """
+    cap = cv2.VideoCapture(path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return frames
+
+
+def join_segments(
+    segment_paths: Sequence[str],
+    output_path: str,
+    fps: float,
+    frame_size: Tuple[int, int],
+) -> None:
+    """
+    Join the segment files into the output video.
+    With ffmpeg on the PATH the streams are only copied (concat demuxer),
+    without it the segments are decoded and encoded again.
+    :param segment_paths: segment files in order
+    :param output_path: output video
+    :param fps: frames per second
+    :param frame_size: (width, height)
+    :return: None
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = os.path.join(
+            os.path.dirname(segment_paths[0]), "segments.txt"
+        )
+        with open(list_path, "w") as file:
+            for path in segment_paths:
+                file.write(f"file '{os.path.abspath(path)}'\n")
+        subprocess.run(
+            [
+                ffmpeg,
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                list_path,
+                "-c",
+                "copy",
+                output_path,
+            ],
+            check=True,
+        )
+        return
+
+    out = open_encoder(output_path, fps, frame_size)
+    for path in segment_paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+    out.release()
+
+
+def default_export_segments() -> int:
+    """
+    Number of segments used by the app: one per core, but only if ffmpeg
+    can join them without encoding the video a second time.
+    :return: number of segments
+    """
+    if shutil.which("ffmpeg") is None:
+        return 1
+    return available_cpus()
+
+
+def run_segments(
+    tasks: Sequence[DCSegmentTask],
+    processes: int,
+    cancel_event,
+    frames_done: Dict[int, int],
+    segment_done: Callable[[DCSegmentResult], None],
+    reporter: Optional[ExportProgressReporter] = None,
+) -> None:
+    """
+    Export segments in this process (processes <= 1) or on a pool. The
+    pool processes report their frames through a manager queue, which is
+    read here for the reporter. The cores are shared evenly between the
+    pool processes (see apply_resource_policy).
+    :param tasks: segments to export, without queue and event
+    :param processes: number of processes
+    :param cancel_event: optional event that stops the segments
+    :param frames_done: written frames of each segment, updated here
+    :param segment_done: called here with the result of every segment
+    :param reporter: optional reporter of the export progress
+    :return: None
+    """
+
+    def report() -> None:
+        if reporter is not None:
+            reporter.update(sum(frames_done.values()))
+
+    if processes <= 1:
+        for task in tasks:
+
+            def progress(written: int, index: int = task.index) -> None:
+                frames_done[index] = written
+                report()
+
+            result = export_segment(
+                dataclasses.replace(task, cancel_event=cancel_event), progress
+            )
+            frames_done[task.index] = result.frames
+            segment_done(result)
+        return
+
+    with multiprocessing.Manager() as manager:
+        segment_progress = manager.Queue()
+        segment_cancel = manager.Event()
+        with multiprocessing.Pool(
+            processes,
+            initializer=apply_resource_policy,
+            initargs=(worker_threads(processes),),
+        ) as pool:
+            # segments start in order, a free process takes the next one
+            pending = [
+                pool.apply_async(
+                    export_segment,
+                    (
+                        dataclasses.replace(
+                            task,
+                            progress_queue=segment_progress,
+                            cancel_event=segment_cancel,
+                        ),
+                    ),
+                )
+                for task in tasks
+            ]
+            while pending:
+                pending[0].wait(PROGRESS_INTERVAL)
+                if cancel_event is not None and cancel_event.is_set():
+                    segment_cancel.set()
+                while not segment_progress.empty():
+                    index, written = segment_progress.get()
+                    frames_done[index] = written
+                for async_result in [item for item in pending if item.ready()]:
+                    pending.remove(async_result)
+                    # raises the error of a segment, e.g. ExportCancelled
+                    result = async_result.get()
+                    frames_done[result.index] = result.frames
+                    segment_done(result)
+                report()
+
+
+def segmented_export(
+    export_params_data: DCVideoExportParams,
+    reporter: Optional[ExportProgressReporter] = None,
+) -> Optional[Tuple[int, int, DCFilterStats, float]]:
+    """
+    Export the video in frame ranges filtered by parallel processes, then
+    join the segments. Nothing is written to the output path if the
+    segments do not match a sequential export (see verify_segments).
+    The segments report their frames to this process, which sums them up
+    for the reporter, and stop when cancel_event is set (ExportCancelled).
+    With checkpoint_frames the ranges have about this length and are
+    exported by `segments` processes. Every finished segment is saved in a
+    manifest in checkpoint_dir, which is kept if the export does not end
+    (error or killed process). A rerun with the same parameters only
+    exports the segments missing in the manifest. A cancelled export
+    removes it, like its partial output.
+    :param export_params_data: Dataclass object with video parameters and filter values.
+    :param reporter: optional reporter of the export progress
+    :return: (written frames, number of segments, merged filter stats,
+    seconds spent in the encoders of the segments), or None if the video
+    has to be exported in a single process.
+    """
+    cap = cv2.VideoCapture(export_params_data.input_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_size = export_frame_size(
+        (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        ),
+        export_params_data.output_size,
+    )
+    cap.release()
+
+    # the ranges split the clip between start_frame and end_frame
+    first, last = export_frame_range(export_params_data, total_frames)
+    clip_frames = max(0, (total_frames if last is None else last) - first)
+    checkpoint_frames = export_params_data.checkpoint_frames
+    if checkpoint_frames:
+        ranges = split_frame_ranges(
+            clip_frames,
+            clip_frames // checkpoint_frames,
+            min_frames=checkpoint_frames,
+        )
+    else:
+        ranges = split_frame_ranges(clip_frames, export_params_data.segments)
+    if len(ranges) < 2:
+        return None
+    ranges = [
+        (start + first, last if end is None else end + first)
+        for start, end in ranges
+    ]
+
+    # results of the finished segments by index
+    done: Dict[int, DCSegmentResult] = {}
+    key = None
+    if checkpoint_frames:
+        segment_dir = checkpoint_dir(export_params_data.output_path)
+        os.makedirs(segment_dir, exist_ok=True)
+        key = checkpoint_key(export_params_data, ranges)
+        done = load_manifest(segment_dir, key)
+    else:
+        # segment files next to the output, removed at the end
+        output_dir = os.path.dirname(
+            os.path.abspath(export_params_data.output_path)
+        )
+        segment_dir = tempfile.mkdtemp(prefix=".segments-", dir=output_dir)
+
+    # queue and event of the parent process can not be sent to the pool
+    segment_params = dataclasses.replace(
+        export_params_data, progress_queue=None, cancel_event=None
+    )
+    tasks = [
+        DCSegmentTask(
+            export_params=segment_params,
+            index=index,
+            start=start,
+            end=end,
+            output_path=os.path.join(segment_dir, f"{index:04}.mp4"),
+        )
+        for index, (start, end) in enumerate(ranges)
+    ]
+    # segments of an earlier run whose file is still there
+    done = {
+        index: result
+        for index, result in done.items()
+        if index < len(tasks) and os.path.exists(tasks[index].output_path)
+    }
+
+    def segment_done(result: DCSegmentResult) -> None:
+        done[result.index] = result
+        if key is not None:
+            save_manifest(
+                segment_dir, key, [done[index] for index in sorted(done)]
+            )
+
+    if reporter is not None:
+        # filter stats are in the segment processes until they are done
+        reporter.with_filter_stats = False
+    # without checkpoints the segments are removed in any case
+    remove_segments = key is None
+    try:
+        pending = [task for task in tasks if task.index not in done]
+        run_segments(
+            pending,
+            min(max(1, export_params_data.segments or 1), len(pending)),
+            export_params_data.cancel_event,
+            {index: result.frames for index, result in done.items()},
+            segment_done,
+            reporter,
+        )
+        results = [done[index] for index in range(len(tasks))]
+
+        if not verify_segments(ranges, results):
+            remove_segments = True
+            return None
+
+        written = sum(result.frames for result in results)
+        join_segments(
+            [task.output_path for task in tasks],
+            export_params_data.output_path,
+            fps,
+            frame_size,
+        )
+        remove_segments = True
+        if count_video_frames(export_params_data.output_path) != written:
+            return None
+        return (
+            written,
+            len(tasks),
+            merge_filter_stats(result.filter_stats for result in results),
+            sum(result.encode_seconds for result in results),
+        )
+    except ExportCancelled:
+        # cancelled by the user, not resumed later
+        remove_segments = True
+        raise
+    finally:
+        if remove_segments:
+            shutil.rmtree(segment_dir, ignore_errors=True)
@@ -0,0 +1,91 @@
+import os
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+class SharedFrameRing:
+    """
+    Fixed number of frame slots in one block of shared memory.
+    Processes only pass slot indices (and frame numbers, counts, ...)
+    through their queues, the frames are read and written in place, so a
+    4K frame (24 MB) is not pickled and copied between processes.
+    Which slots are free is up to the user, e.g. a queue of free indices
+    in the process that fills the slots.
+
+    The process that creates the ring owns the memory and removes it with
+    close(). Passed to another process (pickled, or inherited by a forked
+    process) the ring uses the same memory, close() there only detaches.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        slot_shape: Tuple[int, ...],
+        dtype=np.uint8,
+        name: Optional[str] = None,
+    ):
+        """
+        :param slots: number of slots
+        :param slot_shape: shape of one slot, e.g. (frames, height, width, 3)
+        :param dtype: numpy dtype of the frames
+        :param name: name of an existing ring to attach to,
+        None: create a new one
+        """
+        self.slots = slots
+        self.slot_shape = tuple(slot_shape)
+        self.dtype = np.dtype(dtype)
+        shape = (slots,) + self.slot_shape
+        create = name is None
+        # only the creating process removes the memory, also when a forked
+        # process has a copy of the ring
+        self._owner_pid = os.getpid() if create else None
+        self._shm = shared_memory.SharedMemory(
+            name=name,
+            create=create,
+            size=int(np.prod(shape)) * self.dtype.itemsize if create else 0,
+        )
+        self._frames: Optional[npt.NDArray] = np.ndarray(
+            shape, dtype=self.dtype, buffer=self._shm.buf
+        )
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._shm.name
+
+    def slot(self, index: int) -> npt.NDArray:
+        """
+        Array of a slot, reads and writes go to the shared memory.
+        :param index: slot index, 0 <= index < slots
+        :return: numpy array with slot_shape
+        """
+        return self._frames[index]
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory, the owner also removes it.
+        Arrays returned by slot() must not be used afterwards.
+        :return: None
+        """
+        if self._frames is None:
+            return
+        self._frames = None
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+    def __getstate__(self):
+        return self.slots, self.slot_shape, self.dtype.str, self.name
+
+    def __setstate__(self, state):
+        slots, slot_shape, dtype, name = state
+        self.__init__(slots, slot_shape, dtype, name=name)
+
+    def __enter__(self) -> "SharedFrameRing":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
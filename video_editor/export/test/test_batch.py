@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+from models.dc_video import DCFiltersParams, DCVideoExportParams
+from models.type_status import TypeExportStatus
+
+from export.batch import export_batch, order_batch_jobs
+
+
+def write_video(path, frames, size):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, size)
+    for index in range(frames):
+        out.write(np.full((size[1], size[0], 3), index * 10 % 256, np.uint8))
+    out.release()
+
+
+class TestExportBatch(unittest.TestCase):
+    """
+    Test for the batch export of several videos
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jobs = []
+        # (frames, size) of each video, the second one is the largest
+        for index, (frames, size) in enumerate(
+            [(10, (64, 48)), (20, (96, 64)), (5, (32, 32))]
+        ):
+            input_path = os.path.join(self.tmp_dir.name, f"in_{index}.mp4")
+            write_video(input_path, frames, size)
+            self.jobs.append(
+                DCVideoExportParams(
+                    input_path=input_path,
+                    output_path=os.path.join(
+                        self.tmp_dir.name, f"out_{index}.mp4"
+                    ),
+                    filter_params=DCFiltersParams(brightness_strength=20),
+                )
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_order_longest_first(self):
+        self.assertEqual(order_batch_jobs(self.jobs), [0, 1, 2])
+        self.assertEqual(
+            order_batch_jobs(self.jobs, longest_first=True), [1, 0, 2]
+        )
+
+    def test_export_batch(self):
+        results = export_batch(self.jobs, workers=2, longest_first=True)
+
+        self.assertEqual([result.index for result in results], [0, 1, 2])
+        self.assertEqual([result.frames for result in results], [10, 20, 5])
+        for job, result in zip(self.jobs, results):
+            self.assertEqual(result.status, TypeExportStatus.ok)
+            self.assertEqual(result.output_path, job.output_path)
+            self.assertTrue(os.path.exists(job.output_path))
+            self.assertGreater(result.seconds, 0)
+            self.assertGreater(result.fps, 0)
+
+    def test_failed_job_does_not_stop_batch(self):
+        self.jobs[0].input_path = os.path.join(self.tmp_dir.name, "missing")
+        results = export_batch(self.jobs, workers=1)
+
+        self.assertEqual(results[0].status, TypeExportStatus.error)
+        self.assertEqual(results[0].frames, 0)
+        self.assertEqual(results[1].status, TypeExportStatus.ok)
+        self.assertEqual(results[2].status, TypeExportStatus.ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+from models.dc_video import DCFiltersParams, DCVideoExportParams
+from models.type_encoder import TypeEncoder
+
+from export.encoders import (
+    OpenCVEncoder,
+    VideoEncoder,
+    Y4MEncoder,
+    open_encoder,
+)
+from export.export import video_exporter_func
+
+
+class TestEncoders(unittest.TestCase):
+    """
+    Test for the encoder backends of the export
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.frame = np.full((48, 64, 3), (40, 120, 200), np.uint8)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_y4m_stream(self):
+        stream = io.BytesIO()
+        encoder = open_encoder(stream, 29.97, (64, 48), TypeEncoder.y4m)
+        self.assertIsInstance(encoder, Y4MEncoder)
+        for _ in range(3):
+            encoder.write(self.frame)
+        encoder.release()
+
+        data = stream.getvalue()
+        header, _, frames = data.partition(b"\n")
+        self.assertEqual(
+            header, b"YUV4MPEG2 W64 H48 F2997:100 Ip A1:1 C420jpeg"
+        )
+        frame_bytes = 64 * 48 * 3 // 2
+        self.assertEqual(len(frames), 3 * (len(b"FRAME\n") + frame_bytes))
+        # the frame decodes back to the same colour
+        planes = np.frombuffer(
+            frames[len(b"FRAME\n") : len(b"FRAME\n") + frame_bytes], np.uint8
+        ).reshape(48 * 3 // 2, 64)
+        decoded = cv2.cvtColor(planes, cv2.COLOR_YUV2BGR_I420)
+        np.testing.assert_allclose(decoded, self.frame, atol=2)
+        self.assertEqual(encoder.frames, 3)
+        self.assertGreater(encoder.encode_fps, 0)
+
+    def test_y4m_needs_even_size(self):
+        with self.assertRaises(ValueError):
+            Y4MEncoder(io.BytesIO(), 30, (63, 48))
+
+    def test_mjpg_file(self):
+        path = os.path.join(self.tmp_dir.name, "out.avi")
+        encoder = open_encoder(path, 30, (64, 48), TypeEncoder.mjpg)
+        self.assertIsInstance(encoder, OpenCVEncoder)
+        for _ in range(5):
+            encoder.write(self.frame)
+        encoder.release()
+        cap = cv2.VideoCapture(path)
+        self.assertEqual(
+            int(cap.get(cv2.CAP_PROP_FOURCC)),
+            cv2.VideoWriter_fourcc(*"MJPG"),
+        )
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 5)
+        cap.release()
+
+    def test_encoder_without_write(self):
+        class NoWrite(VideoEncoder):
+            pass
+
+        # fails when it is created, not on the first frame
+        with self.assertRaises(TypeError):
+            NoWrite()
+
+    def test_unknown_extension(self):
+        with self.assertRaises(IOError):
+            open_encoder(
+                os.path.join(self.tmp_dir.name, "out.xyz"), 30, (64, 48)
+            )
+
+    def test_export_reports_encoder(self):
+        input_video = os.path.join(self.tmp_dir.name, "input.mp4")
+        encoder = open_encoder(input_video, 30, (64, 48))
+        for _ in range(8):
+            encoder.write(self.frame)
+        encoder.release()
+
+        for encoder_type, name in (
+            (TypeEncoder.mjpg, "output.avi"),
+            (TypeEncoder.y4m, "output.y4m"),
+        ):
+            output_video = os.path.join(self.tmp_dir.name, name)
+            summary = video_exporter_func(
+                DCVideoExportParams(
+                    input_path=input_video,
+                    output_path=output_video,
+                    encoder=encoder_type,
+                    filter_params=DCFiltersParams(sepia_strength=50),
+                )
+            )
+            self.assertEqual(summary.frames, 8)
+            self.assertEqual(summary.encoder, encoder_type)
+            self.assertGreater(summary.encode_fps, 0)
+            self.assertGreater(os.path.getsize(output_video), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,19 @@
+import filecmp
+import json
+import multiprocessing
 import os
+import queue
 import unittest
+from unittest.mock import patch
 
 import cv2
 import numpy as np
+from filter.instrumentation import filter_stats
 from models.dc_video import (
     DCFiltersParams,
     DCVideoExportParams,
 )
+from models.type_status import TypeExportStatus
 
 from export.export import video_exporter_func
 
@@ -16,6 +23,7 @@ class TestVideoExporterFunc(unittest.TestCase):
         """Create a temporary video file for testing."""
         self.input_video = "test_input.mp4"
         self.output_video = "test_output.mp4"
+        self.summary_file = "test_summary.json"
 
         # create a sample video (100x100, 30 FPS, 2 seconds, gray frames)
         frame_size = (100, 100)
@@ -98,12 +106,120 @@ class TestVideoExporterFunc(unittest.TestCase):
             "Filtered video frames should differ from original frames",
         )
 
+    def test_export_summary(self):
+        """
+        Test that the export returns and saves a summary with filter stats.
+        """
+        self.export_params.summary_path = self.summary_file
+        summary = video_exporter_func(self.export_params)
+
+        self.assertEqual(summary.status, TypeExportStatus.ok)
+        self.assertEqual(summary.frames, len(self.original_frames))
+        self.assertGreater(summary.fps, 0)
+        self.assertEqual(summary.filter_stats.frames, summary.frames)
+        self.assertIn("blur", summary.filter_stats.stages)
+
+        with open(self.summary_file) as file:
+            saved = json.load(file)
+        self.assertEqual(saved["frames"], summary.frames)
+        self.assertIn("blur", saved["filter_stats"]["stages"])
+
+    def test_export_progress(self):
+        """
+        Test that the export puts its progress into the queue.
+        """
+        progress_queue = queue.Queue()
+        self.export_params.progress_queue = progress_queue
+        video_exporter_func(self.export_params)
+
+        messages = []
+        while not progress_queue.empty():
+            messages.append(progress_queue.get())
+        self.assertGreater(len(messages), 0)
+        last = messages[-1]
+        self.assertEqual(last.status, TypeExportStatus.ok)
+        self.assertEqual(last.frames_done, len(self.original_frames))
+        self.assertEqual(last.total_frames, len(self.original_frames))
+        self.assertIn("blur", last.filter_stats.stages)
+
+    def test_export_cancelled(self):
+        """
+        Test that a cancelled export deletes the partial output.
+        """
+        progress_queue = queue.Queue()
+        cancel_event = multiprocessing.Event()
+        cancel_event.set()
+        self.export_params.progress_queue = progress_queue
+        self.export_params.cancel_event = cancel_event
+        summary = video_exporter_func(self.export_params)
+
+        self.assertEqual(summary.status, TypeExportStatus.cancelled)
+        self.assertFalse(os.path.exists(self.output_video))
+        last = None
+        while not progress_queue.empty():
+            last = progress_queue.get()
+        self.assertEqual(last.status, TypeExportStatus.cancelled)
+
+    def test_export_error_restores_filter_stats(self):
+        """
+        Test that an export that fails switches the filter stats back.
+        """
+        previous = filter_stats.enabled
+        for enabled in (False, True):
+            filter_stats.enabled = enabled
+            with patch(
+                "export.export.export_single_process",
+                side_effect=IOError("disk full"),
+            ):
+                with self.assertRaises(IOError):
+                    video_exporter_func(self.export_params)
+            self.assertEqual(filter_stats.enabled, enabled)
+        filter_stats.enabled = previous
+
+    def test_identity_export_copies_input(self):
+        """
+        Test that an export without active filters copies the input.
+        """
+        self.export_params.filter_params = DCFiltersParams(
+            blur_strength=0, sepia_strength=0, hue_value=0
+        )
+        summary = video_exporter_func(self.export_params)
+        self.assertTrue(summary.copied)
+        self.assertEqual(summary.frames, len(self.original_frames))
+        self.assertTrue(
+            filecmp.cmp(self.input_video, self.output_video, shallow=False)
+        )
+
+    def test_identity_export_other_container(self):
+        """
+        Test that an export without active filters to another container
+        writes the frames without filtering them.
+        """
+        self.output_video = "test_output.avi"
+        self.export_params.output_path = self.output_video
+        self.export_params.filter_params = DCFiltersParams()
+        summary = video_exporter_func(self.export_params)
+        self.assertFalse(summary.copied)
+        self.assertEqual(summary.frames, len(self.original_frames))
+        self.assertEqual(summary.filter_stats.frames, 0)
+        frames = []
+        for path in (self.input_video, self.output_video):
+            cap = cv2.VideoCapture(path)
+            ret, frame = cap.read()
+            cap.release()
+            self.assertTrue(ret)
+            frames.append(frame)
+        # only the compression changes the frame
+        self.assertAlmostEqual(frames[1].mean(), frames[0].mean(), delta=4)
+
     def tearDown(self):
         """Clean up temporary files."""
         if os.path.exists(self.input_video):
             os.remove(self.input_video)
         if os.path.exists(self.output_video):
             os.remove(self.output_video)
+        if os.path.exists(self.summary_file):
+            os.remove(self.summary_file)
 
 
 if __name__ == "__main__":
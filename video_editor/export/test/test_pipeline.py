@@ -0,0 +1,212 @@
+import threading
+import unittest
+
+import numpy as np
+from filter.plan import FilterPlan
+from models.dc_video import DCFiltersParams
+
+from export.pipeline import run_export_pipeline, run_process_pipeline
+from export.progress import ExportCancelled
+
+
+class FakeCapture:
+    """Video with numbered frames: every pixel of frame i has the value i."""
+
+    def __init__(self, frames, shape=(12, 16, 3)):
+        self.frames = frames
+        self.shape = shape
+        self.index = 0
+
+    def read(self, image=None):
+        if self.index >= self.frames:
+            return False, None
+        image[...] = self.index
+        self.index += 1
+        return True, image
+
+
+class AllocatingCapture(FakeCapture):
+    """Returns new arrays like OpenCV does when the buffer does not fit."""
+
+    def read(self, image=None):
+        if self.index >= self.frames:
+            return False, None
+        frame = np.full(self.shape, self.index, np.uint8)
+        self.index += 1
+        return True, frame
+
+
+class FakeWriter:
+    def __init__(self, fail_after=None):
+        self.frames = []
+        self.fail_after = fail_after
+
+    def write(self, frame):
+        if self.fail_after is not None and len(self.frames) >= self.fail_after:
+            raise IOError("disk full")
+        self.frames.append(frame.copy())
+
+
+class TestExportPipeline(unittest.TestCase):
+    """
+    Test for the decode → filter → encode pipeline
+    """
+
+    def setUp(self):
+        self.plan = FilterPlan(DCFiltersParams(brightness_strength=10))
+
+    def run_pipeline(self, frames, writer, **kwargs):
+        return run_export_pipeline(
+            FakeCapture(frames), writer, self.plan, (12, 16, 3), **kwargs
+        )
+
+    def test_all_frames_written_in_order(self):
+        writer = FakeWriter()
+        written = self.run_pipeline(
+            23, writer, batch_size=3, workers=4, queue_size=2
+        )
+        self.assertEqual(written, 23)
+        self.assertEqual(len(writer.frames), 23)
+        for index, frame in enumerate(writer.frames):
+            expected = self.plan.apply(np.full((12, 16, 3), index, np.uint8))
+            np.testing.assert_array_equal(frame, expected)
+
+    def test_empty_video(self):
+        writer = FakeWriter()
+        self.assertEqual(self.run_pipeline(0, writer, workers=2), 0)
+        self.assertEqual(writer.frames, [])
+
+    def test_writer_error_is_raised(self):
+        writer = FakeWriter(fail_after=5)
+        with self.assertRaises(IOError):
+            self.run_pipeline(40, writer, batch_size=2, workers=3)
+
+    def test_identity_plan_writes_decoded_frames(self):
+        writer = FakeWriter()
+        written = run_export_pipeline(
+            FakeCapture(9),
+            writer,
+            FilterPlan(DCFiltersParams()),
+            (12, 16, 3),
+            batch_size=2,
+            workers=3,
+        )
+        self.assertEqual(written, 9)
+        for index, frame in enumerate(writer.frames):
+            self.assertTrue((frame == index).all())
+
+    def test_new_decoded_array_is_used(self):
+        writer = FakeWriter()
+        written = run_export_pipeline(
+            AllocatingCapture(7),
+            writer,
+            FilterPlan(DCFiltersParams()),
+            (12, 16, 3),
+            batch_size=3,
+        )
+        self.assertEqual(written, 7)
+        for index, frame in enumerate(writer.frames):
+            self.assertTrue((frame == index).all())
+
+    def test_other_frame_size_is_raised(self):
+        with self.assertRaises(ValueError):
+            run_export_pipeline(
+                AllocatingCapture(7, shape=(16, 12, 3)),
+                FakeWriter(),
+                self.plan,
+                (12, 16, 3),
+            )
+
+    def test_progress_is_reported(self):
+        progress = []
+        self.run_pipeline(
+            10, FakeWriter(), batch_size=4, workers=2, progress=progress.append
+        )
+        self.assertEqual(progress, [4, 8, 10])
+
+    def test_cancel_stops_pipeline(self):
+        cancel = threading.Event()
+        writer = FakeWriter()
+
+        def progress(written):
+            if written >= 6:
+                cancel.set()
+
+        with self.assertRaises(ExportCancelled):
+            self.run_pipeline(
+                200,
+                writer,
+                batch_size=2,
+                workers=2,
+                progress=progress,
+                cancel=cancel,
+            )
+        self.assertLess(len(writer.frames), 200)
+
+
+class TestProcessPipeline(unittest.TestCase):
+    """
+    Test for the pipeline with filter processes and shared memory
+    """
+
+    def setUp(self):
+        self.filter_params = DCFiltersParams(
+            blur_strength=2, brightness_strength=10
+        )
+
+    def run_pipeline(self, frames, writer, **kwargs):
+        return run_process_pipeline(
+            FakeCapture(frames),
+            writer,
+            self.filter_params,
+            (12, 16, 3),
+            **kwargs,
+        )
+
+    def test_same_frames_as_thread_pipeline(self):
+        writer = FakeWriter()
+        written = self.run_pipeline(
+            23, writer, batch_size=3, workers=2, queue_size=2
+        )
+        expected = FakeWriter()
+        run_export_pipeline(
+            FakeCapture(23),
+            expected,
+            FilterPlan(self.filter_params),
+            (12, 16, 3),
+            batch_size=3,
+        )
+        self.assertEqual(written, 23)
+        self.assertEqual(len(writer.frames), 23)
+        for frame, expected_frame in zip(writer.frames, expected.frames):
+            np.testing.assert_array_equal(frame, expected_frame)
+
+    def test_new_decoded_array_is_used(self):
+        writer = FakeWriter()
+        written = run_process_pipeline(
+            AllocatingCapture(7),
+            writer,
+            DCFiltersParams(),
+            (12, 16, 3),
+            batch_size=3,
+            workers=2,
+        )
+        self.assertEqual(written, 7)
+        for index, frame in enumerate(writer.frames):
+            self.assertTrue((frame == index).all())
+
+    def test_cancel_stops_pipeline(self):
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(ExportCancelled):
+            self.run_pipeline(50, FakeWriter(), workers=2, cancel=cancel)
+
+    def test_writer_error_is_raised(self):
+        with self.assertRaises(IOError):
+            self.run_pipeline(
+                40, FakeWriter(fail_after=5), batch_size=2, workers=2
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
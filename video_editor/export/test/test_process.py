@@ -3,8 +3,7 @@ from unittest.mock import MagicMock, patch
 
 from models.dc_video import DCVideoExportParams
 
-from export.export import video_exporter_func
-from export.process import export_process
+from export.process import export_process, export_worker
 
 
 class TestExportProcess(unittest.TestCase):
@@ -30,7 +29,7 @@ class TestExportProcess(unittest.TestCase):
 
         # assertions
         mock_process.assert_called_once_with(
-            target=video_exporter_func,
+            target=export_worker,
             args=(export_params,),
         )
         # ensure process starts
@@ -38,6 +37,27 @@ class TestExportProcess(unittest.TestCase):
         # ensure process is returned
         self.assertEqual(result, mock_process_instance)
 
+    @patch("multiprocessing.Process")
+    def test_export_process_shares_cores(self, mock_process):
+        """
+        Test that an export without cpu_threads gets the cores left over
+        by the running exports.
+        """
+        export_params = DCVideoExportParams(output_path="output/video.mp4")
+        with (
+            patch("export.process.running_exports", return_value=1),
+            patch(
+                "export.process.worker_threads", return_value=3
+            ) as mock_threads,
+        ):
+            export_process(export_params)
+        # the new export and the running one
+        mock_threads.assert_called_once_with(2)
+        params = mock_process.call_args.kwargs["args"][0]
+        self.assertEqual(params.cpu_threads, 3)
+        # the parameters of the caller are not changed
+        self.assertIsNone(export_params.cpu_threads)
+
     def test_export_process_with_no_output_path(self):
         """
         Test that export_process returns None when output_path is None.
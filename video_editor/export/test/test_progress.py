@@ -0,0 +1,51 @@
+import unittest
+
+from models.type_status import TypeExportStatus
+
+from export.progress import ExportProgressReporter
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+
+class TestExportProgressReporter(unittest.TestCase):
+    """
+    Test for the progress messages of an export
+    """
+
+    def test_updates_are_throttled(self):
+        progress_queue = FakeQueue()
+        reporter = ExportProgressReporter(progress_queue, 100, interval=60)
+        for frames in range(1, 11):
+            reporter.update(frames)
+        # only the first update is sent within the interval
+        self.assertEqual(len(progress_queue.items), 1)
+        self.assertEqual(reporter.frames_done, 10)
+
+        reporter.finish(10, TypeExportStatus.ok)
+        last = progress_queue.items[-1]
+        self.assertEqual(last.status, TypeExportStatus.ok)
+        self.assertEqual(last.frames_done, 10)
+
+    def test_message(self):
+        reporter = ExportProgressReporter(None, 100, with_filter_stats=False)
+        reporter.start -= 2
+        message = reporter.message(50, TypeExportStatus.running)
+        self.assertAlmostEqual(message.fps, 25, delta=1)
+        self.assertAlmostEqual(message.eta_seconds, 2, delta=0.1)
+        self.assertIsNone(message.filter_stats)
+
+    def test_no_eta_without_frames(self):
+        reporter = ExportProgressReporter(None, 0)
+        message = reporter.message(0, TypeExportStatus.running)
+        self.assertEqual(message.fps, 0)
+        self.assertIsNone(message.eta_seconds)
+
+
+if __name__ == "__main__":
+    unittest.main()
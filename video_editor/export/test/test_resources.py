@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import unittest
+
+import cv2
+import numpy as np
+from filter.tiling import get_tile_workers
+from threadpoolctl import threadpool_info, threadpool_limits
+
+from export import resources
+from export.pipeline import default_filter_workers
+from export.resources import (
+    THREAD_ENV_VARS,
+    apply_resource_policy,
+    available_cpus,
+    worker_threads,
+)
+
+
+def report_policy(result_queue, threads, cpu_affinity):
+    # in a child process, so the limits do not stay in the test process
+    set_threads = apply_resource_policy(threads, cpu_affinity)
+    result_queue.put(
+        (
+            set_threads,
+            cv2.getNumThreads(),
+            [os.environ[name] for name in THREAD_ENV_VARS],
+            get_tile_workers(),
+            available_cpus(),
+            default_filter_workers(),
+            (
+                sorted(os.sched_getaffinity(0))
+                if hasattr(os, "sched_getaffinity")
+                else None
+            ),
+        )
+    )
+
+
+def blas_threads():
+    return [
+        pool["num_threads"]
+        for pool in threadpool_info()
+        if pool["user_api"] == "blas"
+    ]
+
+
+def report_blas_threads(result_queue, threads):
+    # numpy's BLAS is loaded (and already running) before the policy is
+    # applied, as in an export worker. Its pool starts with more threads
+    # than the limit, also on machines with fewer cores
+    np.ones((64, 64)) @ np.ones((64, 64))
+    threadpool_limits(limits=threads * 4)
+    before = blas_threads()
+    apply_resource_policy(threads)
+    result_queue.put((before, blas_threads()))
+
+
+class TestResourcePolicy(unittest.TestCase):
+    """
+    Test for the thread limits of export workers
+    """
+
+    def run_in_process(self, target, *args):
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=target, args=(result_queue,) + args
+        )
+        process.start()
+        result = result_queue.get(timeout=30)
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        return result
+
+    def run_policy(self, threads, cpu_affinity=None):
+        return self.run_in_process(report_policy, threads, cpu_affinity)
+
+    def test_worker_threads(self):
+        self.assertEqual(worker_threads(4, cpus=16), 4)
+        self.assertEqual(worker_threads(3, cpus=16), 5)
+        # more workers than cores
+        self.assertEqual(worker_threads(8, cpus=2), 1)
+        self.assertEqual(worker_threads(0, cpus=2), 2)
+
+    def test_available_cpus(self):
+        self.assertIsNone(resources._cpu_budget)
+        self.assertGreaterEqual(available_cpus(), 1)
+        self.assertLessEqual(available_cpus(), os.cpu_count())
+
+    def test_apply_policy(self):
+        threads, cv_threads, env, tiles, cpus, filter_workers, _ = (
+            self.run_policy(3)
+        )
+        self.assertEqual(threads, 3)
+        self.assertEqual(cv_threads, 3)
+        self.assertEqual(env, ["3"] * len(THREAD_ENV_VARS))
+        self.assertEqual(tiles, 3)
+        self.assertEqual(cpus, 3)
+        self.assertEqual(filter_workers, 1)
+
+    def test_blas_threads_of_loaded_library(self):
+        before, after = self.run_in_process(report_blas_threads, 2)
+        if not before:
+            self.skipTest("numpy does not use a BLAS library")
+        # other BLAS libraries (e.g. the one bundled with OpenCV) can be
+        # single threaded builds
+        self.assertEqual(max(before), 8)
+        self.assertEqual(max(after), 2)
+
+    @unittest.skipUnless(
+        hasattr(os, "sched_setaffinity"), "CPU affinity not supported"
+    )
+    def test_cpu_affinity(self):
+        cpu = min(os.sched_getaffinity(0))
+        threads, cv_threads, _, _, cpus, _, affinity = self.run_policy(
+            None, (cpu,)
+        )
+        # one thread per pinned core
+        self.assertEqual(threads, 1)
+        self.assertEqual(cv_threads, 1)
+        self.assertEqual(cpus, 1)
+        self.assertEqual(affinity, [cpu])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import run_export
+
+# folder of run_export.py
+VIDEO_EDITOR_DIR = os.path.dirname(os.path.abspath(run_export.__file__))
+
+
+class TestRunExport(unittest.TestCase):
+    """
+    Test for the command-line export
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_video = os.path.join(self.tmp_dir.name, "input.mp4")
+        self.output_video = os.path.join(self.tmp_dir.name, "output.mp4")
+        out = cv2.VideoWriter(
+            self.input_video, cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48)
+        )
+        for _ in range(40):
+            out.write(np.full((48, 64, 3), 128, np.uint8))
+        out.release()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_export(self):
+        code = run_export.main(
+            [
+                self.input_video,
+                self.output_video,
+                "--brightness",
+                "40",
+                "--hue",
+                "-20",
+                "--segments",
+                "1",
+            ]
+        )
+        self.assertEqual(code, 0)
+        cap = cv2.VideoCapture(self.output_video)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 40)
+        ret, frame = cap.read()
+        cap.release()
+        self.assertTrue(ret)
+        self.assertGreater(frame.mean(), 140)
+
+    def test_cpu_list(self):
+        args = run_export.parse_args(
+            [self.input_video, self.output_video, "--cpus", "0,2-4"]
+        )
+        self.assertEqual(args.cpus, (0, 2, 3, 4))
+        with self.assertRaises(SystemExit):
+            run_export.parse_args(
+                [self.input_video, self.output_video, "--cpus", "a-b"]
+            )
+
+    def test_missing_input(self):
+        code = run_export.main(
+            [os.path.join(self.tmp_dir.name, "missing.mp4"), self.output_video]
+        )
+        self.assertEqual(code, 2)
+        self.assertFalse(os.path.exists(self.output_video))
+
+    def test_output_size(self):
+        code = run_export.main(
+            [self.input_video, self.output_video, "--size", "32x24"]
+        )
+        self.assertEqual(code, 0)
+        cap = cv2.VideoCapture(self.output_video)
+        size = (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+        cap.release()
+        self.assertEqual(size, (32, 24))
+        with self.assertRaises(SystemExit):
+            run_export.parse_args(["in.mp4", "out.mp4", "--size", "720p"])
+
+    def test_value_out_of_range(self):
+        with self.assertRaises(SystemExit):
+            run_export.parse_args(["in.mp4", "out.mp4", "--blur", "21"])
+
+    def test_qt_not_imported(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, run_export; sys.exit('PyQt6' in sys.modules)",
+            ],
+            cwd=VIDEO_EDITOR_DIR,
+        )
+        self.assertEqual(result.returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+from models.dc_video import DCFiltersParams, DCVideoExportParams
+
+from export.export import video_exporter_func
+from export.scaling import (
+    ResizingReader,
+    export_filter_params,
+    export_frame_size,
+)
+
+
+class Capture:
+    """Video with two random 80x60 frames."""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.frames = [
+            rng.integers(0, 256, (60, 80, 3), dtype=np.uint8) for _ in range(2)
+        ]
+
+    def read(self, image=None):
+        if not self.frames:
+            return False, None
+        frame = self.frames.pop(0)
+        if image is None:
+            return True, frame
+        image[...] = frame
+        return True, image
+
+
+class TestExportScaling(unittest.TestCase):
+    """
+    Test for the export at another resolution
+    """
+
+    def test_frame_size(self):
+        self.assertEqual(export_frame_size((3840, 2160), None), (3840, 2160))
+        self.assertEqual(
+            export_frame_size((3840, 2160), (1280, 720)), (1280, 720)
+        )
+        with self.assertRaises(ValueError):
+            export_frame_size((3840, 2160), (0, 720))
+
+    def test_filter_params_scaled(self):
+        params = DCFiltersParams(blur_strength=9, sharpen_strength=3)
+        scaled = export_filter_params(params, (3840, 2160), (1280, 720))
+        self.assertEqual(scaled.blur_strength, 3)
+        self.assertEqual(scaled.sharpen_strength, 3)
+        self.assertIs(
+            export_filter_params(params, (1280, 720), (1280, 720)), params
+        )
+
+    def test_reader_scales_frames(self):
+        capture = Capture()
+        expected = cv2.resize(
+            capture.frames[0], (40, 30), interpolation=cv2.INTER_AREA
+        )
+        reader = ResizingReader(capture, (80, 60), (40, 30))
+        image = np.empty((30, 40, 3), np.uint8)
+        ret, frame = reader.read(image)
+        self.assertTrue(ret)
+        self.assertIs(frame, image)
+        np.testing.assert_array_equal(frame, expected)
+        self.assertTrue(reader.read()[0])
+        self.assertFalse(reader.read()[0])
+
+    def test_export_at_output_size(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_video = os.path.join(directory, "input.mp4")
+            output_video = os.path.join(directory, "output.mp4")
+            out = cv2.VideoWriter(
+                input_video, cv2.VideoWriter_fourcc(*"mp4v"), 30, (160, 120)
+            )
+            for _ in range(10):
+                out.write(np.full((120, 160, 3), 100, np.uint8))
+            out.release()
+
+            summary = video_exporter_func(
+                DCVideoExportParams(
+                    input_path=input_video,
+                    output_path=output_video,
+                    output_size=(80, 60),
+                    filter_params=DCFiltersParams(
+                        blur_strength=4, brightness_strength=50
+                    ),
+                )
+            )
+            self.assertEqual(summary.frames, 10)
+            cap = cv2.VideoCapture(output_video)
+            ret, frame = cap.read()
+            cap.release()
+        self.assertTrue(ret)
+        self.assertEqual(frame.shape, (60, 80, 3))
+        self.assertGreater(frame.mean(), 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
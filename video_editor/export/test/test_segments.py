@@ -0,0 +1,256 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from models.dc_video import (
+    DCFiltersParams,
+    DCSegmentResult,
+    DCVideoExportParams,
+)
+from models.type_status import TypeExportStatus
+
+from export import segments
+from export.checkpoint import checkpoint_dir
+from export.export import video_exporter_func
+from export.segments import (
+    FrameRangeReader,
+    export_frame_range,
+    split_frame_ranges,
+    verify_segments,
+)
+
+
+class TestSplitAndVerify(unittest.TestCase):
+    """
+    Test for the frame ranges and the checks of the segments
+    """
+
+    def test_ranges_cover_video(self):
+        ranges = split_frame_ranges(1000, 4, min_frames=10)
+        self.assertEqual(
+            ranges, [(0, 250), (250, 500), (500, 750), (750, None)]
+        )
+
+    def test_short_video_single_range(self):
+        self.assertEqual(split_frame_ranges(50, 8, min_frames=60), [(0, None)])
+        self.assertEqual(split_frame_ranges(0, 8), [(0, None)])
+
+    def test_export_frame_range(self):
+        params = DCVideoExportParams(start_frame=10, end_frame=20)
+        self.assertEqual(export_frame_range(params, 100), (10, 20))
+        # an end after the last frame reads to the end of the video
+        params.end_frame = 100
+        self.assertEqual(export_frame_range(params, 100), (10, None))
+        params.end_frame = 10
+        with self.assertRaises(ValueError):
+            export_frame_range(params, 100)
+
+    def test_reader_stops_after_range(self):
+        class Capture:
+            def read(self, image=None):
+                return True, np.zeros((2, 2, 3), np.uint8)
+
+        reader = FrameRangeReader(Capture(), frames=3)
+        reads = [reader.read()[0] for _ in range(5)]
+        self.assertEqual(reads, [True, True, True, False, False])
+        self.assertIsNotNone(reader.first_frame_hash)
+
+    def test_verify_segments(self):
+        ranges = [(0, 10), (10, None)]
+        results = [
+            DCSegmentResult(index=0, frames=10, next_frame_hash="a"),
+            DCSegmentResult(index=1, frames=5, first_frame_hash="a"),
+        ]
+        self.assertTrue(verify_segments(ranges, results))
+        # seek landed on another frame
+        results[1].first_frame_hash = "b"
+        self.assertFalse(verify_segments(ranges, results))
+        # frames missing in the first segment
+        results[1].first_frame_hash = "a"
+        results[0].frames = 9
+        self.assertFalse(verify_segments(ranges, results))
+
+
+class TestSegmentedExport(unittest.TestCase):
+    """
+    Test the segmented export against a sequential export
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_video = os.path.join(self.directory, "input.avi")
+        # every frame is different, so a wrong order is visible
+        # (MJPG: every frame is a key frame, seeking is exact)
+        out = cv2.VideoWriter(
+            self.input_video, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48)
+        )
+        self.frame_count = 45
+        for index in range(self.frame_count):
+            # neighbour frames have very different colours
+            frame = np.full((48, 64, 3), (index * 97) % 256, dtype=np.uint8)
+            frame[:, : index + 1] = 255
+            out.write(frame)
+        out.release()
+        self.filter_params = DCFiltersParams(blur_strength=1, hue_value=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, name, segment_count, checkpoint_frames=None, **kwargs):
+        params = DCVideoExportParams(
+            filter_params=self.filter_params,
+            input_path=self.input_video,
+            output_path=os.path.join(self.directory, name),
+            segments=segment_count,
+            checkpoint_frames=checkpoint_frames,
+            **kwargs,
+        )
+        return video_exporter_func(params), params.output_path
+
+    def read_frames(self, path):
+        cap = cv2.VideoCapture(path)
+        frames = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame.astype(np.int16))
+        cap.release()
+        return frames
+
+    @patch.object(segments, "SEGMENT_MIN_FRAMES", 10)
+    def test_same_frames_as_sequential_export(self):
+        sequential, sequential_path = self.export("sequential.mp4", 1)
+        segmented, segmented_path = self.export("segmented.mp4", 3)
+
+        self.assertEqual(segmented.segments, 3)
+        self.assertEqual(segmented.frames, self.frame_count)
+        self.assertEqual(segmented.filter_stats.frames, self.frame_count)
+
+        expected = self.read_frames(sequential_path)
+        result = self.read_frames(segmented_path)
+        self.assertEqual(len(result), len(expected))
+        # frames are compressed again when the segments are joined, but
+        # each frame is still closest to the frame at the same position
+        for index, frame in enumerate(result):
+            differences = [
+                np.abs(frame - expected_frame).mean()
+                for expected_frame in expected
+            ]
+            self.assertEqual(int(np.argmin(differences)), index)
+        # segment files are removed
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ["input.avi", "segmented.mp4", "sequential.mp4"],
+        )
+
+    @patch.object(segments, "SEGMENT_MIN_FRAMES", 10)
+    @patch.object(segments, "verify_segments", return_value=False)
+    def test_inexact_segments_fall_back_to_single_process(self, verify):
+        summary, path = self.export("fallback.mp4", 3)
+        verify.assert_called_once()
+        self.assertEqual(summary.segments, 1)
+        self.assertEqual(len(self.read_frames(path)), self.frame_count)
+
+    def assert_frames_of_clip(self, path, start, end):
+        """
+        Each frame of the exported clip is closest to the frame at the
+        same position in the sequential export of the whole video.
+        """
+        expected = self.read_frames(self.export("all.mp4", 1)[1])
+        result = self.read_frames(path)
+        self.assertEqual(len(result), end - start)
+        for index, frame in enumerate(result):
+            differences = [
+                np.abs(frame - expected_frame).mean()
+                for expected_frame in expected
+            ]
+            self.assertEqual(int(np.argmin(differences)), start + index)
+
+    def test_clip_export(self):
+        summary, path = self.export("clip.mp4", 1, start_frame=17, end_frame=29)
+        self.assertEqual(summary.frames, 12)
+        self.assertEqual(summary.filter_stats.frames, 12)
+        self.assertFalse(summary.copied)
+        self.assert_frames_of_clip(path, 17, 29)
+
+    @patch.object(segments, "SEGMENT_MIN_FRAMES", 10)
+    def test_segmented_clip_export(self):
+        summary, path = self.export("clip.mp4", 2, start_frame=8, end_frame=33)
+        self.assertEqual(summary.segments, 2)
+        self.assertEqual(summary.frames, 25)
+        self.assert_frames_of_clip(path, 8, 33)
+
+    def export_with_crash(self, name, exported, crash_index=None):
+        """
+        Checkpointed export (segments of 10 frames) that records the
+        exported segments and fails at segment crash_index like a killed
+        process.
+        """
+        export_segment = segments.export_segment
+
+        def record_segment(task, progress=None):
+            if task.index == crash_index:
+                raise RuntimeError("process killed")
+            exported.append(task.index)
+            return export_segment(task, progress)
+
+        with patch.object(segments, "export_segment", record_segment):
+            return self.export(name, 1, checkpoint_frames=10)
+
+    def test_resume_from_checkpoint(self):
+        exported = []
+        # the first run stops after two of the four segments
+        with self.assertRaises(RuntimeError):
+            self.export_with_crash("resumed.mp4", exported, crash_index=2)
+        self.assertEqual(exported, [0, 1])
+        directory = checkpoint_dir(os.path.join(self.directory, "resumed.mp4"))
+        self.assertTrue(os.path.isdir(directory))
+
+        # the rerun only exports the missing segments
+        exported.clear()
+        summary, path = self.export_with_crash("resumed.mp4", exported)
+        self.assertEqual(exported, [2, 3])
+        self.assertEqual(summary.segments, 4)
+        self.assertEqual(summary.frames, self.frame_count)
+        self.assertEqual(len(self.read_frames(path)), self.frame_count)
+        # checkpoints are removed when the export is done
+        self.assertFalse(os.path.exists(directory))
+
+    def test_cancel_removes_checkpoints(self):
+        cancel_event = threading.Event()
+        export_segment = segments.export_segment
+
+        def cancel_at_third_segment(task, progress=None):
+            if task.index == 2:
+                cancel_event.set()
+            return export_segment(task, progress)
+
+        with patch.object(segments, "export_segment", cancel_at_third_segment):
+            summary, path = self.export(
+                "cancelled.mp4",
+                1,
+                checkpoint_frames=10,
+                cancel_event=cancel_event,
+            )
+        self.assertEqual(summary.status, TypeExportStatus.cancelled)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(checkpoint_dir(path)))
+
+    def test_changed_filters_do_not_resume(self):
+        exported = []
+        with self.assertRaises(RuntimeError):
+            self.export_with_crash("changed.mp4", exported, crash_index=2)
+        exported.clear()
+        self.filter_params = DCFiltersParams(blur_strength=3)
+        self.export_with_crash("changed.mp4", exported)
+        self.assertEqual(exported, [0, 1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
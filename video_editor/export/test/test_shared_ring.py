@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+from export.shared_ring import SharedFrameRing
+
+
+def fill_slot(ring, index, value):
+    ring.slot(index)[...] = value
+    ring.close()
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    """
+    Test for the frame slots in shared memory
+    """
+
+    def setUp(self):
+        self.ring = SharedFrameRing(3, (2, 4, 5, 3))
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_slots(self):
+        self.assertEqual(self.ring.slot(0).shape, (2, 4, 5, 3))
+        self.assertEqual(self.ring.slot(0).dtype, np.uint8)
+        self.ring.slot(1)[...] = 9
+        self.assertEqual(self.ring.slot(0).sum(), 0)
+        self.assertTrue((self.ring.slot(1) == 9).all())
+
+    def test_attach_by_pickle(self):
+        attached = pickle.loads(pickle.dumps(self.ring))
+        attached.slot(2)[...] = 5
+        self.assertTrue((self.ring.slot(2) == 5).all())
+        # only the owner removes the memory
+        attached.close()
+        self.assertTrue((self.ring.slot(2) == 5).all())
+
+    def test_written_in_other_process(self):
+        process = multiprocessing.Process(
+            target=fill_slot, args=(self.ring, 1, 7)
+        )
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertTrue((self.ring.slot(1) == 7).all())
+
+    def test_close_removes_memory(self):
+        name = self.ring.name
+        self.ring.close()
+        # closing twice does nothing
+        self.ring.close()
+        if os.path.isdir("/dev/shm"):
+            self.assertFalse(os.path.exists(os.path.join("/dev/shm", name)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+# buffers kept for each shape and dtype, the rest is given back to numpy
+MAX_BUFFERS_PER_KEY = 16
+
+
+class FrameBufferPool:
+    """
+    Pool of preallocated frame buffers keyed by shape and dtype.
+    Buffers are taken with acquire() and given back with release(),
+    so a loop that decodes, filters and writes frames reuses the same
+    memory instead of allocating new arrays for every frame.
+    """
+
+    def __init__(self, max_per_key: int = MAX_BUFFERS_PER_KEY):
+        self.max_per_key = max_per_key
+        self._lock = threading.Lock()
+        self._free: Dict[Tuple, List[npt.NDArray]] = defaultdict(list)
+        # number of buffers created by the pool, does not grow when
+        # buffers are reused
+        self.allocations: int = 0
+
+    @staticmethod
+    def _key(shape: Tuple[int, ...], dtype) -> Tuple:
+        return tuple(shape), np.dtype(dtype).str
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> npt.NDArray:
+        """
+        Get a buffer with the given shape and dtype.
+        The content of the buffer is undefined.
+        :param shape: shape of the buffer, e.g. (height, width, 3)
+        :param dtype: numpy dtype of the buffer
+        :return: numpy array
+        """
+        key = self._key(shape, dtype)
+        with self._lock:
+            free = self._free[key]
+            if free:
+                return free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer: npt.NDArray) -> None:
+        """
+        Give a buffer back to the pool.
+        :param buffer: array returned by acquire()
+        :return: None
+        """
+        key = self._key(buffer.shape, buffer.dtype)
+        with self._lock:
+            free = self._free[key]
+            if len(free) < self.max_per_key:
+                free.append(buffer)
+
+    def clear(self) -> None:
+        """
+        Drop all free buffers.
+        :return: None
+        """
+        with self._lock:
+            self._free.clear()
+
+
+# pool shared by the filters of this process (scratch buffers)
+frame_buffer_pool = FrameBufferPool()
+
+
+def pass_through(
+    frame: npt.NDArray, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
+    """
+    Used by the filters when they do not change the frame.
+    If an output buffer is given the frame is copied into it.
+    :param frame: frame that is not changed
+    :param out: optional output buffer
+    :return: frame or out
+    """
+    if out is None or out is frame:
+        return frame
+    np.copyto(out, frame)
+    return out
@@ -1,13 +1,9 @@
+from typing import Optional
+
 import numpy.typing as npt
 from models.dc_video import DCFiltersParams
 
-from filter.filters.blur import blur_apply
-from filter.filters.brightness import brightness_apply
-from filter.filters.canny import canny_apply
-from filter.filters.hue import hue_apply
-from filter.filters.saturation import saturation_apply
-from filter.filters.sepia import sepia_apply
-from filter.filters.sharpen import sharpen_apply
+from filter.plan import compile_filter_plan
 
 
 def get_filtered_frame(
@@ -28,19 +24,36 @@ def get_filtered_frame(
     - Sepia: Converts the image to a warm-toned style, best applied last to
       avoid interference from other filters.
 
+    The filters are compiled into a FilterPlan once per filter values:
+    filters at their neutral value are skipped, saturation and hue share one
+    HSV conversion. Brightness, saturation, hue and sepia only depend on the
+    value of each pixel. Once the same values are used for several frames
+    they are compiled into one lookup table and applied in a single pass.
+    When filter_stats (filter/instrumentation.py) is enabled, the time of
+    each stage and the number of skipped filters are recorded.
+
     :param frame: the frame to filer.
     :param filter_data_params: the values for each filter from the ui sliders.
     :return: filtered frame.
     """
 
     # filter the frame respecting the filter order
-    frame = blur_apply(frame, filter_data_params.blur_strength)
-    frame = canny_apply(frame, filter_data_params.canny_threshold)
-    frame = sharpen_apply(frame, filter_data_params.sharpen_strength)
-    frame = brightness_apply(frame, filter_data_params.brightness_strength)
-    frame = saturation_apply(frame, filter_data_params.saturation_strength)
-    frame = hue_apply(frame, filter_data_params.hue_value)
-    frame = sepia_apply(frame, filter_data_params.sepia_strength)
+    return compile_filter_plan(filter_data_params).apply(frame)
 
 
-    return frame
+def get_filtered_frames(
+    frames: npt.NDArray,
+    filter_data_params: DCFiltersParams,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Function called to filter a stack of frames with the given values.
+    Same filters and order as get_filtered_frame, but the per-pixel filters
+    run once for the whole stack, so the Python call overhead is shared by
+    all frames of the batch.
+    :param frames: the frames to filter, array with shape (N, H, W, 3).
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param out: optional buffer for the filtered frames, same shape as frames.
+    :return: filtered frames.
+    """
+    return compile_filter_plan(filter_data_params).apply_batch(frames, out=out)
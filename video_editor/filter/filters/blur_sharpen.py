@@ -0,0 +1,38 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from filter.buffer_pool import frame_buffer_pool
+from filter.filters.blur import blur_apply
+from filter.filters.sharpen import sharpen_apply
+
+
+def blur_sharpen_apply(
+    frame: npt.NDArray,
+    blur_value,
+    sharpen_value,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Blur and sharpen a frame in a single pass: the blurred frame only goes
+    into a scratch buffer from the pool and is read again by the sharpen
+    filter right away. Run on strips of the frame (see tiled_apply), the
+    blurred strip is still in the cache of the thread that made it.
+    The result is the same as blur_apply followed by sharpen_apply, bit for
+    bit. Composing the two kernels into one convolution is slower: OpenCV
+    runs the Gaussian as two 1D passes in fixed point, the composed kernel
+    only as a 2D float filter.
+    :param frame: frame to filter
+    :param blur_value: blur slider value
+    :param sharpen_value: sharpen slider value
+    :param out: optional buffer for the result, can be the frame itself.
+    :return: filtered frame
+    """
+    if out is None:
+        out = np.empty_like(frame)
+    blurred = frame_buffer_pool.acquire(frame.shape, frame.dtype)
+    blur_apply(frame, blur_value, out=blurred)
+    sharpen_apply(blurred, sharpen_value, out=out)
+    frame_buffer_pool.release(blurred)
+    return out
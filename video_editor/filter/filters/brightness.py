@@ -1,15 +1,36 @@
+from typing import Optional
+
+import cv2
 import numpy as np
 import numpy.typing as npt
 
+from filter.buffer_pool import pass_through
+
+
+def brightness_table(value) -> npt.NDArray:
+    """
+    Table with the new value for each of the 256 possible pixel values.
+    :param value: slider value
+    :return: uint8 table with shape (256,)
+    """
+    # clip (limit) the values in an array -> increase or decrease matrix values depending of slider value.
+    values = np.arange(256, dtype=np.int16) + value
+    return np.clip(values, 0, 255).astype(np.uint8)
+
 
-def brightness_apply(frame: npt.NDArray, value) -> npt.NDArray:
+def brightness_apply(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
     """
     Increase or decrease brightness.
     :param frame: frame to filter
     :param value: slider value
+    :param out: optional buffer for the result, can be the frame itself.
     :return: filtered frame
     """
     if value != 0:
-        # clip (limit) the values in an array -> increase or decrease matrix values depending of slider value.
-        frame = np.clip(frame.astype(np.int16) + value, 0, 255).astype(np.uint8)
+        # look up every pixel in the table, no int16 copy of the frame needed
+        frame = cv2.LUT(frame, brightness_table(value), dst=out)
+    else:
+        frame = pass_through(frame, out)
     return frame
@@ -1,19 +1,40 @@
+from typing import Optional
+
 import cv2
-import numpy as np
 import numpy.typing as npt
 
+from filter.buffer_pool import pass_through
+
+
+def canny_edges(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
+    """
+    Canny edge detection, result as single channel image.
+    :param frame: frame to filter
+    :param value: slider value (> 0)
+    :param out: optional single channel buffer for the result.
+    :return: edges, uint8 image with shape (height, width).
+    """
+    # value here used for calculating some threshold...
+    return cv2.Canny(frame, value, value * 2, edges=out)
+
 
-def canny_apply(frame: npt.NDArray, value) -> npt.NDArray:
+def canny_apply(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
     """
     Canny filter for edge detection.
     https://docs.opencv.org/4.x/dd/d1a/group__imgproc__feature.html#ga04723e007ed888ddf11d9ba04e2232de
     :param frame: frame to filter
     :param value: slider value
+    :param out: optional buffer for the result, can be the frame itself.
     :return: filtered frame
     """
     if value > 0:
-        # value here used for calculating some threshold...
-        edges = cv2.Canny(frame, value, value * 2)
+        edges = canny_edges(frame, value)
         # convert an image from one color space to another.
-        frame = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+        frame = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR, dst=out)
+    else:
+        frame = pass_through(frame, out)
     return frame
@@ -0,0 +1,110 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from filter.buffer_pool import pass_through
+
+# cvtColor converts BGR <-> HSV in SIMD blocks and the last pixels of a row
+# (width % block) with scalar code, which can round one level differently.
+# Converted in rows of a multiple of this many pixels every pixel gets the
+# same result wherever it is in the frame (and in the 3D table of filter.lut)
+HSV_BLOCK_PIXELS = 64
+
+# longest row used for the conversion, in blocks
+_HSV_MAX_ROW_BLOCKS = 64
+
+
+def _hsv_row_pixels(blocks: int) -> int:
+    """
+    Row length for the conversion: the most blocks (at most
+    _HSV_MAX_ROW_BLOCKS) that divide the blocks of the frame evenly.
+    :param blocks: number of whole blocks of the frame
+    :return: number of pixels per row
+    """
+    for row_blocks in range(min(blocks, _HSV_MAX_ROW_BLOCKS), 0, -1):
+        if blocks % row_blocks == 0:
+            return row_blocks * HSV_BLOCK_PIXELS
+    return HSV_BLOCK_PIXELS
+
+
+def hsv_convert(
+    frame: npt.NDArray, code: int, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
+    """
+    cv2.cvtColor between BGR and HSV with the same result for a colour in
+    every column: the pixels are converted as rows of whole SIMD blocks
+    (see HSV_BLOCK_PIXELS), the pixels left over in a padded block.
+    :param frame: BGR or HSV frame
+    :param code: cv2.COLOR_BGR2HSV or cv2.COLOR_HSV2BGR
+    :param out: optional buffer for the result, can be the frame itself.
+    :return: converted frame
+    """
+    if out is None:
+        out = np.empty_like(frame)
+    if not frame.flags.c_contiguous or not out.flags.c_contiguous:
+        # no flat view of the pixels, e.g. a slice of a wider frame
+        return cv2.cvtColor(frame, code, dst=out)
+    pixels = frame.reshape(-1, 3)
+    result = out.reshape(-1, 3)
+    count = len(pixels) - len(pixels) % HSV_BLOCK_PIXELS
+    if count:
+        row = _hsv_row_pixels(count // HSV_BLOCK_PIXELS)
+        cv2.cvtColor(
+            pixels[:count].reshape(-1, row, 3),
+            code,
+            dst=result[:count].reshape(-1, row, 3),
+        )
+    if count < len(pixels):
+        block = np.zeros((1, HSV_BLOCK_PIXELS, 3), dtype=frame.dtype)
+        block[0, : len(pixels) - count] = pixels[count:]
+        cv2.cvtColor(block, code, dst=block)
+        result[count:] = block[0, : len(pixels) - count]
+    return out
+
+
+def hsv_table(saturation_value, hue_shift) -> npt.NDArray:
+    """
+    Build the per-channel table used to change saturation and hue
+    of a HSV frame. Same values as saturation_apply and hue_apply.
+    :param saturation_value: saturation slider value
+    :param hue_shift: amount to shift the hue (range: -180 to 180).
+    :return: uint8 table with shape (256, 1, 3), one column per H, S, V channel.
+    """
+    values = np.arange(256, dtype=np.int16)
+    table = np.empty((256, 1, 3), dtype=np.uint8)
+    # hue: wrap-around at 180 degrees
+    table[:, 0, 0] = np.mod(values + hue_shift, 180)
+    # saturation: clip (limit) to 0..255
+    table[:, 0, 1] = np.clip(values + saturation_value, 0, 255)
+    # value channel is not changed
+    table[:, 0, 2] = values
+    return table
+
+
+def hsv_apply(
+    frame: npt.NDArray,
+    saturation_value,
+    hue_shift,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Change saturation and hue with a single conversion to HSV and back.
+    Gives the same result as saturation_apply or hue_apply when only one of
+    them is active, without the extra HSV → BGR → HSV round trip otherwise.
+    :param frame: frame to filter (BGR format).
+    :param saturation_value: saturation slider value
+    :param hue_shift: amount to shift the hue (range: -180 to 180).
+    :param out: optional buffer for the result, can be the frame itself.
+    :return: filtered frame
+    """
+    if saturation_value != 0 or hue_shift != 0:
+        # all three steps work pixel by pixel, so they can run in place
+        hsv = hsv_convert(frame, cv2.COLOR_BGR2HSV, out=out)
+        # change H and S channels with one table lookup
+        cv2.LUT(hsv, hsv_table(saturation_value, hue_shift), dst=hsv)
+        frame = hsv_convert(hsv, cv2.COLOR_HSV2BGR, out=hsv)
+    else:
+        frame = pass_through(frame, out)
+    return frame
@@ -1,19 +1,18 @@
-import cv2
-import numpy as np
+from typing import Optional
 
+import numpy.typing as npt
 
-def hue_apply(frame, hue_shift):
+from filter.filters.hsv import hsv_apply
+
+
+def hue_apply(frame, hue_shift, out: Optional[npt.NDArray] = None):
     """
     Adjusts the hue of an image.
     :param frame: Input image (BGR format).
     :param hue_shift: Amount to shift the hue (range: -180 to 180).
+    :param out: optional buffer for the result, can be the frame itself.
     :return: Hue-adjusted image.
     """
-    # Convert BGR to HSV
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV).astype(np.float32)
-    # Add hue shift (wrap-around at 180 degrees)
-    hsv[:, :, 0] = (hsv[:, :, 0] + hue_shift) % 180
-    # Convert back to BGR
-    frame = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)
-
-    return frame
+    # Add hue shift (wrap-around at 180 degrees), done with a table in HSV
+    # space. A shift of 0 leaves the image as it is.
+    return hsv_apply(frame, 0, hue_shift, out=out)
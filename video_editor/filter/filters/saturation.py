@@ -1,17 +1,19 @@
-import cv2
-import numpy as np
+from typing import Optional
+
 import numpy.typing as npt
 
+from filter.filters.hsv import hsv_apply
+
 
-def saturation_apply(frame: npt.NDArray, value) -> npt.NDArray:
+def saturation_apply(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
     """
     Change frame saturation.
     :param frame: frame to filter
     :param value: slider value
+    :param out: optional buffer for the result, can be the frame itself.
     :return: filtered frame
     """
-    if value != 0:
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        hsv[:, :, 1] = np.clip(hsv[:, :, 1].astype(np.int16) + value, 0, 255)
-        frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-    return frame
+    # clip (limit) the S channel, done with a table in HSV space
+    return hsv_apply(frame, value, 0, out=out)
@@ -1,7 +1,11 @@
+from typing import Optional
+
 import cv2
 import numpy as np
 import numpy.typing as npt
 
+from filter.buffer_pool import pass_through
+
 # standard matrix for sepia filter
 sepia_matrix = np.array(
     [
@@ -12,18 +16,23 @@ sepia_matrix = np.array(
 )
 
 
-def sepia_apply(frame: npt.NDArray, value) -> npt.NDArray:
+def sepia_apply(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
     """
     Apply a sepia filter with sepia matrix.
     :param frame: frame to filter
     :param value: slider value
+    :param out: optional buffer for the result, can be the frame itself.
     :return: filtered frame
     """
     if value > 0:
         sepia_filter = (value / 100.0) * sepia_matrix + (
             1 - value / 100.0
         ) * np.eye(3)
-        frame = cv2.transform(frame, sepia_filter)
-        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        # cv2.transform saturates the uint8 result to 0..255
+        frame = cv2.transform(frame, sepia_filter, dst=out)
+    else:
+        frame = pass_through(frame, out)
 
     return frame
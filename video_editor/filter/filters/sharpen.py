@@ -1,16 +1,25 @@
+from typing import Optional
+
 import cv2
 import numpy as np
 import numpy.typing as npt
 
+from filter.buffer_pool import pass_through
+
 
-def sharpen_apply(frame: npt.NDArray, value) -> npt.NDArray:
+def sharpen_apply(
+    frame: npt.NDArray, value, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
     """
     Apply a sharpen filter. Enhances details.
     :param frame: frame to filter
     :param value: slider value
+    :param out: optional buffer for the result, can be the frame itself.
     :return: filtered frame
     """
     if value > 0:
         kernel = np.array([[0, -1, 0], [-1, 5 + value, -1], [0, -1, 0]])
-        frame = cv2.filter2D(frame, -1, kernel)
+        frame = cv2.filter2D(frame, -1, kernel, dst=out)
+    else:
+        frame = pass_through(frame, out)
     return frame
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy.typing as npt
+from models.dc_video import DCFiltersParams
+
+# memory used by the filtered frames of the preview
+# (about 40 frames of 1080p, several hundred of the scaled preview)
+FRAME_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def frame_cache_key(
+    input_path: Optional[str],
+    frame_index: int,
+    filter_data_params: DCFiltersParams,
+) -> Tuple[Optional[str], int, DCFiltersParams]:
+    """
+    Key of a filtered frame in the cache.
+    :param input_path: path of the video file
+    :param frame_index: 0-based index of the frame in the video
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :return: hashable key
+    """
+    return input_path, frame_index, filter_data_params
+
+
+class FilteredFrameCache:
+    """
+    Least recently used cache of filtered frames with a memory budget.
+    Replaying or scrubbing over frames that were already shown with the
+    same filter values returns the stored frame, no decoding and filtering.
+    """
+
+    def __init__(self, max_bytes: int = FRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # oldest entry first
+        self._frames: "OrderedDict[Hashable, npt.NDArray]" = OrderedDict()
+        self.nbytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: Hashable) -> Optional[npt.NDArray]:
+        """
+        Get a filtered frame.
+        :param key: key from frame_cache_key
+        :return: read-only frame or None if the frame is not cached.
+        """
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            # now the most recently used entry
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+    def put(self, key: Hashable, frame: npt.NDArray) -> None:
+        """
+        Store a filtered frame, the least recently used frames are dropped
+        until the cache fits into max_bytes again.
+        A read-only view of the frame is stored and shared by all later
+        get() calls, the frame of the caller stays writable (it can be the
+        unfiltered frame the caller keeps, e.g. without active filters).
+        :param key: key from frame_cache_key
+        :param frame: filtered frame, must not be changed afterwards
+        :return: None
+        """
+        # frames larger than the whole budget are not stored
+        if frame.nbytes > self.max_bytes:
+            return
+        frame = frame.view()
+        frame.flags.writeable = False
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._frames[key] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.max_bytes:
+                _, dropped = self._frames.popitem(last=False)
+                self.nbytes -= dropped.nbytes
+
+    def clear(self) -> None:
+        """
+        Drop all frames and reset the counters.
+        :return: None
+        """
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
@@ -0,0 +1,73 @@
+from typing import List, Optional, Tuple
+
+import numpy.typing as npt
+from models.dc_video import DCFiltersParams
+
+from filter.plan import compile_filter_plan
+
+
+class IncrementalFilterRunner:
+    """
+    Filters one frame again and again with changing filter values, e.g.
+    while a slider is moved on the paused video.
+    The output of every stage is kept for the current frame, so when only
+    a late stage changes (sepia, hue, ...) blur, Canny and sharpen are not
+    computed again: the plan restarts from the first stage that changed.
+    """
+
+    def __init__(self):
+        # frame the stored outputs belong to
+        self._frame: Optional[npt.NDArray] = None
+        # (name, key) of the stages run for the frame
+        self._stage_keys: List[Tuple] = []
+        # output of each of these stages
+        self._outputs: List[npt.NDArray] = []
+        # number of stages taken from the stored outputs in the last call
+        self.reused_stages: int = 0
+
+    def apply(
+        self, frame: npt.NDArray, filter_data_params: DCFiltersParams
+    ) -> npt.NDArray:
+        """
+        Filter a frame, same result as get_filtered_frame.
+        :param frame: frame to filter, must not be changed while it is used
+        with the runner.
+        :param filter_data_params: the values for each filter from the ui sliders.
+        :return: filtered frame, must not be changed (it is kept as input
+        of the next stages).
+        """
+        # blur and sharpen as separate stages, so the blurred frame is kept
+        plan = compile_filter_plan(filter_data_params, fuse_blur_sharpen=False)
+        plan.record_frames(1)
+        stage_keys = [(stage.name, stage.key) for stage in plan.stages]
+
+        # number of leading stages that are the same as in the last call
+        reused = 0
+        if frame is self._frame:
+            for old, new in zip(self._stage_keys, stage_keys):
+                if old != new:
+                    break
+                reused += 1
+        else:
+            self._frame = frame
+
+        outputs = self._outputs[:reused]
+        result = outputs[-1] if outputs else frame
+        for stage in plan.stages[reused:]:
+            result = stage.apply(result)
+            outputs.append(result)
+
+        self._stage_keys = stage_keys
+        self._outputs = outputs
+        self.reused_stages = reused
+        return result
+
+    def clear(self) -> None:
+        """
+        Drop the stored frame and stage outputs.
+        :return: None
+        """
+        self._frame = None
+        self._stage_keys = []
+        self._outputs = []
+        self.reused_stages = 0
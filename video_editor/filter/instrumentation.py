@@ -0,0 +1,126 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from models.dc_video import DCFilterStats, DCStageStats
+
+
+class FilterStats:
+    """
+    Time and number of frames of each filter stage, and the number of
+    filters skipped because their value is neutral.
+    Disabled by default: the stages then only check the enabled flag.
+    """
+
+    def __init__(self):
+        self.enabled: bool = False
+        self._lock = threading.Lock()
+        self._frames: int = 0
+        self._skipped: int = 0
+        self._stage_frames: Dict[str, int] = defaultdict(int)
+        self._stage_seconds: Dict[str, float] = defaultdict(float)
+
+    def record_stage(self, name: str, seconds: float, frames: int = 1) -> None:
+        """
+        Add the time of one stage call.
+        :param name: stage name
+        :param seconds: wall time of the call
+        :param frames: number of frames filtered by the call
+        :return: None
+        """
+        with self._lock:
+            self._stage_frames[name] += frames
+            self._stage_seconds[name] += seconds
+
+    def record_frames(self, frames: int, skipped_stages: int) -> None:
+        """
+        Count filtered frames.
+        :param frames: number of frames
+        :param skipped_stages: filters skipped for each of the frames
+        :return: None
+        """
+        with self._lock:
+            self._frames += frames
+            self._skipped += frames * skipped_stages
+
+    def add(self, stats: DCFilterStats) -> None:
+        """
+        Add the stats of another process (e.g. a filter process of the
+        export) to the stats of this process.
+        :param stats: DCFilterStats from FilterStats.snapshot()
+        :return: None
+        """
+        with self._lock:
+            self._frames += stats.frames
+            self._skipped += stats.skipped_stages
+            for name, stage in stats.stages.items():
+                self._stage_frames[name] += stage.frames
+                self._stage_seconds[name] += stage.total_ms / 1000
+
+    def snapshot(self) -> DCFilterStats:
+        """
+        Copy of the current values.
+        :return: DCFilterStats
+        """
+        with self._lock:
+            return DCFilterStats(
+                frames=self._frames,
+                skipped_stages=self._skipped,
+                stages={
+                    name: DCStageStats(
+                        frames=frames,
+                        total_ms=self._stage_seconds[name] * 1000,
+                    )
+                    for name, frames in self._stage_frames.items()
+                },
+            )
+
+    def reset(self) -> None:
+        """
+        Set all values back to 0.
+        :return: None
+        """
+        with self._lock:
+            self._frames = 0
+            self._skipped = 0
+            self._stage_frames.clear()
+            self._stage_seconds.clear()
+
+
+# stats of the filters of this process
+filter_stats = FilterStats()
+
+
+def merge_filter_stats(snapshots: Iterable[DCFilterStats]) -> DCFilterStats:
+    """
+    Add up the stats of several processes (e.g. segments of an export).
+    :param snapshots: DCFilterStats of each process
+    :return: DCFilterStats with the sums
+    """
+    merged = DCFilterStats()
+    for snapshot in snapshots:
+        merged.frames += snapshot.frames
+        merged.skipped_stages += snapshot.skipped_stages
+        for name, stage in snapshot.stages.items():
+            total = merged.stages.setdefault(name, DCStageStats())
+            total.frames += stage.frames
+            total.total_ms += stage.total_ms
+    return merged
+
+
+def format_filter_stats(stats: DCFilterStats) -> str:
+    """
+    Short text of the stats, e.g. for the status bar:
+    "blur 3.1 ms | color 4.2 ms | skipped 5.0".
+    :param stats: DCFilterStats from FilterStats.snapshot()
+    :return: text with the mean time per frame of each stage and the
+    mean number of skipped filters per frame
+    """
+    parts = [
+        f"{name} {stage.total_ms / stage.frames:.1f} ms"
+        for name, stage in stats.stages.items()
+        if stage.frames
+    ]
+    if stats.frames:
+        parts.append(f"skipped {stats.skipped_stages / stats.frames:.1f}")
+    return " | ".join(parts)
@@ -0,0 +1,272 @@
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+from models.dc_video import DCFiltersParams
+
+from filter.buffer_pool import frame_buffer_pool
+from filter.filters.brightness import brightness_apply
+from filter.filters.hsv import hsv_apply
+from filter.filters.sepia import sepia_apply
+
+# number of frames that have to be filtered with the same colour values
+# before the (expensive, ~1s) 3D lookup table is built in the background.
+# Playback and export reuse the values for many frames, dragging a slider
+# does not.
+COLOR_LUT_MIN_FRAMES = 24
+
+# one entry per 24 bit colour: 2^24 packed BGRA pixels
+COLOR_LUT_3D_SIZE = 1 << 24
+
+# mask used to drop the alpha byte of a packed BGRA pixel
+_BGR_MASK = np.uint32(0xFFFFFF)
+
+
+def color_params_key(
+    filter_data_params: DCFiltersParams,
+) -> Tuple[int, int, int, int]:
+    """
+    Get the values of the per-pixel filters (the ones whose output only
+    depends on the value of the pixel itself).
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :return: tuple (brightness, saturation, hue, sepia).
+    """
+    return (
+        filter_data_params.brightness_strength or 0,
+        filter_data_params.saturation_strength or 0,
+        filter_data_params.hue_value or 0,
+        filter_data_params.sepia_strength or 0,
+    )
+
+
+def is_per_channel(color_key: Tuple[int, int, int, int]) -> bool:
+    """
+    Check if the per-pixel filters change every channel on its own.
+    Only brightness does, saturation, hue and sepia mix the channels.
+    :param color_key: tuple returned by color_params_key
+    :return: True if a 256 entries table is enough.
+    """
+    _, saturation, hue, sepia = color_key
+    return not saturation and not hue and sepia <= 0
+
+
+def color_stages_apply(
+    frame: npt.NDArray,
+    filter_data_params: DCFiltersParams,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Apply the per-pixel filters one after the other:
+    Brightness → Saturation → Hue → Sepia.
+    Saturation and hue share a single conversion to HSV.
+    :param frame: frame to filter
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param out: optional buffer for the result, can be the frame itself.
+    :return: filtered frame
+    """
+    brightness, saturation, hue, sepia = color_params_key(filter_data_params)
+    frame = brightness_apply(frame, brightness, out=out)
+    # after the first filter the frame is in out (if given), keep it there
+    frame = hsv_apply(frame, saturation, hue, out=out)
+    frame = sepia_apply(frame, sepia, out=out)
+    return frame
+
+
+def build_color_lut(filter_data_params: DCFiltersParams) -> npt.NDArray:
+    """
+    Build the lookup table for the per-pixel filters.
+
+    If only brightness is active every channel is changed on its own, so a
+    256 entries table (used with cv2.LUT) is enough. Otherwise the filters mix
+    the channels (HSV conversion, sepia matrix) and a 3D table with an entry
+    for each of the 2^24 colours is built. The table is computed by filtering
+    a 4096x4096 frame that contains every colour once, so the result is
+    exactly the same as running the filters one after the other.
+
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :return: uint8 table with shape (256,) or uint32 table of packed BGRA
+    pixels with shape (2^24,).
+    """
+    if is_per_channel(color_params_key(filter_data_params)):
+        # per-channel table, just the values 0..255 filtered
+        ramp = np.arange(256, dtype=np.uint8).reshape(1, 256, 1)
+        return color_stages_apply(ramp, filter_data_params).reshape(256)
+
+    # frame with all the colours: the index of a pixel is its packed value
+    # little endian: byte 0 = blue, byte 1 = green, byte 2 = red
+    all_colors = np.arange(COLOR_LUT_3D_SIZE, dtype=np.uint32)
+    all_colors = all_colors.view(np.uint8).reshape(4096, 4096, 4)
+    all_colors = np.ascontiguousarray(all_colors[:, :, :3])
+
+    filtered = color_stages_apply(all_colors, filter_data_params)
+    # pack filtered pixels again into uint32 so a single take() is needed
+    packed = cv2.cvtColor(filtered, cv2.COLOR_BGR2BGRA)
+    return packed.view(np.uint32).reshape(COLOR_LUT_3D_SIZE)
+
+
+def color_lut_apply(
+    frame: npt.NDArray,
+    lut: npt.NDArray,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Apply a lookup table from build_color_lut to a frame.
+    :param frame: BGR frame to filter
+    :param lut: table returned by build_color_lut
+    :param out: optional buffer for the result, can be the frame itself.
+    :return: filtered frame
+    """
+    if lut.shape[0] == 256:
+        return cv2.LUT(frame, lut, dst=out)
+
+    height, width = frame.shape[:2]
+    # scratch buffers for the packed pixels, reused between frames
+    index = frame_buffer_pool.acquire((height, width), np.uint32)
+    packed = frame_buffer_pool.acquire((height, width), np.uint32)
+
+    # add an alpha channel so that every pixel is a single uint32 index
+    cv2.cvtColor(
+        frame,
+        cv2.COLOR_BGR2BGRA,
+        dst=index.view(np.uint8).reshape(height, width, 4),
+    )
+    np.bitwise_and(index, _BGR_MASK, out=index)
+    # one pass: gather the filtered pixel for every index
+    # (mode="clip" so that numpy does not buffer the output)
+    np.take(lut, index, out=packed, mode="clip")
+    frame = cv2.cvtColor(
+        packed.view(np.uint8).reshape(height, width, 4),
+        cv2.COLOR_BGRA2BGR,
+        dst=out,
+    )
+
+    frame_buffer_pool.release(index)
+    frame_buffer_pool.release(packed)
+    return frame
+
+
+def build_gray_color_lut(filter_data_params: DCFiltersParams) -> npt.NDArray:
+    """
+    Build the lookup table of the per-pixel filters for gray pixels
+    (B = G = R), e.g. the output of Canny. Each gray value gives one BGR
+    colour (saturation and sepia can add colour), as if the gray frame had
+    been expanded to BGR before the filters. The result is the same bit for
+    bit (see hsv_convert).
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :return: uint8 table with shape (256, 1, 3) for cv2.LUT
+    """
+    ramp = np.arange(256, dtype=np.uint8).reshape(1, 256, 1)
+    ramp = np.ascontiguousarray(np.repeat(ramp, 3, axis=2))
+    filtered = color_stages_apply(ramp, filter_data_params)
+    return np.ascontiguousarray(filtered.reshape(256, 1, 3))
+
+
+def gray_color_lut_apply(
+    gray: npt.NDArray,
+    lut: Optional[npt.NDArray] = None,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Expand a single channel frame to BGR and apply a table from
+    build_gray_color_lut. Without table the frame is only expanded.
+    :param gray: uint8 image with shape (height, width)
+    :param lut: table returned by build_gray_color_lut or None
+    :param out: optional BGR buffer for the result
+    :return: BGR frame
+    """
+    frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=out)
+    if lut is not None:
+        frame = cv2.LUT(frame, lut, dst=frame)
+    return frame
+
+
+class ColorLutCache:
+    """
+    Keeps the lookup table of the last used per-pixel filter values.
+    The 3D table uses 64 MB, so only one table is kept.
+    It takes about 1s to build, so it is built in a background thread:
+    playback, slider previews and the export threads keep running the
+    filters directly until it is ready. Both give the same pixels, so the
+    frames do not depend on when the table is ready.
+    """
+
+    def __init__(self, min_frames: int = COLOR_LUT_MIN_FRAMES):
+        self.min_frames = min_frames
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[int, int, int, int]] = None
+        self._uses: int = 0
+        self._lut: Optional[npt.NDArray] = None
+        # thread building the 3D table for self._key
+        self._builder: Optional[threading.Thread] = None
+
+    def get(self, filter_data_params: DCFiltersParams) -> Optional[npt.NDArray]:
+        """
+        Get the lookup table for the given filter values.
+        A 3D table is started to be built in the background after the
+        same values were requested min_frames times. Until it is ready None
+        is returned and the caller should run the filters directly.
+        :param filter_data_params: the values for each filter from the ui sliders.
+        :return: lookup table or None.
+        """
+        key = color_params_key(filter_data_params)
+        with self._lock:
+            # new values, forget the old table
+            if key != self._key:
+                self._key = key
+                self._uses = 0
+                self._lut = None
+                self._builder = None
+            self._uses += 1
+
+            if self._lut is None:
+                # per-channel tables are cheap, build them right away
+                if is_per_channel(key):
+                    self._lut = build_color_lut(filter_data_params)
+                elif self._uses >= self.min_frames and self._builder is None:
+                    self._builder = threading.Thread(
+                        target=self._build,
+                        args=(key, filter_data_params),
+                        name="color-lut",
+                    )
+                    self._builder.start()
+
+            return self._lut
+
+    def _build(
+        self,
+        key: Tuple[int, int, int, int],
+        filter_data_params: DCFiltersParams,
+    ) -> None:
+        lut = build_color_lut(filter_data_params)
+        with self._lock:
+            # the values may have changed while the table was built
+            if key == self._key:
+                self._lut = lut
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until a table that is being built is ready, e.g. before
+        timing frames that should use it.
+        :param timeout: seconds to wait at most, None: no limit
+        :return: None
+        """
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def clear(self) -> None:
+        """
+        Drop the stored table.
+        :return: None
+        """
+        with self._lock:
+            self._key = None
+            self._uses = 0
+            self._lut = None
+            self._builder = None
+
+
+# table shared by all callers of get_filtered_frame in this process
+color_lut_cache = ColorLutCache()
@@ -0,0 +1,368 @@
+import time
+from functools import lru_cache, partial
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from models.dc_video import DCFiltersParams
+
+from filter.buffer_pool import frame_buffer_pool, pass_through
+from filter.filters.blur import (
+    BOX_BLUR_MIN_VALUE,
+    blur_apply,
+    box_blur_radius,
+)
+from filter.filters.blur_sharpen import blur_sharpen_apply
+from filter.filters.canny import canny_edges
+from filter.filters.sharpen import sharpen_apply
+from filter.instrumentation import filter_stats
+from filter.lut import (
+    build_gray_color_lut,
+    color_lut_apply,
+    color_lut_cache,
+    color_params_key,
+    color_stages_apply,
+    gray_color_lut_apply,
+)
+from filter.tiling import should_tile, tiled_apply
+
+
+class FilterStage:
+    """
+    A single step of a filter plan.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., npt.NDArray],
+        key: Tuple,
+        per_pixel: bool = False,
+        halo: Optional[int] = None,
+        channels: Optional[int] = None,
+    ):
+        # name used to identify the stage (blur, canny, ...)
+        self.name = name
+        # function called with the frame and an optional output buffer,
+        # returns the filtered frame
+        self.func = func
+        # filter values used by this stage
+        self.key = key
+        # True if the output of a pixel only depends on the pixel itself,
+        # then a stack of frames can be filtered as one big image
+        self.per_pixel = per_pixel
+        # kernel radius of a neighborhood filter that can run on strips of
+        # the frame in parallel, None if the stage can not be split
+        self.halo = halo
+        # channels of the output: 1 (gray), 3 (BGR) or None (as the input)
+        self.channels = channels
+
+    def output_shape(self, input_shape: Tuple[int, ...]) -> Tuple[int, ...]:
+        """
+        Shape of the stage output for a given input shape.
+        :param input_shape: (..., H, W, 3) for BGR or (..., H, W) for gray.
+        :return: output shape
+        """
+        if self.channels == 1:
+            # BGR in, gray out: drop the channel axis
+            return tuple(input_shape[:-1])
+        if self.channels == 3:
+            # gray in, BGR out: add the channel axis
+            return tuple(input_shape) + (3,)
+        return tuple(input_shape)
+
+    def apply(
+        self,
+        frame: npt.NDArray,
+        out: Optional[npt.NDArray] = None,
+        frames: int = 1,
+    ) -> npt.NDArray:
+        """
+        Run the stage on a frame.
+        Large frames are split into strips filtered in parallel threads
+        if the stage allows it.
+        :param frame: frame to filter
+        :param out: optional buffer for the result.
+        :param frames: number of video frames in frame (stack of frames
+        seen as one image), only used for the filter stats.
+        :return: filtered frame
+        """
+        if not filter_stats.enabled:
+            return self._run(frame, out)
+        start = time.perf_counter()
+        result = self._run(frame, out)
+        filter_stats.record_stage(
+            self.name, time.perf_counter() - start, frames
+        )
+        return result
+
+    def _run(
+        self, frame: npt.NDArray, out: Optional[npt.NDArray]
+    ) -> npt.NDArray:
+        if self.halo is not None and out is not frame and should_tile(frame):
+            return tiled_apply(self.func, frame, self.halo, out=out)
+        return self.func(frame, out=out)
+
+    def __repr__(self) -> str:
+        return f"FilterStage({self.name}, {self.key})"
+
+
+def color_stage_func(
+    filter_data_params: DCFiltersParams,
+    frame: npt.NDArray,
+    out: Optional[npt.NDArray] = None,
+) -> npt.NDArray:
+    """
+    Per-pixel filters: use the lookup table once it is built,
+    otherwise run brightness, HSV and sepia directly.
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param frame: frame to filter
+    :param out: optional buffer for the result.
+    :return: filtered frame
+    """
+    lut = color_lut_cache.get(filter_data_params)
+    if lut is not None:
+        return color_lut_apply(frame, lut, out=out)
+    return color_stages_apply(frame, filter_data_params, out=out)
+
+
+class FilterPlan:
+    """
+    The filters that have to run for a set of filter values.
+    Filters that would not change the frame (slider at its neutral value)
+    are not part of the plan.
+    The plan is built once and used for every frame.
+    """
+
+    def __init__(
+        self,
+        filter_data_params: DCFiltersParams,
+        fuse_blur_sharpen: bool = True,
+    ):
+        """
+        :param filter_data_params: the values for each filter from the ui sliders.
+        :param fuse_blur_sharpen: run blur and sharpen as one stage
+        (see blur_sharpen_apply). Off for IncrementalFilterRunner, which
+        keeps the blurred frame while only sharpen changes.
+        """
+        self.filter_params = filter_data_params
+        self.stages: List[FilterStage] = []
+
+        blur = filter_data_params.blur_strength or 0
+        canny = filter_data_params.canny_threshold or 0
+        sharpen = filter_data_params.sharpen_strength or 0
+        brightness, saturation, hue, sepia = color_params_key(
+            filter_data_params
+        )
+        # filters at their neutral value, they are not part of the plan
+        self.skipped_filters = sum(
+            value <= 0 for value in (blur, canny, sharpen, sepia)
+        ) + sum(value == 0 for value in (brightness, saturation, hue))
+
+        # blur and sharpen are both neighborhood filters, without Canny in
+        # between they run as one stage (one pass over the frame, or over
+        # each strip when tiled). Only for the Gaussian: the box filters of
+        # a strong blur need a large halo and gain nothing
+        fuse = (
+            fuse_blur_sharpen
+            and 0 < blur < BOX_BLUR_MIN_VALUE
+            and canny <= 0
+            and sharpen > 0
+        )
+
+        # filter order: Blur → Canny → Sharpen → per-pixel filters
+        if fuse:
+            self.stages.append(
+                FilterStage(
+                    "blur_sharpen",
+                    partial(
+                        blur_sharpen_apply,
+                        blur_value=blur,
+                        sharpen_value=sharpen,
+                    ),
+                    (blur, sharpen),
+                    halo=blur + 1,
+                )
+            )
+        elif blur > 0:
+            self.stages.append(
+                FilterStage(
+                    "blur",
+                    partial(blur_apply, value=blur),
+                    (blur,),
+                    # box filters of a strong blur reach less far
+                    halo=max(blur, box_blur_radius(blur)),
+                )
+            )
+        # after Canny the frame is gray (B = G = R): keep a single channel
+        # and expand to BGR only once at the end, the rest of the chain then
+        # works on a third of the data
+        gray = canny > 0
+        if gray:
+            self.stages.append(
+                FilterStage(
+                    "canny",
+                    partial(canny_edges, value=canny),
+                    (canny,),
+                    channels=1,
+                )
+            )
+        if sharpen > 0 and not fuse:
+            self.stages.append(
+                FilterStage(
+                    "sharpen",
+                    partial(sharpen_apply, value=sharpen),
+                    (sharpen,),
+                    halo=1,
+                )
+            )
+
+        # Brightness → Saturation → Hue → Sepia in one stage,
+        # saturation and hue share the HSV conversion
+        color_key = (brightness, saturation, hue, sepia)
+        color = brightness != 0 or saturation != 0 or hue != 0 or sepia > 0
+        if gray:
+            # gray pixels: 256 entries table from gray value to BGR colour,
+            # or only the expansion to BGR if no per-pixel filter is active
+            lut = build_gray_color_lut(filter_data_params) if color else None
+            self.stages.append(
+                FilterStage(
+                    "color" if color else "gray_to_bgr",
+                    partial(gray_color_lut_apply, lut=lut),
+                    color_key,
+                    per_pixel=True,
+                    channels=3,
+                )
+            )
+        elif color:
+            self.stages.append(
+                FilterStage(
+                    "color",
+                    partial(color_stage_func, filter_data_params),
+                    color_key,
+                    per_pixel=True,
+                )
+            )
+
+    @property
+    def is_identity(self) -> bool:
+        """
+        True if no filter changes the frame.
+        """
+        return not self.stages
+
+    def record_frames(self, frames: int) -> None:
+        """
+        Count filtered frames and skipped filters in the filter stats.
+        :param frames: number of frames filtered with the plan
+        :return: None
+        """
+        if filter_stats.enabled:
+            filter_stats.record_frames(frames, self.skipped_filters)
+
+    def _apply_stages(
+        self,
+        frames: npt.NDArray,
+        out: npt.NDArray,
+        run_stage: Callable[[FilterStage, npt.NDArray, npt.NDArray], None],
+    ) -> npt.NDArray:
+        """
+        Run all stages, the last one writes into out. The results of the
+        other stages go into buffers from the pool (shape depends on the
+        stage, gray or BGR), which are given back as soon as the next stage
+        has read them, so no memory is allocated once the pool is warm.
+        :param frames: frame or stack of frames to filter
+        :param out: buffer for the result
+        :param run_stage: called as run_stage(stage, source, target)
+        :return: out
+        """
+        if not self.stages:
+            return pass_through(frames, out)
+
+        last = len(self.stages) - 1
+        previous = None
+        for index, stage in enumerate(self.stages):
+            if index == last:
+                target = out
+            else:
+                target = frame_buffer_pool.acquire(
+                    stage.output_shape(frames.shape), frames.dtype
+                )
+            run_stage(stage, frames, target)
+            # the input of this stage is not needed anymore
+            if previous is not None:
+                frame_buffer_pool.release(previous)
+            previous = target if index != last else None
+            frames = target
+        return out
+
+    def apply(
+        self, frame: npt.NDArray, out: Optional[npt.NDArray] = None
+    ) -> npt.NDArray:
+        """
+        Filter a frame with all stages of the plan.
+        Without out, new arrays are returned and the frame is not changed.
+        With out, no memory is allocated in a decode → filter → write loop
+        (see _apply_stages).
+        :param frame: frame to filter
+        :param out: optional buffer for the result (same shape as frame).
+        :return: filtered frame
+        """
+        self.record_frames(1)
+        if out is None:
+            for stage in self.stages:
+                frame = stage.apply(frame)
+            return frame
+
+        def run_stage(stage, source, target):
+            stage.apply(source, out=target)
+
+        return self._apply_stages(frame, out, run_stage)
+
+    def apply_batch(
+        self, frames: npt.NDArray, out: Optional[npt.NDArray] = None
+    ) -> npt.NDArray:
+        """
+        Filter a stack of frames with all stages of the plan.
+        Per-pixel stages see the stack (N, H, W, 3) as one (N * H, W, 3)
+        image and filter all frames with a single call, neighborhood
+        stages (blur, canny, sharpen) loop over the frames.
+        :param frames: contiguous uint8 array with shape (N, H, W, 3)
+        :param out: optional contiguous buffer for the result, same shape.
+        :return: filtered frames
+        """
+        frames = np.ascontiguousarray(frames)
+        if out is None:
+            out = np.empty_like(frames)
+        self.record_frames(len(frames))
+
+        def run_stage(stage, source, target):
+            if stage.per_pixel:
+                # reshape of contiguous arrays gives views, no copy
+                stage.apply(
+                    source.reshape((-1,) + source.shape[2:]),
+                    out=target.reshape((-1,) + target.shape[2:]),
+                    frames=len(source),
+                )
+            else:
+                for frame, target_frame in zip(source, target):
+                    stage.apply(frame, out=target_frame)
+
+        return self._apply_stages(frames, out, run_stage)
+
+    def __repr__(self) -> str:
+        return f"FilterPlan({self.stages})"
+
+
+@lru_cache(maxsize=16)
+def compile_filter_plan(
+    filter_data_params: DCFiltersParams, fuse_blur_sharpen: bool = True
+) -> FilterPlan:
+    """
+    Get the filter plan for the given filter values.
+    Plans are cached, the same values always return the same plan.
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param fuse_blur_sharpen: run blur and sharpen as one stage.
+    :return: FilterPlan
+    """
+    return FilterPlan(filter_data_params, fuse_blur_sharpen)
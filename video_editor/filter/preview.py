@@ -0,0 +1,64 @@
+import dataclasses
+from typing import Optional
+
+import cv2
+import numpy.typing as npt
+from models.dc_video import DCFiltersParams
+
+from filter.buffer_pool import pass_through
+
+# height (px) of the video shown in the ui
+PREVIEW_HEIGHT = 400
+
+
+def preview_scale(frame_height: int, preview_height=PREVIEW_HEIGHT) -> float:
+    """
+    Factor used to scale the frames of a video to the preview size.
+    Frames are only made smaller, never larger.
+    :param frame_height: height of the video frames
+    :param preview_height: height of the preview
+    :return: scale factor, at most 1.0
+    """
+    if not frame_height or frame_height <= preview_height:
+        return 1.0
+    return preview_height / frame_height
+
+
+def preview_frame(
+    frame: npt.NDArray, scale: float, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
+    """
+    Scale a frame down to the preview size, so the preview is filtered
+    at display size instead of the full resolution of the video.
+    INTER_AREA averages the source pixels (no aliasing when shrinking).
+    :param frame: full resolution frame
+    :param scale: factor from preview_scale
+    :param out: optional buffer for the result, with the preview size.
+    :return: scaled frame
+    """
+    if scale >= 1.0:
+        return pass_through(frame, out)
+    height, width = frame.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(frame, size, dst=out, interpolation=cv2.INTER_AREA)
+
+
+def scale_filter_params(
+    filter_data_params: DCFiltersParams, scale: float
+) -> DCFiltersParams:
+    """
+    Filter values for a frame scaled by the given factor, so the filtered
+    preview looks like the scaled full resolution result.
+    Only the blur works on a radius in pixels, it is scaled with the frame.
+    Sharpen has a fixed 3x3 kernel and Canny thresholds compare gradients
+    between neighbour pixels, both are kept.
+    :param filter_data_params: the values for each filter from the ui sliders.
+    :param scale: factor from preview_scale
+    :return: DCFiltersParams for the scaled frame
+    """
+    blur = filter_data_params.blur_strength
+    if scale >= 1.0 or not blur:
+        return filter_data_params
+    return dataclasses.replace(
+        filter_data_params, blur_strength=round(blur * scale)
+    )
@@ -1,8 +1,15 @@
 import unittest
 
+import cv2
 import numpy as np
 
-from filter.filters.blur import blur_apply
+from filter.filters.blur import (
+    BOX_BLUR_MIN_VALUE,
+    blur_apply,
+    box_blur_apply,
+    box_blur_error_bound,
+    box_sizes,
+)
 
 
 class TestBlurApply(unittest.TestCase):
@@ -39,6 +46,46 @@ class TestBlurApply(unittest.TestCase):
         result = blur_apply(self.image, -1)
         np.testing.assert_array_equal(result, self.image)
 
+    def test_blur_apply_large_value_uses_box_filters(self):
+        # from BOX_BLUR_MIN_VALUE on the box approximation is used
+        value = BOX_BLUR_MIN_VALUE + 2
+        np.testing.assert_array_equal(
+            blur_apply(self.image, value), box_blur_apply(self.image, value)
+        )
+
+
+class TestBoxBlurApply(unittest.TestCase):
+    """
+    Test for the constant time blur
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.image = np.random.randint(0, 256, (120, 160, 3), dtype=np.uint8)
+
+    def test_box_sizes_odd(self):
+        for value in (BOX_BLUR_MIN_VALUE, 20, 50):
+            sizes = box_sizes(value)
+            self.assertEqual(len(sizes), 3)
+            self.assertTrue(all(size % 2 == 1 for size in sizes))
+
+    def test_box_sizes_variance_close_to_gaussian(self):
+        # variance of a box of size w is (w^2 - 1) / 12
+        for value in (BOX_BLUR_MIN_VALUE, 20, 50):
+            variance = sum((size**2 - 1) / 12 for size in box_sizes(value))
+            sigma = 0.3 * value + 0.5
+            self.assertAlmostEqual(variance / sigma**2, 1.0, delta=0.15)
+
+    def test_box_blur_within_error_bound(self):
+        for value in (BOX_BLUR_MIN_VALUE, 15, 30):
+            expected = cv2.GaussianBlur(
+                self.image, (2 * value + 1, 2 * value + 1), 0
+            )
+            result = box_blur_apply(self.image, value)
+            difference = np.abs(result.astype(np.int16) - expected)
+            self.assertLessEqual(difference.max(), box_blur_error_bound(value))
+            self.assertLess(difference.mean(), 1.0)
+
 
 if __name__ == "__main__":
     unittest.main()
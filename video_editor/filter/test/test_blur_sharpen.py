@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter import tiling
+from filter.filters.blur import BOX_BLUR_MIN_VALUE, blur_apply
+from filter.filters.blur_sharpen import blur_sharpen_apply
+from filter.filters.sharpen import sharpen_apply
+from filter.plan import FilterPlan
+
+
+class TestBlurSharpenApply(unittest.TestCase):
+    """
+    Test for blur and sharpen run as one pass
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.image = np.random.randint(0, 256, (100, 120, 3), dtype=np.uint8)
+
+    def test_matches_two_passes(self):
+        for blur in range(1, BOX_BLUR_MIN_VALUE):
+            for sharpen in (1, 5):
+                expected = sharpen_apply(blur_apply(self.image, blur), sharpen)
+                result = blur_sharpen_apply(self.image, blur, sharpen)
+                np.testing.assert_array_equal(result, expected)
+
+    def test_output_buffer(self):
+        expected = sharpen_apply(blur_apply(self.image, 2), 3)
+        out = np.empty_like(self.image)
+        result = blur_sharpen_apply(self.image, 2, 3, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(out, expected)
+        # in place
+        image = self.image.copy()
+        blur_sharpen_apply(image, 2, 3, out=image)
+        np.testing.assert_array_equal(image, expected)
+
+
+class TestFilterPlanFusion(unittest.TestCase):
+    """
+    Test that the plan fuses the blur/sharpen pair
+    """
+
+    def setUp(self):
+        self.frame = np.random.randint(0, 256, (256, 64, 3), dtype=np.uint8)
+
+    def stage_names(self, params):
+        return [stage.name for stage in FilterPlan(params).stages]
+
+    def test_fused(self):
+        params = DCFiltersParams(
+            blur_strength=2, sharpen_strength=1, sepia_strength=10
+        )
+        self.assertEqual(self.stage_names(params), ["blur_sharpen", "color"])
+
+    def test_not_fused_with_canny(self):
+        params = DCFiltersParams(
+            blur_strength=2, canny_threshold=50, sharpen_strength=1
+        )
+        self.assertEqual(
+            self.stage_names(params),
+            ["blur", "canny", "sharpen", "gray_to_bgr"],
+        )
+
+    def test_not_fused_with_box_blur(self):
+        params = DCFiltersParams(
+            blur_strength=BOX_BLUR_MIN_VALUE, sharpen_strength=1
+        )
+        self.assertEqual(self.stage_names(params), ["blur", "sharpen"])
+
+    def test_not_fused_when_disabled(self):
+        params = DCFiltersParams(blur_strength=2, sharpen_strength=1)
+        plan = FilterPlan(params, fuse_blur_sharpen=False)
+        self.assertEqual(
+            [stage.name for stage in plan.stages], ["blur", "sharpen"]
+        )
+
+    def test_plan_matches_two_passes(self):
+        for blur in range(1, BOX_BLUR_MIN_VALUE):
+            params = DCFiltersParams(blur_strength=blur, sharpen_strength=2)
+            expected = sharpen_apply(blur_apply(self.frame, blur), 2)
+            plan = FilterPlan(params)
+            np.testing.assert_array_equal(plan.apply(self.frame), expected)
+            out = np.empty_like(self.frame)
+            plan.apply(self.frame, out=out)
+            np.testing.assert_array_equal(out, expected)
+            # every frame counts as large with 4 threads: strips with a
+            # halo of blur + 1 rows
+            with patch.multiple(
+                tiling, TILE_MIN_PIXELS=0, TILE_MIN_ROWS=16, _tile_workers=4
+            ):
+                plan.apply(self.frame, out=out)
+            np.testing.assert_array_equal(out, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.buffer_pool import FrameBufferPool, frame_buffer_pool
+from filter.filters.blur import blur_apply
+from filter.filters.brightness import brightness_apply
+from filter.filters.canny import canny_apply
+from filter.filters.hue import hue_apply
+from filter.filters.saturation import saturation_apply
+from filter.filters.sepia import sepia_apply
+from filter.filters.sharpen import sharpen_apply
+from filter.plan import FilterPlan
+
+
+class TestFrameBufferPool(unittest.TestCase):
+    """
+    Test for the frame buffer pool
+    """
+
+    def test_acquire_shape_and_dtype(self):
+        pool = FrameBufferPool()
+        buffer = pool.acquire((10, 20, 3), np.uint8)
+        self.assertEqual(buffer.shape, (10, 20, 3))
+        self.assertEqual(buffer.dtype, np.uint8)
+
+    def test_released_buffer_is_reused(self):
+        pool = FrameBufferPool()
+        buffer = pool.acquire((10, 20, 3))
+        pool.release(buffer)
+        self.assertIs(pool.acquire((10, 20, 3)), buffer)
+        self.assertEqual(pool.allocations, 1)
+
+    def test_buffers_keyed_by_shape_and_dtype(self):
+        pool = FrameBufferPool()
+        pool.release(pool.acquire((10, 20, 3)))
+        # other shape and other dtype: new buffers
+        pool.acquire((10, 20), np.uint8)
+        pool.acquire((10, 20, 3), np.uint32)
+        self.assertEqual(pool.allocations, 3)
+
+    def test_max_per_key(self):
+        pool = FrameBufferPool(max_per_key=1)
+        first = pool.acquire((4, 4))
+        second = pool.acquire((4, 4))
+        pool.release(first)
+        pool.release(second)
+        # only one buffer kept
+        pool.acquire((4, 4))
+        pool.acquire((4, 4))
+        self.assertEqual(pool.allocations, 3)
+
+
+class TestInPlaceFilters(unittest.TestCase):
+    """
+    Test the out= variants of the filters
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (60, 80, 3), dtype=np.uint8)
+        self.filters = [
+            (blur_apply, 3),
+            (canny_apply, 60),
+            (sharpen_apply, 2),
+            (brightness_apply, -20),
+            (saturation_apply, 40),
+            (hue_apply, 25),
+            (sepia_apply, 70),
+        ]
+
+    def test_out_matches_new_array(self):
+        for func, value in self.filters:
+            expected = func(self.frame, value)
+            out = np.empty_like(self.frame)
+            result = func(self.frame, value, out=out)
+            self.assertIs(result, out)
+            np.testing.assert_array_equal(result, expected)
+
+    def test_out_can_be_the_frame(self):
+        for func, value in self.filters:
+            expected = func(self.frame, value)
+            frame = self.frame.copy()
+            func(frame, value, out=frame)
+            np.testing.assert_array_equal(frame, expected)
+
+    def test_no_change_copies_into_out(self):
+        out = np.zeros_like(self.frame)
+        result = blur_apply(self.frame, 0, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(out, self.frame)
+
+    def test_plan_with_out(self):
+        params = DCFiltersParams(
+            blur_strength=2,
+            canny_threshold=0,
+            sharpen_strength=1,
+            brightness_strength=10,
+            saturation_strength=20,
+            hue_value=5,
+            sepia_strength=30,
+        )
+        plan = FilterPlan(params)
+        expected = plan.apply(self.frame)
+        out = np.empty_like(self.frame)
+        result = plan.apply(self.frame, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_plan_with_out_no_new_allocations(self):
+        plan = FilterPlan(DCFiltersParams(blur_strength=2, sharpen_strength=1))
+        out = np.empty_like(self.frame)
+        plan.apply(self.frame, out=out)
+        # scratch buffers are reused from now on
+        allocations = frame_buffer_pool.allocations
+        for _ in range(5):
+            plan.apply(self.frame, out=out)
+        self.assertEqual(frame_buffer_pool.allocations, allocations)
+
+
+if __name__ == "__main__":
+    unittest.main()
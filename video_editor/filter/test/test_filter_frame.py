@@ -4,7 +4,7 @@ import cv2
 import numpy as np
 from models.dc_video import DCFiltersParams
 
-from filter.filter_frame import get_filtered_frame
+from filter.filter_frame import get_filtered_frame, get_filtered_frames
 
 
 class TestGetFilteredFrame(unittest.TestCase):
@@ -52,5 +52,57 @@ class TestGetFilteredFrame(unittest.TestCase):
         self.assertTrue(np.all((filtered_frame >= 0) & (filtered_frame <= 255)))
 
 
+class TestGetFilteredFrames(unittest.TestCase):
+    def setUp(self):
+        """Create a sample stack of frames for testing."""
+        # 5 frames of 60x80 with 3 color channels
+        self.frames = np.random.randint(0, 256, (5, 60, 80, 3), dtype=np.uint8)
+
+        self.fake_filter_params = DCFiltersParams(
+            blur_strength=3,
+            canny_threshold=0,
+            sepia_strength=50,
+            brightness_strength=30,
+            saturation_strength=30,
+            sharpen_strength=2,
+            hue_value=30,
+        )
+
+    def test_batch_matches_single_frames(self):
+        """Test if filtering a stack gives the same frames as one by one."""
+        filtered_frames = get_filtered_frames(
+            self.frames, self.fake_filter_params
+        )
+        self.assertEqual(filtered_frames.shape, self.frames.shape)
+        for frame, filtered_frame in zip(self.frames, filtered_frames):
+            np.testing.assert_array_equal(
+                get_filtered_frame(frame, self.fake_filter_params),
+                filtered_frame,
+            )
+
+    def test_batch_with_canny(self):
+        """Test a stack with edge detection active."""
+        filter_params = DCFiltersParams(canny_threshold=80, sepia_strength=20)
+        filtered_frames = get_filtered_frames(self.frames, filter_params)
+        np.testing.assert_array_equal(
+            get_filtered_frame(self.frames[2], filter_params),
+            filtered_frames[2],
+        )
+
+    def test_batch_with_out(self):
+        """Test if the result is written into the given buffer."""
+        out = np.empty_like(self.frames)
+        result = get_filtered_frames(
+            self.frames, self.fake_filter_params, out=out
+        )
+        self.assertIs(result, out)
+
+    def test_batch_does_not_change_input(self):
+        """Test if the input stack is left as it is."""
+        frames = self.frames.copy()
+        get_filtered_frames(frames, self.fake_filter_params)
+        np.testing.assert_array_equal(frames, self.frames)
+
+
 if __name__ == "__main__":
     unittest.main()
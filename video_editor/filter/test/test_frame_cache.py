@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.frame_cache import FilteredFrameCache, frame_cache_key
+
+
+class TestFilteredFrameCache(unittest.TestCase):
+    """
+    Test for the cache of filtered frames
+    """
+
+    def setUp(self):
+        # each frame uses 10 * 10 * 3 = 300 bytes
+        self.frames = [
+            np.full((10, 10, 3), i, dtype=np.uint8) for i in range(4)
+        ]
+        self.params = DCFiltersParams(blur_strength=3)
+
+    def key(self, index, params=None):
+        return frame_cache_key("video.mp4", index, params or self.params)
+
+    def test_hit_and_miss(self):
+        cache = FilteredFrameCache(max_bytes=1000)
+        self.assertIsNone(cache.get(self.key(0)))
+        cache.put(self.key(0), self.frames[0])
+        # no copy is stored
+        self.assertTrue(
+            np.shares_memory(cache.get(self.key(0)), self.frames[0])
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_includes_filter_values(self):
+        cache = FilteredFrameCache(max_bytes=1000)
+        cache.put(self.key(0), self.frames[0])
+        other = DCFiltersParams(blur_strength=4)
+        self.assertIsNone(cache.get(self.key(0, other)))
+        # equal values give the same key
+        self.assertIsNotNone(cache.get(self.key(0, DCFiltersParams(3))))
+
+    def test_least_recently_used_is_dropped(self):
+        cache = FilteredFrameCache(max_bytes=900)
+        for index in range(3):
+            cache.put(self.key(index), self.frames[index])
+        # frame 0 is used again, frame 1 is now the oldest
+        cache.get(self.key(0))
+        cache.put(self.key(3), self.frames[3])
+        self.assertIsNone(cache.get(self.key(1)))
+        self.assertIsNotNone(cache.get(self.key(0)))
+        self.assertLessEqual(cache.nbytes, 900)
+        self.assertEqual(len(cache), 3)
+
+    def test_frame_larger_than_budget_not_stored(self):
+        cache = FilteredFrameCache(max_bytes=100)
+        cache.put(self.key(0), self.frames[0])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_cached_frames_are_read_only(self):
+        cache = FilteredFrameCache(max_bytes=1000)
+        cache.put(self.key(0), self.frames[0])
+        with self.assertRaises(ValueError):
+            cache.get(self.key(0))[0, 0, 0] = 1
+        # the frame of the caller is not frozen
+        self.frames[0][0, 0, 0] = 1
+
+    def test_clear(self):
+        cache = FilteredFrameCache(max_bytes=1000)
+        cache.put(self.key(0), self.frames[0])
+        cache.get(self.key(0))
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes, cache.hits), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.filter_frame import get_filtered_frame
+from filter.incremental import IncrementalFilterRunner
+
+
+class TestIncrementalFilterRunner(unittest.TestCase):
+    """
+    Test for the filter runner that keeps the output of each stage
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (64, 80, 3), dtype=np.uint8)
+        self.params = DCFiltersParams(
+            blur_strength=2, sharpen_strength=1, sepia_strength=10
+        )
+
+    def test_same_result_as_filter_frame(self):
+        runner = IncrementalFilterRunner()
+        for params in (
+            self.params,
+            DCFiltersParams(blur_strength=2, sharpen_strength=1, hue_value=20),
+            DCFiltersParams(canny_threshold=40, brightness_strength=10),
+        ):
+            np.testing.assert_array_equal(
+                runner.apply(self.frame, params),
+                get_filtered_frame(self.frame, params),
+            )
+
+    def test_late_stage_change_reuses_earlier_stages(self):
+        runner = IncrementalFilterRunner()
+        runner.apply(self.frame, self.params)
+        self.assertEqual(runner.reused_stages, 0)
+        # only sepia changes: blur and sharpen are reused
+        runner.apply(
+            self.frame,
+            DCFiltersParams(
+                blur_strength=2, sharpen_strength=1, sepia_strength=20
+            ),
+        )
+        self.assertEqual(runner.reused_stages, 2)
+
+    def test_early_stage_change_runs_all_stages(self):
+        runner = IncrementalFilterRunner()
+        runner.apply(self.frame, self.params)
+        runner.apply(
+            self.frame,
+            DCFiltersParams(
+                blur_strength=3, sharpen_strength=1, sepia_strength=10
+            ),
+        )
+        self.assertEqual(runner.reused_stages, 0)
+
+    def test_new_frame_runs_all_stages(self):
+        runner = IncrementalFilterRunner()
+        runner.apply(self.frame, self.params)
+        runner.apply(self.frame.copy(), self.params)
+        self.assertEqual(runner.reused_stages, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
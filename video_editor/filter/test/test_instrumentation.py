@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.instrumentation import filter_stats, format_filter_stats
+from filter.plan import FilterPlan
+
+
+class TestFilterStats(unittest.TestCase):
+    """
+    Test for the per-stage filter stats
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (40, 50, 3), dtype=np.uint8)
+        # blur and sepia active, the other 5 filters are skipped
+        self.plan = FilterPlan(
+            DCFiltersParams(blur_strength=2, sepia_strength=20)
+        )
+        self.enabled = filter_stats.enabled
+        filter_stats.reset()
+
+    def tearDown(self):
+        filter_stats.enabled = self.enabled
+        filter_stats.reset()
+
+    def test_disabled_records_nothing(self):
+        filter_stats.enabled = False
+        self.plan.apply(self.frame)
+        stats = filter_stats.snapshot()
+        self.assertEqual(stats.frames, 0)
+        self.assertEqual(stats.stages, {})
+
+    def test_stage_frames_and_skipped(self):
+        filter_stats.enabled = True
+        self.plan.apply(self.frame)
+        self.plan.apply(self.frame, out=np.empty_like(self.frame))
+        stats = filter_stats.snapshot()
+        self.assertEqual(stats.frames, 2)
+        self.assertEqual(stats.skipped_stages, 2 * 5)
+        self.assertEqual(set(stats.stages), {"blur", "color"})
+        self.assertEqual(stats.stages["blur"].frames, 2)
+        self.assertGreaterEqual(stats.stages["blur"].total_ms, 0)
+
+    def test_batch_counts_every_frame(self):
+        filter_stats.enabled = True
+        self.plan.apply_batch(np.stack([self.frame] * 3))
+        stats = filter_stats.snapshot()
+        self.assertEqual(stats.frames, 3)
+        # per-pixel stage runs once for the stack, but counts 3 frames
+        self.assertEqual(stats.stages["color"].frames, 3)
+        self.assertEqual(stats.stages["blur"].frames, 3)
+
+    def test_add_stats_of_other_process(self):
+        filter_stats.enabled = True
+        self.plan.apply(self.frame)
+        stats = filter_stats.snapshot()
+        filter_stats.add(stats)
+        added = filter_stats.snapshot()
+        self.assertEqual(added.frames, 2)
+        self.assertEqual(added.skipped_stages, 2 * stats.skipped_stages)
+        self.assertEqual(added.stages["blur"].frames, 2)
+        self.assertAlmostEqual(
+            added.stages["blur"].total_ms, 2 * stats.stages["blur"].total_ms
+        )
+
+    def test_format(self):
+        filter_stats.enabled = True
+        self.plan.apply(self.frame)
+        text = format_filter_stats(filter_stats.snapshot())
+        self.assertIn("blur", text)
+        self.assertIn("skipped 5.0", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.lut import (
+    ColorLutCache,
+    build_color_lut,
+    color_lut_apply,
+    color_stages_apply,
+)
+
+
+class TestColorLut(unittest.TestCase):
+    """
+    Test for the lookup table of the per-pixel filters
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # the 3D table takes about a second to build, build it only once
+        cls.filter_params = DCFiltersParams(
+            brightness_strength=30,
+            saturation_strength=-40,
+            hue_value=25,
+            sepia_strength=60,
+        )
+        cls.lut = build_color_lut(cls.filter_params)
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (120, 160, 3), dtype=np.uint8)
+
+    def test_3d_lut_matches_filters(self):
+        # the table must give exactly the same pixels as the filters
+        expected = color_stages_apply(self.frame, self.filter_params)
+        result = color_lut_apply(self.frame, self.lut)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_3d_lut_matches_filters_at_any_width(self):
+        # widths that are not a multiple of the cvtColor SIMD blocks
+        # (854: 480p in 16:9)
+        for shape in ((48, 854, 3), (9, 48, 3), (5, 13, 3)):
+            frame = np.random.randint(0, 256, shape, dtype=np.uint8)
+            expected = color_stages_apply(frame, self.filter_params)
+            result = color_lut_apply(frame, self.lut)
+            np.testing.assert_array_equal(result, expected)
+
+    def test_3d_lut_shape(self):
+        self.assertEqual(self.lut.shape, (1 << 24,))
+        self.assertEqual(self.lut.dtype, np.uint32)
+
+    def test_per_channel_lut_for_brightness_only(self):
+        filter_params = DCFiltersParams(brightness_strength=-50)
+        lut = build_color_lut(filter_params)
+        self.assertEqual(lut.shape, (256,))
+
+        expected = color_stages_apply(self.frame, filter_params)
+        result = color_lut_apply(self.frame, lut)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_cache_waits_for_min_frames(self):
+        cache = ColorLutCache(min_frames=3)
+        filter_params = DCFiltersParams(saturation_strength=20)
+        # first uses: filters should run directly
+        self.assertIsNone(cache.get(filter_params))
+        self.assertIsNone(cache.get(filter_params))
+        # third use: table is built in the background, not in the call
+        self.assertIsNone(cache.get(filter_params))
+        cache.wait()
+        np.testing.assert_array_equal(
+            cache.get(filter_params), build_color_lut(filter_params)
+        )
+
+    def test_cache_drops_table_of_old_values(self):
+        cache = ColorLutCache(min_frames=1)
+        cache.get(DCFiltersParams(saturation_strength=20))
+        # values changed while the table was built
+        filter_params = DCFiltersParams(hue_value=10)
+        self.assertIsNone(cache.get(filter_params))
+        cache.wait()
+        np.testing.assert_array_equal(
+            cache.get(filter_params), build_color_lut(filter_params)
+        )
+
+    def test_cache_resets_on_new_values(self):
+        cache = ColorLutCache(min_frames=2)
+        cache.get(DCFiltersParams(saturation_strength=20))
+        # other values, counter starts again
+        self.assertIsNone(cache.get(DCFiltersParams(saturation_strength=21)))
+
+    def test_cache_builds_per_channel_lut_right_away(self):
+        cache = ColorLutCache(min_frames=100)
+        lut = cache.get(DCFiltersParams(brightness_strength=10))
+        self.assertIsNotNone(lut)
+        self.assertEqual(lut.shape, (256,))
+
+
+if __name__ == "__main__":
+    unittest.main()
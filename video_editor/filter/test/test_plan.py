@@ -0,0 +1,137 @@
+import unittest
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.filters.blur import blur_apply
+from filter.filters.canny import canny_apply
+from filter.filters.hue import hue_apply
+from filter.filters.saturation import saturation_apply
+from filter.filters.sharpen import sharpen_apply
+from filter.lut import color_stages_apply
+from filter.plan import FilterPlan, compile_filter_plan
+
+
+class TestFilterPlan(unittest.TestCase):
+    """
+    Test for the filter plan compiler
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (100, 100, 3), dtype=np.uint8)
+        self.neutral_params = DCFiltersParams(
+            blur_strength=0,
+            canny_threshold=0,
+            sepia_strength=0,
+            brightness_strength=0,
+            saturation_strength=0,
+            sharpen_strength=0,
+            hue_value=0,
+        )
+
+    def test_neutral_values_give_identity_plan(self):
+        plan = FilterPlan(self.neutral_params)
+        self.assertTrue(plan.is_identity)
+        # frame is returned unchanged
+        np.testing.assert_array_equal(plan.apply(self.frame), self.frame)
+
+    def test_only_active_stages(self):
+        plan = FilterPlan(DCFiltersParams(blur_strength=3, hue_value=10))
+        self.assertEqual(
+            [stage.name for stage in plan.stages], ["blur", "color"]
+        )
+
+    def test_stage_order(self):
+        plan = FilterPlan(
+            DCFiltersParams(
+                blur_strength=3,
+                canny_threshold=50,
+                sharpen_strength=1,
+                sepia_strength=10,
+            )
+        )
+        self.assertEqual(
+            [stage.name for stage in plan.stages],
+            ["blur", "canny", "sharpen", "color"],
+        )
+
+    def test_gray_stages_after_canny(self):
+        plan = FilterPlan(DCFiltersParams(canny_threshold=50))
+        self.assertEqual(
+            [(stage.name, stage.channels) for stage in plan.stages],
+            [("canny", 1), ("gray_to_bgr", 3)],
+        )
+        self.assertEqual(plan.stages[0].output_shape((10, 20, 3)), (10, 20))
+        self.assertEqual(plan.stages[1].output_shape((10, 20)), (10, 20, 3))
+
+    def test_gray_path_matches_bgr_filters(self):
+        # canny output stays single channel, the colour table gives the
+        # same result as the filters on the BGR edge frame
+        frame = self.frame
+        for sharpen, saturation, sepia in ((0, 0, 0), (2, 0, 0), (1, 40, 30)):
+            params = DCFiltersParams(
+                canny_threshold=40,
+                sharpen_strength=sharpen,
+                brightness_strength=20,
+                saturation_strength=saturation,
+                sepia_strength=sepia,
+            )
+            expected = canny_apply(frame, 40)
+            if sharpen:
+                expected = sharpen_apply(expected, sharpen)
+            expected = color_stages_apply(expected, params)
+            plan = FilterPlan(params)
+            np.testing.assert_array_equal(plan.apply(frame), expected)
+            out = np.empty_like(frame)
+            plan.apply(frame, out=out)
+            np.testing.assert_array_equal(out, expected)
+
+    def test_gray_path_batch(self):
+        params = DCFiltersParams(canny_threshold=40, sharpen_strength=1)
+        frames = np.stack([self.frame, self.frame[::-1]])
+        plan = FilterPlan(params)
+        result = plan.apply_batch(frames)
+        for frame, filtered in zip(frames, result):
+            np.testing.assert_array_equal(filtered, plan.apply(frame))
+
+    def test_neighborhood_stages_match_filters(self):
+        params = DCFiltersParams(
+            blur_strength=2, canny_threshold=40, sharpen_strength=1
+        )
+        expected = sharpen_apply(canny_apply(blur_apply(self.frame, 2), 40), 1)
+        np.testing.assert_array_equal(
+            FilterPlan(params).apply(self.frame), expected
+        )
+
+    def test_single_hsv_filter_matches_filter(self):
+        # with only one HSV filter active the result is the same
+        np.testing.assert_array_equal(
+            FilterPlan(DCFiltersParams(hue_value=40)).apply(self.frame),
+            hue_apply(self.frame, 40),
+        )
+        np.testing.assert_array_equal(
+            FilterPlan(DCFiltersParams(saturation_strength=-30)).apply(
+                self.frame
+            ),
+            saturation_apply(self.frame, -30),
+        )
+
+    def test_shared_hsv_conversion_close_to_separate_filters(self):
+        # only the rounding of the skipped HSV → BGR → HSV round trip differs
+        params = DCFiltersParams(saturation_strength=30, hue_value=30)
+        expected = hue_apply(saturation_apply(self.frame, 30), 30)
+        result = FilterPlan(params).apply(self.frame)
+        difference = np.abs(result.astype(np.int16) - expected)
+        self.assertLessEqual(difference.mean(), 1.0)
+
+    def test_compile_reuses_plan(self):
+        params = DCFiltersParams(blur_strength=3)
+        self.assertIs(
+            compile_filter_plan(params),
+            compile_filter_plan(DCFiltersParams(blur_strength=3)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
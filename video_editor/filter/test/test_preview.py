@@ -0,0 +1,61 @@
+import unittest
+
+import cv2
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter.filter_frame import get_filtered_frame
+from filter.preview import (
+    preview_frame,
+    preview_scale,
+    scale_filter_params,
+)
+
+
+class TestPreview(unittest.TestCase):
+    """
+    Test for filtering the preview at display size
+    """
+
+    def setUp(self):
+        # smooth image, so blurring before or after scaling compares well
+        gradient = np.linspace(0, 255, 640, dtype=np.float32)
+        image = np.outer(np.sin(np.arange(480) / 20) + 1, gradient) / 2
+        self.frame = np.dstack([image] * 3).astype(np.uint8)
+
+    def test_scale_only_shrinks(self):
+        self.assertEqual(preview_scale(1080, 400), 400 / 1080)
+        self.assertEqual(preview_scale(300, 400), 1.0)
+        self.assertEqual(preview_scale(None, 400), 1.0)
+
+    def test_preview_frame_size(self):
+        scaled = preview_frame(self.frame, 0.5)
+        self.assertEqual(scaled.shape, (240, 320, 3))
+        # no scaling: same frame
+        self.assertIs(preview_frame(self.frame, 1.0), self.frame)
+
+    def test_blur_is_scaled(self):
+        params = DCFiltersParams(blur_strength=9, sharpen_strength=2)
+        scaled = scale_filter_params(params, 1 / 3)
+        self.assertEqual(scaled.blur_strength, 3)
+        self.assertEqual(scaled.sharpen_strength, 2)
+        self.assertIs(scale_filter_params(params, 1.0), params)
+
+    def test_preview_close_to_scaled_full_resolution(self):
+        params = DCFiltersParams(blur_strength=12, brightness_strength=20)
+        scale = 0.25
+        expected = cv2.resize(
+            get_filtered_frame(self.frame, params),
+            (160, 120),
+            interpolation=cv2.INTER_AREA,
+        )
+        result = get_filtered_frame(
+            preview_frame(self.frame, scale),
+            scale_filter_params(params, scale),
+        )
+        difference = np.abs(result.astype(np.int16) - expected)
+        self.assertLess(difference.mean(), 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+import numpy as np
+from models.dc_video import DCFiltersParams
+
+from filter import tiling
+from filter.filters.blur import blur_apply
+from filter.filters.sharpen import sharpen_apply
+from filter.plan import FilterPlan
+from filter.tiling import strip_bounds, tiled_apply
+
+
+class TestTiledApply(unittest.TestCase):
+    """
+    Test for the tiled execution of neighborhood filters
+    """
+
+    def setUp(self):
+        # generate random integers between 0 and 255
+        self.frame = np.random.randint(0, 256, (301, 203, 3), dtype=np.uint8)
+
+    def test_strip_bounds_cover_all_rows(self):
+        bounds = strip_bounds(301, 4, 5)
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], 301)
+        for (_, end, _, _), (start, _, _, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(end, start)
+
+    def test_strip_bounds_halo(self):
+        start, end, halo_start, halo_end = strip_bounds(301, 4, 5)[1]
+        self.assertEqual(halo_start, start - 5)
+        self.assertEqual(halo_end, end + 5)
+
+    def test_blur_bit_exact(self):
+        for value in (1, 4, 20):
+            expected = blur_apply(self.frame, value)
+            result = tiled_apply(
+                partial(blur_apply, value=value), self.frame, value, workers=4
+            )
+            np.testing.assert_array_equal(result, expected)
+
+    def test_sharpen_bit_exact(self):
+        expected = sharpen_apply(self.frame, 3)
+        result = tiled_apply(
+            partial(sharpen_apply, value=3), self.frame, 1, workers=4
+        )
+        np.testing.assert_array_equal(result, expected)
+
+    def test_out_buffer(self):
+        out = np.empty_like(self.frame)
+        result = tiled_apply(
+            partial(blur_apply, value=2), self.frame, 2, out=out, workers=3
+        )
+        self.assertIs(result, out)
+
+    def test_plan_uses_tiles_for_large_frames(self):
+        params = DCFiltersParams(
+            blur_strength=3, canny_threshold=0, sharpen_strength=1
+        )
+        expected = FilterPlan(params).apply(self.frame)
+        # every frame counts as large with 4 threads
+        with patch.multiple(
+            tiling, TILE_MIN_PIXELS=0, TILE_MIN_ROWS=16, _tile_workers=4
+        ):
+            self.assertTrue(tiling.should_tile(self.frame))
+            result = FilterPlan(params).apply(self.frame)
+        np.testing.assert_array_equal(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
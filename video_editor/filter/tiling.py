@@ -0,0 +1,134 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from filter.buffer_pool import frame_buffer_pool
+
+# frames with fewer pixels are filtered with a single call,
+# splitting them costs more than it saves (default: from 1440p on)
+TILE_MIN_PIXELS = 2560 * 1440
+
+# strips must be higher than this, otherwise the halo rows dominate
+TILE_MIN_ROWS = 64
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+# number of threads used for the strips, 1 disables tiling
+_tile_workers: int = os.cpu_count() or 1
+
+
+def set_tile_workers(workers: int) -> None:
+    """
+    Set the number of threads used to filter the strips of a frame.
+    :param workers: number of threads, 1 disables tiling.
+    :return: None
+    """
+    global _executor, _tile_workers
+    with _executor_lock:
+        _tile_workers = max(1, workers)
+        # the pool is created again with the new size when needed
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def get_tile_workers() -> int:
+    """
+    :return: number of threads used to filter the strips of a frame.
+    """
+    return _tile_workers
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_tile_workers, thread_name_prefix="filter-tile"
+            )
+        return _executor
+
+
+def strip_bounds(
+    height: int, strips: int, halo: int
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Split the rows of a frame into horizontal strips.
+    :param height: number of rows of the frame
+    :param strips: number of strips
+    :param halo: rows added above and below each strip (kernel radius)
+    :return: list of (start, end, halo_start, halo_end) rows. The strip
+    covers [start, end), the filter reads [halo_start, halo_end).
+    """
+    bounds = []
+    step = -(-height // strips)
+    for start in range(0, height, step):
+        end = min(start + step, height)
+        bounds.append(
+            (start, end, max(0, start - halo), min(height, end + halo))
+        )
+    return bounds
+
+
+def should_tile(frame: npt.NDArray) -> bool:
+    """
+    Check if a frame is large enough to be filtered in strips.
+    :param frame: frame to filter
+    :return: True if tiling should be used.
+    """
+    height, width = frame.shape[:2]
+    return (
+        _tile_workers > 1
+        and height * width >= TILE_MIN_PIXELS
+        and height >= 2 * TILE_MIN_ROWS
+    )
+
+
+def tiled_apply(
+    func: Callable[..., npt.NDArray],
+    frame: npt.NDArray,
+    halo: int,
+    out: Optional[npt.NDArray] = None,
+    workers: Optional[int] = None,
+) -> npt.NDArray:
+    """
+    Run a neighborhood filter on horizontal strips of the frame in a pool
+    of threads (OpenCV releases the GIL while filtering).
+    Each strip is filtered together with halo rows above and below it, so
+    as long as halo is at least the kernel radius every kept pixel sees
+    the same neighbours as in a single call and the result is the same,
+    bit for bit. Only for filters with a bounded kernel (blur, sharpen),
+    not for Canny: its hysteresis follows edges across the whole frame.
+    :param func: filter function, called as func(strip, out=buffer)
+    :param frame: frame to filter
+    :param halo: number of extra rows needed by the filter (kernel radius)
+    :param out: optional buffer for the result, must not be the frame.
+    :param workers: number of strips, default: number of tile threads.
+    :return: filtered frame
+    """
+    height = frame.shape[0]
+    workers = workers or _tile_workers
+    strips = max(1, min(workers, height // TILE_MIN_ROWS))
+    if out is None:
+        out = np.empty_like(frame)
+
+    def filter_strip(bounds: Tuple[int, int, int, int]) -> None:
+        start, end, halo_start, halo_end = bounds
+        source = frame[halo_start:halo_end]
+        scratch = frame_buffer_pool.acquire(source.shape, source.dtype)
+        func(source, out=scratch)
+        # keep only the rows of the strip, drop the halo
+        out[start:end] = scratch[start - halo_start : end - halo_start]
+        frame_buffer_pool.release(scratch)
+
+    bounds = strip_bounds(height, strips, halo)
+    if len(bounds) == 1:
+        filter_strip(bounds[0])
+    else:
+        # list() waits for all strips and raises errors of the threads
+        list(_get_executor().map(filter_strip, bounds))
+    return out
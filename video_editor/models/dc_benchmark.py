@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DCBenchmarkResult:
+    # filter name (blur, canny, ...) or "chain" for get_filtered_frame
+    name: Optional[str] = None
+    # resolution name, e.g. 1080p
+    resolution: Optional[str] = None
+    # slider value or filter values used
+    value: Optional[str] = None
+    # number of timed frames
+    frames: int = 0
+    fps: float = 0.0
+    # per-frame latency in milliseconds
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    p99_ms: float = 0.0
@@ -1,10 +1,11 @@
 from dataclasses import dataclass, field
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import numpy.typing as npt
 from cv2 import VideoCapture
 
-from models.type_status import TypeVideoTypeStatus
+from models.type_encoder import TypeEncoder
+from models.type_status import TypeExportStatus, TypeVideoTypeStatus
 
 
 @dataclass
@@ -15,6 +16,10 @@ class DCVideoData:
     input_path: Optional[str] = None
     cap: Optional[VideoCapture] = None
     last_playing_frame: Optional[npt.NDArray] = None
+    # index of last_playing_frame in the video
+    frame_index: Optional[int] = None
+    # index of the next frame shown during playback
+    next_frame_index: int = 0
     first_frame: Optional[npt.NDArray] = None
     total_time: Optional[int] = None
     current_time: Optional[int] = None
@@ -23,7 +28,7 @@ class DCVideoData:
     )
 
 
-@dataclass
+@dataclass(frozen=True)
 class DCFiltersParams:
     blur_strength: Optional[int] = None
     canny_threshold: Optional[int] = None
@@ -39,3 +44,133 @@ class DCVideoExportParams:
     filter_params: Optional[DCFiltersParams] = None
     output_path: Optional[str] = None
     input_path: Optional[str] = None
+    # first frame and end (exclusive) of the exported clip,
+    # None: to the end of the video
+    start_frame: int = 0
+    end_frame: Optional[int] = None
+    # (width, height) of the exported video, None: size of the input.
+    # Frames are scaled before they are filtered
+    output_size: Optional[Tuple[int, int]] = None
+    # encoder backend, segments and checkpoints are only used with mp4v
+    encoder: TypeEncoder = TypeEncoder.mp4v
+    # number of frames decoded and filtered together
+    batch_size: int = 4
+    # number of filter threads, None: cores left after decode and encode
+    filter_workers: Optional[int] = None
+    # decoded batches that can wait for a filter thread
+    queue_size: int = 4
+    # number of filter processes, frames are passed in shared memory
+    # (see run_process_pipeline), 0: filter threads
+    filter_processes: int = 0
+    # number of frame ranges exported in parallel processes, 1: one process
+    segments: int = 1
+    # frames per checkpoint segment, None: no checkpoints. Finished
+    # segments are kept next to the output until the export is done, a
+    # rerun with the same parameters only exports the missing ones
+    checkpoint_frames: Optional[int] = None
+    # threads of OpenCV, BLAS and the filters in the export process (see
+    # apply_resource_policy), None: the cores shared by the running exports
+    cpu_threads: Optional[int] = None
+    # cores the export process is pinned to, None: no pinning
+    cpu_affinity: Optional[Tuple[int, ...]] = None
+    # optional multiprocessing.Queue the export puts DCExportProgress into
+    progress_queue: Optional[Any] = None
+    # optional multiprocessing.Event, when set the export stops and
+    # deletes the partial output
+    cancel_event: Optional[Any] = None
+    # optional JSON file for the export summary (time, fps, filter stats)
+    summary_path: Optional[str] = None
+
+
+@dataclass
+class DCStageStats:
+    # number of frames filtered by the stage
+    frames: int = 0
+    # total time of the stage in milliseconds
+    total_ms: float = 0.0
+
+
+@dataclass
+class DCFilterStats:
+    # number of filtered frames
+    frames: int = 0
+    # filters not run because their value was neutral (summed over frames)
+    skipped_stages: int = 0
+    # stats of each stage by name (blur, canny, ...)
+    stages: Dict[str, DCStageStats] = field(default_factory=dict)
+
+
+@dataclass
+class DCExportSummary:
+    status: Optional[TypeExportStatus] = None
+    frames: int = 0
+    seconds: float = 0.0
+    fps: float = 0.0
+    filter_stats: Optional[DCFilterStats] = None
+    # number of segments the video was exported in
+    segments: int = 1
+    encoder: Optional[TypeEncoder] = None
+    # frames per second of the encoder alone (time spent writing frames)
+    encode_fps: float = 0.0
+    # no filter was active and the input was copied as it is
+    copied: bool = False
+
+
+@dataclass
+class DCBatchJobResult:
+    # position of the job in the list passed to export_batch
+    index: int = 0
+    input_path: Optional[str] = None
+    output_path: Optional[str] = None
+    status: Optional[TypeExportStatus] = None
+    frames: int = 0
+    # wall time of the job in seconds
+    seconds: float = 0.0
+    fps: float = 0.0
+    # frames per second of the encoder alone
+    encode_fps: float = 0.0
+    # text of the error if the export raised one
+    error: Optional[str] = None
+
+
+@dataclass
+class DCExportProgress:
+    status: Optional[TypeExportStatus] = None
+    frames_done: int = 0
+    total_frames: int = 0
+    # frames per second since the start of the export
+    fps: float = 0.0
+    # estimated seconds until the export is done
+    eta_seconds: Optional[float] = None
+    # time of each filter stage so far (not during a segmented export)
+    filter_stats: Optional[DCFilterStats] = None
+
+
+@dataclass
+class DCSegmentTask:
+    export_params: Optional[DCVideoExportParams] = None
+    # position of the segment in the video
+    index: int = 0
+    # first frame and end of the frame range, end None: to the end
+    start: int = 0
+    end: Optional[int] = None
+    # file the filtered segment is written to
+    output_path: Optional[str] = None
+    # queue (proxy) for the frames done by the segment
+    progress_queue: Optional[Any] = None
+    # event (proxy) set to stop the segment
+    cancel_event: Optional[Any] = None
+
+
+@dataclass
+class DCSegmentResult:
+    index: int = 0
+    # number of written frames
+    frames: int = 0
+    # hash of the first frame read after seeking to the start
+    first_frame_hash: Optional[str] = None
+    # hash of the frame after the range, read without seeking
+    next_frame_hash: Optional[str] = None
+    filter_stats: Optional[DCFilterStats] = None
+    # time spent writing the frames
+    encode_seconds: float = 0.0
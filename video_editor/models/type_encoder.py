@@ -0,0 +1,18 @@
+from enum import Enum, auto, unique
+
+
+@unique
+class TypeEncoder(str, Enum):
+    """Encoder backends of the export"""
+
+    def _generate_next_value_(item_name, start, count, last_values):
+        return str(item_name)
+
+    # cv2.VideoWriter, MPEG-4 part 2 (default, small files)
+    mp4v = auto()
+    # cv2.VideoWriter, Motion JPEG: every frame is a key frame, fast to
+    # encode and to seek, large files (intermediates)
+    mjpg = auto()
+    # raw YUV 4:2:0 frames in a YUV4MPEG2 stream, no compression,
+    # can be written to stdout or a pipe
+    y4m = auto()
@@ -33,3 +33,5 @@ class TypeExportStatus(str, Enum):
 
     ok = auto()
     error = auto()
+    running = auto()
+    cancelled = auto()
@@ -0,0 +1,78 @@
+import argparse
+import sys
+
+from benchmark.benchmark import (
+    CHAIN_NAME,
+    FILTER_SWEEPS,
+    RESOLUTIONS,
+    compare_results,
+    format_result,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput of the video filters."
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=list(RESOLUTIONS),
+        default=list(RESOLUTIONS),
+    )
+    parser.add_argument(
+        "--filters",
+        nargs="+",
+        choices=list(FILTER_SWEEPS) + [CHAIN_NAME],
+        default=list(FILTER_SWEEPS) + [CHAIN_NAME],
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="timed frames per case"
+    )
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument(
+        "--baseline", help="JSON file of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed fps loss against the baseline (0.15 = 15 %%)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # print every case as soon as it is measured
+    results = run_benchmarks(
+        args.resolutions,
+        args.filters,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        progress=lambda result: print(format_result(result), flush=True),
+    )
+    if args.output:
+        save_results(results, args.output)
+
+    if args.baseline:
+        regressions = compare_results(
+            results, load_results(args.baseline), args.tolerance
+        )
+        for result, old in regressions:
+            print(
+                f"SLOWER: {result.name} {result.resolution} {result.value}: "
+                f"{result.fps:.1f} fps (baseline {old.fps:.1f} fps)"
+            )
+        # exit code 1 so scripts can stop on slowdowns
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import argparse
+import multiprocessing
+import sys
+from typing import Tuple
+
+from export.checkpoint import default_checkpoint_frames
+from export.export import video_exporter_func
+from export.resources import apply_resource_policy
+from export.segments import default_export_segments
+from load.load import file_loader
+from models.dc_video import DCFiltersParams, DCVideoData, DCVideoExportParams
+from models.type_encoder import TypeEncoder
+from models.type_status import (
+    TypeExportStatus,
+    TypeLoadStatus,
+    TypeVideoTypeStatus,
+)
+
+# (option, DCFiltersParams field, minimum, maximum) of the filter values,
+# same ranges as the sliders of the app
+FILTER_OPTIONS = [
+    ("--blur", "blur_strength", 0, 20),
+    ("--canny", "canny_threshold", 0, 255),
+    ("--sepia", "sepia_strength", 0, 100),
+    ("--brightness", "brightness_strength", -100, 100),
+    ("--saturation", "saturation_strength", -100, 100),
+    ("--sharpen", "sharpen_strength", 0, 5),
+    ("--hue", "hue_value", -180, 180),
+]
+
+
+def int_in_range(minimum: int, maximum: int):
+    """
+    Argument type for an int between minimum and maximum (included).
+    :param minimum: smallest value
+    :param maximum: largest value
+    :return: function converting the argument
+    """
+
+    def convert(text: str) -> int:
+        value = int(text)
+        if not minimum <= value <= maximum:
+            raise argparse.ArgumentTypeError(
+                f"{value} is not in [{minimum}..{maximum}]"
+            )
+        return value
+
+    return convert
+
+
+def frame_size(text: str) -> Tuple[int, int]:
+    """
+    Argument type for a frame size like 1280x720.
+    :param text: WIDTHxHEIGHT
+    :return: (width, height)
+    """
+    try:
+        width, height = (int(value) for value in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} is not WIDTHxHEIGHT")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"{text} is not WIDTHxHEIGHT")
+    return width, height
+
+
+def cpu_list(text: str) -> Tuple[int, ...]:
+    """
+    Argument type for a list of cores like 0,1,4-7.
+    :param text: comma separated cores and ranges
+    :return: core numbers
+    """
+    cpus = []
+    try:
+        for part in text.split(","):
+            first, _, last = part.partition("-")
+            cpus.extend(range(int(first), int(last or first) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} is not a list of cores")
+    if not cpus or min(cpus) < 0:
+        raise argparse.ArgumentTypeError(f"{text} is not a list of cores")
+    return tuple(cpus)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Filter a video and export it without the app."
+    )
+    parser.add_argument("input", help="video to filter")
+    parser.add_argument(
+        "output", help="video file to write, - for stdout (y4m encoder)"
+    )
+    for option, field, minimum, maximum in FILTER_OPTIONS:
+        parser.add_argument(
+            option,
+            dest=field,
+            type=int_in_range(minimum, maximum),
+            default=0,
+            metavar=f"[{minimum}..{maximum}]",
+        )
+    parser.add_argument(
+        "--start",
+        type=int_in_range(0, sys.maxsize),
+        default=0,
+        help="first frame of the exported clip",
+    )
+    parser.add_argument(
+        "--end",
+        type=int_in_range(1, sys.maxsize),
+        default=None,
+        help="frame after the exported clip, default: end of the video",
+    )
+    parser.add_argument(
+        "--size",
+        type=frame_size,
+        default=None,
+        metavar="WIDTHxHEIGHT",
+        help="size of the exported video, the frames are scaled before "
+        "they are filtered, default: size of the input",
+    )
+    parser.add_argument(
+        "--encoder",
+        type=TypeEncoder,
+        choices=list(TypeEncoder),
+        default=TypeEncoder.mp4v,
+        help="mp4v: small files, mjpg: fast, every frame a key frame, "
+        "y4m: raw frames for another program",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=None,
+        help="frame ranges exported in parallel processes, "
+        "default: one per core if ffmpeg is installed",
+    )
+    parser.add_argument(
+        "--checkpoint-frames",
+        type=int,
+        default=None,
+        help="frames per checkpoint segment, a rerun of a killed export "
+        "resumes from them, 0: no checkpoints, default: 900 if ffmpeg is "
+        "installed",
+    )
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument(
+        "--filter-workers",
+        type=int,
+        default=None,
+        help="filter threads per process",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="threads of OpenCV, BLAS and the filters, e.g. the cores "
+        "divided by the exports a job runner starts at the same time",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=cpu_list,
+        default=None,
+        help="pin the export to these cores, e.g. 0-3 (Linux)",
+    )
+    parser.add_argument(
+        "--summary", help="save the export summary to this JSON file"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.end is not None and args.end <= args.start:
+        print("Error: --end has to be after --start.", file=sys.stderr)
+        return 2
+
+    # same checks as when the file is opened in the app
+    video_data, load_status = file_loader(DCVideoData(input_path=args.input))
+    if video_data.cap is not None:
+        video_data.cap.release()
+    if load_status is TypeLoadStatus.error:
+        print(
+            f"Error: Could not open video file {args.input}.", file=sys.stderr
+        )
+        return 2
+    if video_data.video_status is TypeVideoTypeStatus.video_too_short:
+        print("Warning: Video is very short!", file=sys.stderr)
+
+    if args.threads or args.cpus:
+        # also limits the segment processes started by the export
+        apply_resource_policy(args.threads, args.cpus)
+
+    export_params = DCVideoExportParams(
+        filter_params=DCFiltersParams(
+            **{field: getattr(args, field) for _, field, _, _ in FILTER_OPTIONS}
+        ),
+        output_path=args.output,
+        input_path=args.input,
+        start_frame=args.start,
+        end_frame=args.end,
+        output_size=args.size,
+        encoder=args.encoder,
+        batch_size=args.batch_size,
+        filter_workers=args.filter_workers,
+        segments=args.segments or default_export_segments(),
+        checkpoint_frames=(
+            default_checkpoint_frames()
+            if args.checkpoint_frames is None
+            else args.checkpoint_frames or None
+        ),
+        summary_path=args.summary,
+    )
+    summary = video_exporter_func(export_params)
+    if summary.copied:
+        # no filter active, the input was copied
+        encoder = "copied"
+    else:
+        encoder = f"{summary.encoder.value} {summary.encode_fps:.1f} fps"
+    print(
+        f"{summary.status.value}: {summary.frames} frames in "
+        f"{summary.seconds:.2f} s ({summary.fps:.1f} fps, {encoder})",
+        # stdout may be the video
+        file=sys.stderr if args.output == "-" else sys.stdout,
+    )
+    # exit code 1 so scripts can stop on failed exports
+    return 0 if summary.status is TypeExportStatus.ok else 1
+
+
+if __name__ == "__main__":
+    # only needed in windows (segment processes)
+    multiprocessing.freeze_support()
+    sys.exit(main())